@@ -8,6 +8,7 @@ from pathlib import Path
 from services.auth.auth_utils import get_current_user
 from services.documents.pdf_parser import parse_pdf_content
 from services.llm_chain import rag_service
+from services.documents.document_service import document_service
 from models.usage import DocumentResponse
 from core.database import get_supabase
 
@@ -113,6 +114,7 @@ async def upload_document(
                 supabase.table('uploaded_documents').update({
                     "processed": True
                 }).eq('id', document_id).execute()
+                await document_service.invalidate_ready_documents(user_id)
                 
                 return {
                     "message": "Documento procesado exitosamente",
@@ -212,6 +214,7 @@ async def delete_document(
         ).eq('user_id', user_id).execute()
         
         if delete_result.data:
+            await document_service.invalidate_ready_documents(user_id)
             return {
                 "message": "Documento eliminado exitosamente",
                 "document_id": document_id,
@@ -1,26 +1,287 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, BackgroundTasks
+from fastapi.responses import StreamingResponse, Response, ORJSONResponse
 from models.rag import (
     QueryRequest, QueryResponse, QuerySuggestionsResponse, QueryExamplesResponse,
     ChatRequest, ChatResponse, ChatMessage, StreamingChatResponse, ChatHistoryResponse
 )
 from services.legal.rag import rag_service
 from services.legal.chat_service import chat_service
+from services.legal.semantic_cache import semantic_cache
 from services.documents.document_service import document_service
 from services.auth.auth_service import get_current_user_optional
 from services.monitoring.usage_service import usage_service
+import asyncio
+import os
 import time
-import json
+import orjson
+import random
 import uuid
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from models.rag import QuerySuggestion
+from core.config import PERFORMANCE_CONFIG, CACHE_CONFIG, CHAT_CONFIG
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
+
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Configuración leída una sola vez al cargar el módulo
+_OPENAI_CONFIGURED = bool(os.getenv("OPENAI_API_KEY"))
+
+# Respuesta de error constante: se construye una sola vez sin re-validar
+_ERROR_RESPONSE = QueryResponse.model_construct(
+    answer="Lo siento, ocurrió un error al procesar tu consulta. Por favor intenta nuevamente.",
+    confidence=0.0,
+    sources=[],
+    category="Error",
+    suggestions=[],
+    tokens_used=0
+)
+
+# Respuestas estáticas: se construyen y serializan una sola vez al importar
+_STATIC_SUGGESTIONS = QuerySuggestionsResponse(
+    suggestions=[
+        QuerySuggestion(
+            category="🏪 Constitución de Empresa",
+            question="¿Cómo constituir una SAS en Colombia?",
+            description="Aprende los pasos para crear una Sociedad por Acciones Simplificada"
+        ),
+        QuerySuggestion(
+            category="🏪 Constitución de Empresa",
+            question="¿Qué documentos necesito para crear mi empresa?",
+            description="Lista completa de documentos requeridos para constituir tu empresa"
+        ),
+        QuerySuggestion(
+            category="💼 Derecho Laboral",
+            question="¿Cuáles son las prestaciones sociales obligatorias?",
+            description="Conoce todas las prestaciones que debes pagar a tus empleados"
+        ),
+        QuerySuggestion(
+            category="💼 Derecho Laboral",
+            question="¿Cómo calcular la liquidación de un empleado?",
+            description="Guía paso a paso para calcular la liquidación laboral"
+        ),
+        QuerySuggestion(
+            category="🏛️ Obligaciones Tributarias",
+            question="¿Cómo presentar la declaración de renta?",
+            description="Proceso completo para presentar tu declaración de renta"
+        ),
+        QuerySuggestion(
+            category="🏛️ Obligaciones Tributarias",
+            question="¿Cuál régimen tributario me conviene?",
+            description="Análisis de los diferentes regímenes tributarios para PyMEs"
+        ),
+        QuerySuggestion(
+            category="🏢 Contratos Comerciales",
+            question="¿Cómo redactar un contrato comercial?",
+            description="Elementos esenciales que debe tener tu contrato comercial"
+        ),
+        QuerySuggestion(
+            category="🏢 Contratos Comerciales",
+            question="¿Qué cláusulas debe tener un contrato de servicios?",
+            description="Cláusulas importantes para proteger tu negocio"
+        )
+    ],
+    total_categories=4,
+    message="Consultas comunes para PyMEs colombianas"
+)
+_STATIC_SUGGESTIONS_JSON = _STATIC_SUGGESTIONS.model_dump_json().encode()
+
+_CATEGORIES = [
+    {
+        "id": "business_formation",
+        "name": "🏪 Constitución de Empresa",
+        "description": "Creación de empresas, tipos societarios, trámites legales",
+        "topics": [
+            "Sociedad por Acciones Simplificada (SAS)",
+            "Sociedad Limitada (Ltda)",
+            "Trámites en Cámara de Comercio",
+            "Documentos requeridos",
+            "Costos y tiempos"
+        ],
+        "complexity": "Media",
+        "estimated_response_time": "2-3 minutos"
+    },
+    {
+        "id": "labor_law",
+        "name": "💼 Derecho Laboral",
+        "description": "Contratos laborales, prestaciones sociales, liquidaciones",
+        "topics": [
+            "Contratos de trabajo",
+            "Prestaciones sociales",
+            "Liquidación laboral",
+            "Jornadas de trabajo",
+            "Despidos y terminaciones"
+        ],
+        "complexity": "Alta",
+        "estimated_response_time": "3-4 minutos"
+    },
+    {
+        "id": "tax_obligations",
+        "name": "🏛️ Obligaciones Tributarias",
+        "description": "Impuestos, declaraciones, régimen tributario para PyMEs",
+        "topics": [
+            "Régimen Simple de Tributación",
+            "Declaración de renta",
+            "IVA y retenciones",
+            "Sanciones tributarias",
+            "Beneficios para PyMEs"
+        ],
+        "complexity": "Alta",
+        "estimated_response_time": "3-5 minutos"
+    },
+    {
+        "id": "commercial_contracts",
+        "name": "🏢 Contratos Comerciales",
+        "description": "Contratos de servicios, compraventa, cláusulas importantes",
+        "topics": [
+            "Contratos de servicios",
+            "Compraventa comercial",
+            "Cláusulas de exclusividad",
+            "Terminación de contratos",
+            "Protección de intereses"
+        ],
+        "complexity": "Media-Alta",
+        "estimated_response_time": "2-4 minutos"
+    },
+    {
+        "id": "document_analysis",
+        "name": "📄 Análisis de Documentos",
+        "description": "Revisión y análisis de contratos y documentos legales subidos",
+        "topics": [
+            "Análisis de riesgos",
+            "Identificación de cláusulas problemáticas",
+            "Recomendaciones de mejora",
+            "Comparación con estándares",
+            "Alertas legales"
+        ],
+        "complexity": "Alta",
+        "estimated_response_time": "4-6 minutos",
+        "requires_authentication": True,
+        "requires_documents": True
+    }
+]
+
+_STATIC_CATEGORIES = {
+    "categories": _CATEGORIES,
+    "total_categories": len(_CATEGORIES),
+    "note": "Todas las consultas están optimizadas para PyMEs colombianas",
+    "supported_languages": ["Español (Colombia)"],
+    "legal_jurisdiction": "Colombia"
+}
+_STATIC_CATEGORIES_JSON = orjson.dumps(_STATIC_CATEGORIES)
+
+# Generador de IDs de mensaje: se siembra una vez desde os.urandom y evita
+# una llamada al sistema por cada ID (los IDs no son secretos)
+_id_rng = random.Random(os.urandom(32))
+
+def _new_message_id() -> str:
+    """Generar un ID de mensaje con formato UUID v4"""
+    return str(uuid.UUID(int=_id_rng.getrandbits(128), version=4))
+
+# Referencias a tareas en segundo plano para evitar que el GC las recolecte
+_background_tasks: set = set()
+
+def _run_in_background(coro) -> None:
+    """Lanzar una corrutina sin bloquear la respuesta (fire-and-forget)"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+def _file_context(file_info: Optional[Dict[str, Any]]) -> str:
+    """
+    Contexto del archivo adjunto para el prompt
+    
+    Sin archivo no se añade nada: así el prompt conserva un prefijo estable
+    que el proveedor del LLM puede reutilizar desde su caché.
+    """
+    return f"Archivo adjunto: {file_info['name']}" if file_info else ""
+
+# Comentario SSE para mantener viva la conexión en proxies durante el prefill
+SSE_KEEPALIVE_SECONDS = 10
+_SSE_KEEPALIVE = b": keepalive\n\n"
+
+async def _with_keepalive(
+    tokens: AsyncIterator[str],
+    interval: float = SSE_KEEPALIVE_SECONDS
+) -> AsyncIterator[Optional[str]]:
+    """Reenviar tokens intercalando None cada `interval` segundos sin actividad"""
+    iterator = tokens.__aiter__()
+    next_token = asyncio.ensure_future(iterator.__anext__())
+    try:
+        while True:
+            done, _ = await asyncio.wait({next_token}, timeout=interval)
+            if not done:
+                yield None
+                continue
+            try:
+                token = next_token.result()
+            except StopAsyncIteration:
+                return
+            yield token
+            next_token = asyncio.ensure_future(iterator.__anext__())
+    finally:
+        next_token.cancel()
+
+async def _save_messages_safely(user_id: str, messages: List[ChatMessage]) -> None:
+    """Guardar mensajes en el historial sin propagar errores"""
+    try:
+        await chat_service.save_messages_bulk(user_id, messages)
+    except Exception as e:
+        logger.warning("⚠️ Error guardando mensajes en streaming: %s", e)
+
+@dataclass
+class RequestContext:
+    """Contexto común de las peticiones de consulta y chat"""
+    __slots__ = ("user", "documents")
+    
+    user: Optional[dict]
+    documents: List[Dict[str, Any]]
+
+async def get_request_context(
+    current_user: dict = Depends(get_current_user_optional)
+) -> RequestContext:
+    """
+    Verificar límites de uso y obtener documentos del usuario en paralelo
+    
+    Ambas consultas son independientes, así que se lanzan a la vez para
+    ahorrar un viaje de red en cada petición autenticada. Los documentos
+    se cachean por usuario, así que obtenerlos siempre es barato; cada
+    endpoint decide si los usa.
+    """
+    if not current_user:
+        return RequestContext(user=None, documents=[])
+    
+    user_id = current_user["id"]
+    usage_limits, documents = await asyncio.gather(
+        usage_service.check_usage_limits(user_id),
+        document_service.get_ready_documents(user_id),
+        return_exceptions=True
+    )
+    
+    if isinstance(usage_limits, Exception):
+        # Continuar sin verificación de límites en caso de error
+        logger.warning("⚠️ Error verificando límites: %s", usage_limits)
+    elif usage_limits.is_daily_exceeded:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Has excedido el límite diario de {usage_limits.daily_limit} consultas."
+        )
+    
+    if isinstance(documents, Exception):
+        logger.warning("⚠️ Error obteniendo documentos: %s", documents)
+        documents = []
+    
+    return RequestContext(user=current_user, documents=documents)
 
 @router.post("/query", response_model=QueryResponse)
 async def make_legal_query(
     query_request: QueryRequest,
-    current_user: dict = Depends(get_current_user_optional)
+    background_tasks: BackgroundTasks,
+    ctx: RequestContext = Depends(get_request_context)
 ):
     """
     🧑‍⚖️ Realizar consulta legal usando IA (OPTIMIZADO)
@@ -29,38 +290,41 @@ async def make_legal_query(
     Permite realizar consultas legales especializadas para PyMEs colombianas.
     """
     
-    if len(query_request.question) > 1000:
-        raise HTTPException(
-            status_code=400,
-            detail="La pregunta no puede exceder 1000 caracteres"
-        )
-    
-    # Verificar límites de uso si está autenticado (optimizado)
-    if current_user:
-        try:
-            usage_limits = await usage_service.check_usage_limits(current_user["id"])
-            if usage_limits.is_daily_exceeded:
-                raise HTTPException(
-                    status_code=429,
-                    detail=f"Has excedido el límite diario de {usage_limits.daily_limit} consultas."
-                )
-        except Exception as e:
-            print(f"⚠️ Error verificando límites: {e}")
-            # Continuar sin verificación de límites en caso de error
-    
-    # Obtener documentos del usuario (optimizado)
-    user_documents = []
-    if current_user and query_request.use_uploaded_docs:
-        try:
-            user_documents = document_service.get_user_documents(current_user["id"])
-            user_documents = [doc for doc in user_documents if doc.get("status") == "ready"][:3]  # Solo primeros 3
-        except Exception as e:
-            print(f"⚠️ Error obteniendo documentos: {e}")
+    current_user = ctx.user
+    user_documents = ctx.documents if query_request.use_uploaded_docs else []
     
     # Medir tiempo de respuesta
     start_time = time.time()
     
+    # Caché semántico: solo para consultas sin contexto ni documentos propios,
+    # particionado por el perfil de empresa que se incluye en el prompt
+    cacheable = not user_documents and not query_request.context
+    question_embedding = None
+    profile = semantic_cache.profile_key(current_user)
+    
     try:
+        if cacheable:
+            cached_response = None
+            try:
+                question_embedding = await semantic_cache.embed(query_request.question)
+                cached_response = await semantic_cache.get(
+                    query_request.question, question_embedding, profile
+                )
+            except Exception:
+                # Un fallo del caché no debe impedir responder con el pipeline RAG
+                logger.exception("⚠️ Error consultando el caché semántico")
+            
+            if cached_response is not None:
+                if current_user:
+                    background_tasks.add_task(
+                        usage_service.record_usage,
+                        user_id=current_user["id"],
+                        query_text=query_request.question,
+                        response_time=int((time.time() - start_time) * 1000),
+                        tokens_used=0
+                    )
+                return cached_response
+        
         # Realizar consulta usando el servicio RAG con timeout
         result = await rag_service.query(
             question=query_request.question,
@@ -72,17 +336,15 @@ async def make_legal_query(
         # Calcular tiempo de respuesta
         response_time = int((time.time() - start_time) * 1000)
         
-        # Registrar uso si está autenticado (asíncrono para no bloquear)
+        # Registrar uso si está autenticado (después de enviar la respuesta)
         if current_user:
-            try:
-                await usage_service.record_usage(
-                    user_id=current_user["id"],
-                    query_text=query_request.question,
-                    response_time=response_time,
-                    tokens_used=result.get("tokens_used", 0)
-                )
-            except Exception as e:
-                print(f"⚠️ Error registrando uso: {e}")
+            background_tasks.add_task(
+                usage_service.record_usage,
+                user_id=current_user["id"],
+                query_text=query_request.question,
+                response_time=response_time,
+                tokens_used=result.get("tokens_used", 0)
+            )
         
         # Convertir el resultado al formato esperado por el frontend (optimizado)
         sources = []
@@ -106,7 +368,7 @@ async def make_legal_query(
         if result.get("related_queries"):
             suggestions = result["related_queries"][:2]  # Solo 2 sugerencias
         
-        return QueryResponse(
+        response = QueryResponse(
             answer=result.get("answer", "No se pudo generar una respuesta."),
             confidence=result.get("confidence", 0.5),
             sources=sources,
@@ -115,25 +377,29 @@ async def make_legal_query(
             tokens_used=result.get("tokens_used", 0)
         )
         
-    except Exception as e:
-        error_time = int((time.time() - start_time) * 1000)
-        print(f"❌ Error en endpoint query: {e}")
+        # Guardar en caché semántico solo respuestas exitosas
+        if cacheable and not result.get("error"):
+            await semantic_cache.set(
+                query_request.question,
+                question_embedding,
+                response,
+                result.get("sources", []),
+                profile
+            )
         
-        return QueryResponse(
-            answer="Lo siento, ocurrió un error al procesar tu consulta. Por favor intenta nuevamente.",
-            confidence=0.0,
-            sources=[],
-            category="Error",
-            suggestions=[],
-            tokens_used=0
-        )
+        return response
+        
+    except Exception:
+        logger.exception("❌ Error en endpoint query")
+        return _ERROR_RESPONSE
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat_with_ai(
-    message: str = Form(...),
+    background_tasks: BackgroundTasks,
+    message: str = Form(..., max_length=CHAT_CONFIG["max_message_length"]),
     file: UploadFile = File(None),
     use_uploaded_docs: bool = Form(True),
-    current_user: dict = Depends(get_current_user_optional)
+    ctx: RequestContext = Depends(get_request_context)
 ):
     """
     💬 Chat con IA legal (compatible con frontend)
@@ -142,88 +408,56 @@ async def chat_with_ai(
     Compatible con el componente ChatInterface del frontend.
     """
     
-    if len(message) > 1000:
-        raise HTTPException(
-            status_code=400,
-            detail="El mensaje no puede exceder 1000 caracteres"
-        )
-    
-    # Verificar límites de uso si está autenticado
-    if current_user:
-        try:
-            usage_limits = await usage_service.check_usage_limits(current_user["id"])
-            if usage_limits.is_daily_exceeded:
-                raise HTTPException(
-                    status_code=429,
-                    detail=f"Has excedido el límite diario de {usage_limits.daily_limit} consultas."
-                )
-        except Exception as e:
-            print(f"⚠️ Error verificando límites: {e}")
+    current_user = ctx.user
+    user_documents = ctx.documents if use_uploaded_docs else []
     
     # Procesar archivo si se subió
     file_info = None
     if file:
         try:
-            file_content = await file.read()
-            file_info = await chat_service.process_file_in_chat(
-                file_content=file_content,
-                file_name=file.filename,
-                file_type=file.content_type
-            )
-            print(f"📄 Archivo procesado: {file.filename} ({len(file_content)} bytes)")
+            file_info = await chat_service.process_file_in_chat(file)
+            logger.debug("📄 Archivo procesado: %s (%s bytes)", file.filename, file_info["size"])
         except Exception as e:
-            print(f"⚠️ Error procesando archivo: {e}")
+            logger.warning("⚠️ Error procesando archivo: %s", e)
             raise HTTPException(
                 status_code=400,
                 detail=f"Error procesando archivo: {str(e)}"
             )
     
-    # Obtener documentos del usuario
-    user_documents = []
-    if current_user and use_uploaded_docs:
-        try:
-            user_documents = document_service.get_user_documents(current_user["id"])
-            user_documents = [doc for doc in user_documents if doc.get("status") == "ready"][:3]
-        except Exception as e:
-            print(f"⚠️ Error obteniendo documentos: {e}")
-    
     try:
         # Realizar consulta usando el servicio RAG
         result = await rag_service.query(
             question=message,
-            context=f"Archivo adjunto: {file_info['name'] if file_info else 'Ninguno'}",
+            context=_file_context(file_info),
             user_info=current_user,
             user_documents=user_documents
         )
         
+        # Una sola marca de tiempo para todos los mensajes de la petición
+        now_iso = datetime.now().isoformat()
+        
         # Crear mensaje de respuesta
         assistant_message = ChatMessage(
-            id=str(uuid.uuid4()),
+            id=_new_message_id(),
             content=result.get("answer", "No se pudo generar una respuesta."),
             sender="assistant",
-            timestamp=datetime.now().isoformat(),
+            timestamp=now_iso,
             type="legal-advice"
         )
         
-        # Guardar mensajes en el historial si está autenticado
+        # Guardar mensajes en el historial si está autenticado (después de responder)
         if current_user:
-            try:
-                # Guardar mensaje del usuario
-                user_message = ChatMessage(
-                    id=str(uuid.uuid4()),
-                    content=message,
-                    sender="user",
-                    timestamp=datetime.now().isoformat(),
-                    type="text",
-                    fileName=file_info["name"] if file_info else None
-                )
-                await chat_service.save_message(current_user["id"], user_message)
-                
-                # Guardar respuesta del asistente
-                await chat_service.save_message(current_user["id"], assistant_message)
-                
-            except Exception as e:
-                print(f"⚠️ Error guardando mensajes: {e}")
+            user_message = ChatMessage(
+                id=_new_message_id(),
+                content=message,
+                sender="user",
+                timestamp=now_iso,
+                type="text",
+                fileName=file_info["name"] if file_info else None
+            )
+            background_tasks.add_task(
+                chat_service.save_messages_bulk, current_user["id"], [user_message, assistant_message]
+            )
         
         # Generar sugerencias relacionadas
         suggestions = []
@@ -236,17 +470,15 @@ async def chat_with_ai(
                 context=message
             )
         
-        # Registrar uso si está autenticado
+        # Registrar uso si está autenticado (después de responder)
         if current_user:
-            try:
-                await usage_service.record_usage(
-                    user_id=current_user["id"],
-                    query_text=message,
-                    response_time=0,  # Se calcularía en implementación real
-                    tokens_used=result.get("tokens_used", 0)
-                )
-            except Exception as e:
-                print(f"⚠️ Error registrando uso: {e}")
+            background_tasks.add_task(
+                usage_service.record_usage,
+                user_id=current_user["id"],
+                query_text=message,
+                response_time=0,  # Se calcularía en implementación real
+                tokens_used=result.get("tokens_used", 0)
+            )
         
         return ChatResponse(
             message=assistant_message,
@@ -255,11 +487,11 @@ async def chat_with_ai(
             sources=result.get("sources", [])
         )
         
-    except Exception as e:
-        print(f"❌ Error en endpoint chat: {e}")
+    except Exception:
+        logger.exception("❌ Error en endpoint chat")
         
         error_message = ChatMessage(
-            id=str(uuid.uuid4()),
+            id=_new_message_id(),
             content="Lo siento, ocurrió un error al procesar tu consulta. Por favor intenta nuevamente.",
             sender="assistant",
             timestamp=datetime.now().isoformat(),
@@ -275,10 +507,10 @@ async def chat_with_ai(
 
 @router.post("/chat/stream")
 async def chat_stream(
-    message: str = Form(...),
+    message: str = Form(..., max_length=CHAT_CONFIG["max_message_length"]),
     file: UploadFile = File(None),
     use_uploaded_docs: bool = Form(True),
-    current_user: dict = Depends(get_current_user_optional)
+    ctx: RequestContext = Depends(get_request_context)
 ):
     """
     💬 Chat con streaming (para respuestas en tiempo real)
@@ -287,123 +519,92 @@ async def chat_stream(
     Compatible con el frontend para respuestas en tiempo real.
     """
     
-    if len(message) > 1000:
-        raise HTTPException(
-            status_code=400,
-            detail="El mensaje no puede exceder 1000 caracteres"
-        )
-    
-    # Verificar límites de uso si está autenticado
-    if current_user:
-        try:
-            usage_limits = await usage_service.check_usage_limits(current_user["id"])
-            if usage_limits.is_daily_exceeded:
-                raise HTTPException(
-                    status_code=429,
-                    detail=f"Has excedido el límite diario de {usage_limits.daily_limit} consultas."
-                )
-        except Exception as e:
-            print(f"⚠️ Error verificando límites: {e}")
+    current_user = ctx.user
+    user_documents = ctx.documents if use_uploaded_docs else []
     
     # Procesar archivo si se subió
     file_info = None
     if file:
         try:
-            file_content = await file.read()
-            file_info = await chat_service.process_file_in_chat(
-                file_content=file_content,
-                file_name=file.filename,
-                file_type=file.content_type
-            )
-            print(f"📄 Archivo procesado en streaming: {file.filename}")
+            file_info = await chat_service.process_file_in_chat(file)
+            logger.debug("📄 Archivo procesado en streaming: %s", file.filename)
         except Exception as e:
-            print(f"⚠️ Error procesando archivo: {e}")
+            logger.warning("⚠️ Error procesando archivo: %s", e)
             raise HTTPException(
                 status_code=400,
                 detail=f"Error procesando archivo: {str(e)}"
             )
     
-    # Obtener documentos del usuario
-    user_documents = []
-    if current_user and use_uploaded_docs:
-        try:
-            user_documents = document_service.get_user_documents(current_user["id"])
-            user_documents = [doc for doc in user_documents if doc.get("status") == "ready"][:3]
-        except Exception as e:
-            print(f"⚠️ Error obteniendo documentos: {e}")
-    
-    message_id = str(uuid.uuid4())
+    message_id = _new_message_id()
+    user_message_id = _new_message_id()
     
     async def generate_stream():
+        # Confirmar de inmediato para que el frontend muestre el mensaje sin esperar al LLM
+        yield b"data: " + orjson.dumps({"content": "", "is_complete": False, "message_id": message_id, "confidence": None}) + b"\n\n"
+        
         try:
-            # Crear respuesta usando el servicio de chat
-            response_text = await chat_service.create_streaming_response(message, file_info)
-            
-            # Dividir la respuesta en chunks para simular streaming
-            words = response_text.split()
-            chunk_size = 3
-            chunks = [' '.join(words[i:i+chunk_size]) for i in range(0, len(words), chunk_size)]
+            # Reenviar los tokens del LLM a medida que llegan
+            buffer = []
+            async for token in _with_keepalive(rag_service.stream_query(
+                question=message,
+                context=_file_context(file_info),
+                user_info=current_user,
+                user_documents=user_documents
+            )):
+                if token is None:
+                    yield _SSE_KEEPALIVE
+                    continue
+                buffer.append(token)
+                yield b"data: " + orjson.dumps({"content": token, "is_complete": False, "message_id": message_id, "confidence": None}) + b"\n\n"
             
-            for i, chunk in enumerate(chunks):
-                is_complete = i == len(chunks) - 1
-                
-                stream_response = StreamingChatResponse(
-                    content=chunk + (" " if not is_complete else ""),
-                    is_complete=is_complete,
-                    message_id=message_id,
-                    confidence=0.8 if is_complete else None
-                )
-                
-                yield f"data: {json.dumps(stream_response.dict())}\n\n"
-                
-                # Simular delay para streaming real
-                import asyncio
-                await asyncio.sleep(0.1)
+            response_text = "".join(buffer)
+            final_response = StreamingChatResponse(
+                content="",
+                is_complete=True,
+                message_id=message_id,
+                confidence=0.8
+            )
+            yield b"data: " + orjson.dumps(final_response.model_dump()) + b"\n\n"
             
-            # Guardar en historial si está autenticado
+            # Guardar en historial si está autenticado (sin retrasar el cierre del stream)
             if current_user:
-                try:
-                    # Guardar mensaje del usuario
-                    user_message = ChatMessage(
-                        id=str(uuid.uuid4()),
-                        content=message,
-                        sender="user",
-                        timestamp=datetime.now().isoformat(),
-                        type="text",
-                        fileName=file_info["name"] if file_info else None
-                    )
-                    await chat_service.save_message(current_user["id"], user_message)
-                    
-                    # Guardar respuesta del asistente
-                    assistant_message = ChatMessage(
-                        id=message_id,
-                        content=response_text,
-                        sender="assistant",
-                        timestamp=datetime.now().isoformat(),
-                        type="legal-advice"
-                    )
-                    await chat_service.save_message(current_user["id"], assistant_message)
-                    
-                except Exception as e:
-                    print(f"⚠️ Error guardando mensajes en streaming: {e}")
+                now_iso = datetime.now().isoformat()
+                user_message = ChatMessage(
+                    id=user_message_id,
+                    content=message,
+                    sender="user",
+                    timestamp=now_iso,
+                    type="text",
+                    fileName=file_info["name"] if file_info else None
+                )
+                assistant_message = ChatMessage(
+                    id=message_id,
+                    content=response_text,
+                    sender="assistant",
+                    timestamp=now_iso,
+                    type="legal-advice"
+                )
+                _run_in_background(
+                    _save_messages_safely(current_user["id"], [user_message, assistant_message])
+                )
             
-        except Exception as e:
-            print(f"❌ Error en streaming: {e}")
+        except Exception:
+            logger.exception("❌ Error en streaming")
             error_response = StreamingChatResponse(
                 content="Lo siento, ocurrió un error al procesar tu consulta.",
                 is_complete=True,
                 message_id=message_id,
                 confidence=0.0
             )
-            yield f"data: {json.dumps(error_response.dict())}\n\n"
+            yield b"data: " + orjson.dumps(error_response.model_dump()) + b"\n\n"
     
     return StreamingResponse(
         generate_stream(),
-        media_type="text/plain",
+        media_type="text/event-stream",
         headers={
-            "Cache-Control": "no-cache",
+            "Cache-Control": "no-cache, no-transform",
             "Connection": "keep-alive",
-            "Content-Type": "text/event-stream"
+            "X-Accel-Buffering": "no"  # Evitar que nginx acumule los eventos
         }
     )
 
@@ -433,7 +634,7 @@ async def get_chat_history(
         return history
         
     except Exception as e:
-        print(f"❌ Error obteniendo historial: {e}")
+        logger.error("❌ Error obteniendo historial: %s", e)
         raise HTTPException(
             status_code=500,
             detail="Error al obtener el historial de chat"
@@ -470,12 +671,36 @@ async def clear_chat_history(
             )
         
     except Exception as e:
-        print(f"❌ Error limpiando historial: {e}")
+        logger.error("❌ Error limpiando historial: %s", e)
         raise HTTPException(
             status_code=500,
             detail="Error al limpiar el historial de chat"
         )
 
+# Las sugerencias solo dependen del contexto, que se repite mucho entre sesiones
+SUGGESTIONS_CACHE_SIZE = 4096
+SUGGESTIONS_CACHE_TTL = CACHE_CONFIG["ttl_presets"]["medium"]
+_suggestions_cache: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+
+async def _get_cached_suggestions(user_id: str, context: Optional[str]) -> List[str]:
+    """Obtener sugerencias desde un caché LRU con TTL indexado por contexto"""
+    key = context or ""
+    cached = _suggestions_cache.get(key)
+    if cached is not None:
+        expires_at, suggestions = cached
+        if time.monotonic() < expires_at:
+            _suggestions_cache.move_to_end(key)
+            return suggestions
+        del _suggestions_cache[key]
+    
+    suggestions = await chat_service.get_suggestions(user_id, context)
+    # get_suggestions devuelve [] cuando falla: no fijar un fallo transitorio
+    if suggestions:
+        _suggestions_cache[key] = (time.monotonic() + SUGGESTIONS_CACHE_TTL, suggestions)
+        if len(_suggestions_cache) > SUGGESTIONS_CACHE_SIZE:
+            _suggestions_cache.popitem(last=False)
+    return suggestions
+
 @router.get("/chat/suggestions")
 async def get_chat_suggestions(
     context: str = None,
@@ -489,7 +714,7 @@ async def get_chat_suggestions(
     
     try:
         user_id = current_user["id"] if current_user else "anonymous"
-        suggestions = await chat_service.get_suggestions(user_id, context)
+        suggestions = await _get_cached_suggestions(user_id, context)
         
         return {
             "suggestions": suggestions,
@@ -498,7 +723,7 @@ async def get_chat_suggestions(
         }
         
     except Exception as e:
-        print(f"❌ Error obteniendo sugerencias: {e}")
+        logger.error("❌ Error obteniendo sugerencias: %s", e)
         raise HTTPException(
             status_code=500,
             detail="Error al obtener sugerencias"
@@ -530,7 +755,7 @@ async def get_chat_stats(
         }
         
     except Exception as e:
-        print(f"❌ Error obteniendo estadísticas: {e}")
+        logger.error("❌ Error obteniendo estadísticas: %s", e)
         raise HTTPException(
             status_code=500,
             detail="Error al obtener estadísticas del chat"
@@ -557,55 +782,7 @@ async def get_query_suggestions():
     - Para mostrar las capacidades del sistema
     - Para onboarding de nuevos usuarios
     """
-    # Convertir al formato esperado por el frontend
-    suggestions = [
-        QuerySuggestion(
-            category="🏪 Constitución de Empresa",
-            question="¿Cómo constituir una SAS en Colombia?",
-            description="Aprende los pasos para crear una Sociedad por Acciones Simplificada"
-        ),
-        QuerySuggestion(
-            category="🏪 Constitución de Empresa",
-            question="¿Qué documentos necesito para crear mi empresa?",
-            description="Lista completa de documentos requeridos para constituir tu empresa"
-        ),
-        QuerySuggestion(
-            category="💼 Derecho Laboral",
-            question="¿Cuáles son las prestaciones sociales obligatorias?",
-            description="Conoce todas las prestaciones que debes pagar a tus empleados"
-        ),
-        QuerySuggestion(
-            category="💼 Derecho Laboral",
-            question="¿Cómo calcular la liquidación de un empleado?",
-            description="Guía paso a paso para calcular la liquidación laboral"
-        ),
-        QuerySuggestion(
-            category="🏛️ Obligaciones Tributarias",
-            question="¿Cómo presentar la declaración de renta?",
-            description="Proceso completo para presentar tu declaración de renta"
-        ),
-        QuerySuggestion(
-            category="🏛️ Obligaciones Tributarias",
-            question="¿Cuál régimen tributario me conviene?",
-            description="Análisis de los diferentes regímenes tributarios para PyMEs"
-        ),
-        QuerySuggestion(
-            category="🏢 Contratos Comerciales",
-            question="¿Cómo redactar un contrato comercial?",
-            description="Elementos esenciales que debe tener tu contrato comercial"
-        ),
-        QuerySuggestion(
-            category="🏢 Contratos Comerciales",
-            question="¿Qué cláusulas debe tener un contrato de servicios?",
-            description="Cláusulas importantes para proteger tu negocio"
-        )
-    ]
-    
-    return QuerySuggestionsResponse(
-        suggestions=suggestions,
-        total_categories=4,
-        message="Consultas comunes para PyMEs colombianas"
-    )
+    return Response(content=_STATIC_SUGGESTIONS_JSON, media_type="application/json")
 
 @router.get("/examples", response_model=QueryExamplesResponse)
 async def get_example_queries():
@@ -642,88 +819,7 @@ async def get_query_categories():
     Lista las categorías principales de consultas legales
     que maneja LegalGPT, optimizadas para PyMEs colombianas.
     """
-    categories = [
-        {
-            "id": "business_formation",
-            "name": "🏪 Constitución de Empresa",
-            "description": "Creación de empresas, tipos societarios, trámites legales",
-            "topics": [
-                "Sociedad por Acciones Simplificada (SAS)",
-                "Sociedad Limitada (Ltda)",
-                "Trámites en Cámara de Comercio",
-                "Documentos requeridos",
-                "Costos y tiempos"
-            ],
-            "complexity": "Media",
-            "estimated_response_time": "2-3 minutos"
-        },
-        {
-            "id": "labor_law",
-            "name": "💼 Derecho Laboral",
-            "description": "Contratos laborales, prestaciones sociales, liquidaciones",
-            "topics": [
-                "Contratos de trabajo",
-                "Prestaciones sociales",
-                "Liquidación laboral",
-                "Jornadas de trabajo",
-                "Despidos y terminaciones"
-            ],
-            "complexity": "Alta",
-            "estimated_response_time": "3-4 minutos"
-        },
-        {
-            "id": "tax_obligations",
-            "name": "🏛️ Obligaciones Tributarias",
-            "description": "Impuestos, declaraciones, régimen tributario para PyMEs",
-            "topics": [
-                "Régimen Simple de Tributación",
-                "Declaración de renta",
-                "IVA y retenciones",
-                "Sanciones tributarias",
-                "Beneficios para PyMEs"
-            ],
-            "complexity": "Alta",
-            "estimated_response_time": "3-5 minutos"
-        },
-        {
-            "id": "commercial_contracts",
-            "name": "🏢 Contratos Comerciales",
-            "description": "Contratos de servicios, compraventa, cláusulas importantes",
-            "topics": [
-                "Contratos de servicios",
-                "Compraventa comercial",
-                "Cláusulas de exclusividad",
-                "Terminación de contratos",
-                "Protección de intereses"
-            ],
-            "complexity": "Media-Alta",
-            "estimated_response_time": "2-4 minutos"
-        },
-        {
-            "id": "document_analysis",
-            "name": "📄 Análisis de Documentos",
-            "description": "Revisión y análisis de contratos y documentos legales subidos",
-            "topics": [
-                "Análisis de riesgos",
-                "Identificación de cláusulas problemáticas",
-                "Recomendaciones de mejora",
-                "Comparación con estándares",
-                "Alertas legales"
-            ],
-            "complexity": "Alta",
-            "estimated_response_time": "4-6 minutos",
-            "requires_authentication": True,
-            "requires_documents": True
-        }
-    ]
-    
-    return {
-        "categories": categories,
-        "total_categories": len(categories),
-        "note": "Todas las consultas están optimizadas para PyMEs colombianas",
-        "supported_languages": ["Español (Colombia)"],
-        "legal_jurisdiction": "Colombia"
-    }
+    return Response(content=_STATIC_CATEGORIES_JSON, media_type="application/json")
 
 @router.get("/health")
 async def rag_health_check():
@@ -733,14 +829,9 @@ async def rag_health_check():
     Verifica el estado de los servicios de IA y las dependencias
     necesarias para el funcionamiento de las consultas.
     """
-    import os
-    
-    # Verificar configuración
-    openai_configured = bool(os.getenv("OPENAI_API_KEY"))
-    
     # Verificar servicios
     services_status = {
-        "openai": "✅ Configurado" if openai_configured else "❌ No configurado",
+        "openai": "✅ Configurado" if _OPENAI_CONFIGURED else "❌ No configurado",
         "document_processing": "✅ Disponible",
         "prompts": "✅ Cargados",
         "user_context": "✅ Disponible"
@@ -818,14 +909,13 @@ async def get_performance_metrics():
     Proporciona información sobre el rendimiento actual
     del sistema RAG y las optimizaciones aplicadas.
     """
-    from core.config import PERFORMANCE_CONFIG, CACHE_CONFIG
-    
     # Obtener estadísticas del caché
     cache_stats = {
         "enabled": CACHE_CONFIG["enabled"],
         "size": len(rag_service.response_generator.response_cache),
         "max_size": CACHE_CONFIG["max_size"],
-        "hit_rate": "N/A"  # Se podría implementar tracking de hit rate
+        "hit_rate": "N/A",  # Se podría implementar tracking de hit rate
+        "semantic": semantic_cache.get_stats()
     }
     
     # Obtener estadísticas del vectorstore
@@ -6,370 +6,354 @@ del sistema LegalGPT.
 """
 
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, HTTPException, Depends, Query, Body
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Depends, Query, Body, BackgroundTasks, Request
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+import hashlib
+import orjson
+from functools import lru_cache
 
 from models.notifications import (
     NotificationCreate, NotificationResponse, NotificationUpdate,
-    NotificationListResponse, NotificationSearchRequest, NotificationStats,
+    NotificationSearchRequest,
     NotificationSettings, NotificationBulkAction, NotificationTemplate,
     NotificationType, NotificationPriority, NotificationStatus, NotificationAction
 )
 from services.notifications.notification_service import NotificationService
-from services.auth.auth_middleware import require_auth, require_usage_check
-from services.monitoring.error_handler import log_error, ErrorType
+from services.auth.auth_middleware import get_authenticated_user, require_admin
+from services.monitoring.error_handler import ErrorType, ClassifiedErrorRoute, classify_errors
 
-router = APIRouter()
-notification_service = NotificationService()
+router = APIRouter(default_response_class=ORJSONResponse, route_class=ClassifiedErrorRoute)
+
+def get_notification_service(request: Request) -> NotificationService:
+    """Obtener el servicio de notificaciones creado en el lifespan de la aplicación"""
+    return request.app.state.notification_service
+
+# Catálogos estáticos: se serializan una sola vez al cargar el módulo
+def _enum_options(enum_cls) -> List[Dict[str, str]]:
+    return [{"value": item.value, "label": item.name} for item in enum_cls]
+
+_NOTIFICATION_CATEGORIES = [
+    "documentos", "firmas", "chat", "sistema", "seguridad", 
+    "recordatorios", "logros", "actualizaciones", "generador", "templates"
+]
+
+# Tipo de metadato -> (clave del payload, valores)
+_METADATA = {
+    "types": ("types", _enum_options(NotificationType)),
+    "priorities": ("priorities", _enum_options(NotificationPriority)),
+    "status-options": ("status_options", _enum_options(NotificationStatus)),
+    "actions": ("actions", _enum_options(NotificationAction)),
+    "categories": ("categories", _NOTIFICATION_CATEGORIES),
+}
+_METADATA_JSON = {kind: orjson.dumps({key: values}) for kind, (key, values) in _METADATA.items()}
+_METADATA_ETAGS = {kind: f'"{hashlib.sha1(body).hexdigest()}"' for kind, body in _METADATA_JSON.items()}
+# Los catálogos solo cambian con un despliegue
+_METADATA_CACHE_CONTROL = "public, max-age=86400, immutable"
+
+# Máximo de destinatarios por creación masiva desde template
+MAX_BULK_RECIPIENTS = 1000
+
+@lru_cache(maxsize=1)
+def _templates_json(notification_service: NotificationService, version: int) -> bytes:
+    """Templates serializados; la versión en la clave invalida la entrada al modificarlos"""
+    return orjson.dumps([template.model_dump() for template in notification_service.get_templates()])
+
+def _metadata_response(request: Request, kind: str) -> Response:
+    """Respuesta cacheable (ETag + Cache-Control) para un catálogo de notificaciones"""
+    etag = _METADATA_ETAGS[kind]
+    headers = {"ETag": etag, "Cache-Control": _METADATA_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=_METADATA_JSON[kind], media_type="application/json", headers=headers)
 
 @router.post("/", response_model=NotificationResponse, summary="Crear notificación")
-@require_auth()
-@require_usage_check()
+@classify_errors(ErrorType.NOTIFICATION_CREATION, "Error al crear la notificación")
 async def create_notification(
     notification_data: NotificationCreate,
-    current_user: Dict = Depends(require_auth)
+    notification_service: NotificationService = Depends(get_notification_service),
+    current_user: Dict = Depends(get_authenticated_user)
 ):
     """Crear una nueva notificación"""
-    try:
-        # Asignar el user_id del usuario autenticado
-        notification_data.user_id = current_user["user_id"]
-        
-        notification = notification_service.create_notification(notification_data)
-        return notification
-        
-    except Exception as e:
-        log_error(e, ErrorType.NOTIFICATION_CREATION, context={"user_id": current_user["user_id"]})
-        raise HTTPException(status_code=500, detail="Error al crear la notificación")
-
-@router.get("/", response_model=NotificationListResponse, summary="Listar notificaciones")
-@require_auth()
+    # Asignar el user_id del usuario autenticado
+    notification_data.user_id = current_user["id"]
+    
+    notification = notification_service.create_notification(notification_data)
+    return notification
+
+@router.get("/", summary="Listar notificaciones")
+@classify_errors(ErrorType.NOTIFICATION_LIST, "Error al listar notificaciones")
 async def list_notifications(
     type: Optional[NotificationType] = Query(None, description="Filtrar por tipo"),
     status: Optional[NotificationStatus] = Query(None, description="Filtrar por estado"),
     priority: Optional[NotificationPriority] = Query(None, description="Filtrar por prioridad"),
     category: Optional[str] = Query(None, description="Filtrar por categoría"),
     search: Optional[str] = Query(None, description="Buscar en título y mensaje"),
-    page: int = Query(1, ge=1, description="Página"),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto en next_cursor de la página anterior"),
     per_page: int = Query(20, ge=1, le=100, description="Elementos por página"),
-    current_user: Dict = Depends(require_auth)
+    include_total: bool = Query(False, description="Incluir el total de resultados"),
+    notification_service: NotificationService = Depends(get_notification_service),
+    current_user: Dict = Depends(get_authenticated_user)
 ):
     """Listar notificaciones del usuario con filtros"""
+    # Los parámetros ya fueron validados por Query; evitar validarlos de nuevo
+    search_request = NotificationSearchRequest.model_construct(
+        type=type,
+        status=status,
+        priority=priority,
+        category=category,
+        search=search,
+        cursor=cursor,
+        per_page=per_page,
+        include_total=include_total
+    )
+    
     try:
-        search_request = NotificationSearchRequest(
-            type=type,
-            status=status,
-            priority=priority,
-            category=category,
-            search=search,
-            page=page,
-            per_page=per_page
-        )
-        
-        result = notification_service.list_notifications(current_user["user_id"], search_request)
-        return result
-        
-    except Exception as e:
-        log_error(e, ErrorType.NOTIFICATION_LIST, context={"user_id": current_user["user_id"]})
-        raise HTTPException(status_code=500, detail="Error al listar notificaciones")
-
-@router.get("/{notification_id}", response_model=NotificationResponse, summary="Obtener notificación")
-@require_auth()
-async def get_notification(
-    notification_id: str,
-    current_user: Dict = Depends(require_auth)
-):
-    """Obtener una notificación específica"""
-    try:
-        notification = notification_service.get_notification(notification_id, current_user["user_id"])
-        if not notification:
-            raise HTTPException(status_code=404, detail="Notificación no encontrada")
-        
-        return notification
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        log_error(e, ErrorType.NOTIFICATION_RETRIEVAL, context={"notification_id": notification_id})
-        raise HTTPException(status_code=500, detail="Error al obtener la notificación")
-
-@router.put("/{notification_id}", response_model=NotificationResponse, summary="Actualizar notificación")
-@require_auth()
-async def update_notification(
-    notification_id: str,
-    update_data: NotificationUpdate,
-    current_user: Dict = Depends(require_auth)
-):
-    """Actualizar una notificación"""
-    try:
-        notification = notification_service.update_notification(
-            notification_id, current_user["user_id"], update_data
-        )
-        if not notification:
-            raise HTTPException(status_code=404, detail="Notificación no encontrada")
-        
-        return notification
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        log_error(e, ErrorType.NOTIFICATION_UPDATE, context={"notification_id": notification_id})
-        raise HTTPException(status_code=500, detail="Error al actualizar la notificación")
-
-@router.delete("/{notification_id}", summary="Eliminar notificación")
-@require_auth()
-async def delete_notification(
-    notification_id: str,
-    current_user: Dict = Depends(require_auth)
-):
-    """Eliminar una notificación"""
-    try:
-        success = notification_service.delete_notification(notification_id, current_user["user_id"])
-        if not success:
-            raise HTTPException(status_code=404, detail="Notificación no encontrada")
-        
-        return {"message": "Notificación eliminada exitosamente"}
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        log_error(e, ErrorType.NOTIFICATION_DELETION, context={"notification_id": notification_id})
-        raise HTTPException(status_code=500, detail="Error al eliminar la notificación")
+        result = notification_service.list_notifications(current_user["id"], search_request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return ORJSONResponse(result.model_dump())
 
 @router.post("/mark-read", summary="Marcar notificaciones como leídas")
-@require_auth()
+@classify_errors(ErrorType.NOTIFICATION_MARK_READ, "Error al marcar notificaciones como leídas")
 async def mark_notifications_read(
     notification_ids: List[str] = Body(..., description="IDs de notificaciones"),
-    current_user: Dict = Depends(require_auth)
+    notification_service: NotificationService = Depends(get_notification_service),
+    current_user: Dict = Depends(get_authenticated_user)
 ):
     """Marcar notificaciones como leídas"""
-    try:
-        success = notification_service.mark_as_read(notification_ids, current_user["user_id"])
-        if not success:
-            raise HTTPException(status_code=400, detail="No se pudieron marcar las notificaciones")
-        
-        return {"message": "Notificaciones marcadas como leídas"}
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        log_error(e, ErrorType.NOTIFICATION_MARK_READ, context={"user_id": current_user["user_id"]})
-        raise HTTPException(status_code=500, detail="Error al marcar notificaciones como leídas")
+    success = notification_service.mark_as_read(notification_ids, current_user["id"])
+    if not success:
+        raise HTTPException(status_code=400, detail="No se pudieron marcar las notificaciones")
+    
+    return {"message": "Notificaciones marcadas como leídas"}
 
 @router.post("/mark-all-read", summary="Marcar todas las notificaciones como leídas")
-@require_auth()
+@classify_errors(ErrorType.NOTIFICATION_MARK_ALL_READ, "Error al marcar todas las notificaciones como leídas")
 async def mark_all_notifications_read(
-    current_user: Dict = Depends(require_auth)
+    notification_service: NotificationService = Depends(get_notification_service),
+    current_user: Dict = Depends(get_authenticated_user)
 ):
     """Marcar todas las notificaciones del usuario como leídas"""
-    try:
-        success = notification_service.mark_all_as_read(current_user["user_id"])
-        if not success:
-            return {"message": "No hay notificaciones para marcar como leídas"}
-        
-        return {"message": "Todas las notificaciones marcadas como leídas"}
-        
-    except Exception as e:
-        log_error(e, ErrorType.NOTIFICATION_MARK_ALL_READ, context={"user_id": current_user["user_id"]})
-        raise HTTPException(status_code=500, detail="Error al marcar todas las notificaciones como leídas")
-
-@router.get("/stats/summary", response_model=NotificationStats, summary="Estadísticas de notificaciones")
-@require_auth()
+    success = notification_service.mark_all_as_read(current_user["id"])
+    if not success:
+        return {"message": "No hay notificaciones para marcar como leídas"}
+    
+    return {"message": "Todas las notificaciones marcadas como leídas"}
+
+@router.get("/stats/summary", summary="Estadísticas de notificaciones")
+@classify_errors(ErrorType.NOTIFICATION_STATS, "Error al obtener estadísticas de notificaciones")
 async def get_notification_stats(
-    current_user: Dict = Depends(require_auth)
+    notification_service: NotificationService = Depends(get_notification_service),
+    current_user: Dict = Depends(get_authenticated_user)
 ):
     """Obtener estadísticas de notificaciones del usuario"""
-    try:
-        stats = notification_service.get_notification_stats(current_user["user_id"])
-        return stats
-        
-    except Exception as e:
-        log_error(e, ErrorType.NOTIFICATION_STATS, context={"user_id": current_user["user_id"]})
-        raise HTTPException(status_code=500, detail="Error al obtener estadísticas de notificaciones")
+    stats = notification_service.get_notification_stats(current_user["id"])
+    return ORJSONResponse(stats.model_dump(mode="json"))
 
 @router.get("/settings", response_model=NotificationSettings, summary="Obtener configuración de notificaciones")
-@require_auth()
+@classify_errors(ErrorType.NOTIFICATION_SETTINGS_RETRIEVAL, "Error al obtener configuración de notificaciones")
 async def get_notification_settings(
-    current_user: Dict = Depends(require_auth)
+    request: Request,
+    notification_service: NotificationService = Depends(get_notification_service),
+    current_user: Dict = Depends(get_authenticated_user)
 ):
     """Obtener configuración de notificaciones del usuario"""
-    try:
-        settings = notification_service.get_user_settings(current_user["user_id"])
-        return settings
-        
-    except Exception as e:
-        log_error(e, ErrorType.NOTIFICATION_SETTINGS_RETRIEVAL, context={"user_id": current_user["user_id"]})
-        raise HTTPException(status_code=500, detail="Error al obtener configuración de notificaciones")
+    version_key = f"{current_user['id']}:{notification_service.get_settings_version(current_user['id'])}"
+    etag = f'W/"{hashlib.md5(version_key.encode()).hexdigest()}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    settings = notification_service.get_user_settings(current_user["id"])
+    return ORJSONResponse(settings.model_dump(mode="json"), headers={"ETag": etag})
 
 @router.put("/settings", response_model=NotificationSettings, summary="Actualizar configuración de notificaciones")
-@require_auth()
+@classify_errors(ErrorType.NOTIFICATION_SETTINGS_UPDATE, "Error al actualizar configuración de notificaciones")
 async def update_notification_settings(
     settings: NotificationSettings,
-    current_user: Dict = Depends(require_auth)
+    notification_service: NotificationService = Depends(get_notification_service),
+    current_user: Dict = Depends(get_authenticated_user)
 ):
     """Actualizar configuración de notificaciones del usuario"""
-    try:
-        updated_settings = notification_service.update_user_settings(current_user["user_id"], settings)
-        return updated_settings
-        
-    except Exception as e:
-        log_error(e, ErrorType.NOTIFICATION_SETTINGS_UPDATE, context={"user_id": current_user["user_id"]})
-        raise HTTPException(status_code=500, detail="Error al actualizar configuración de notificaciones")
+    updated_settings = notification_service.update_user_settings(current_user["id"], settings)
+    return updated_settings
 
 @router.post("/bulk-action", summary="Acción masiva en notificaciones")
-@require_auth()
+@classify_errors(ErrorType.NOTIFICATION_BULK_ACTION, "Error al realizar acción masiva")
 async def bulk_action_notifications(
     bulk_action: NotificationBulkAction,
-    current_user: Dict = Depends(require_auth)
+    notification_service: NotificationService = Depends(get_notification_service),
+    current_user: Dict = Depends(get_authenticated_user)
 ):
     """Realizar acción masiva en notificaciones"""
-    try:
-        success = notification_service.bulk_action(current_user["user_id"], bulk_action)
-        if not success:
-            raise HTTPException(status_code=400, detail="No se pudo realizar la acción masiva")
-        
-        return {"message": f"Acción '{bulk_action.action}' realizada exitosamente"}
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        log_error(e, ErrorType.NOTIFICATION_BULK_ACTION, context={"user_id": current_user["user_id"]})
-        raise HTTPException(status_code=500, detail="Error al realizar acción masiva")
+    affected = notification_service.bulk_action(current_user["id"], bulk_action)
+    if not affected:
+        raise HTTPException(status_code=400, detail="No se pudo realizar la acción masiva")
+    
+    return {"message": f"Acción '{bulk_action.action}' realizada exitosamente", "affected": affected}
 
 @router.get("/templates", response_model=List[NotificationTemplate], summary="Obtener templates de notificaciones")
-@require_auth()
+@classify_errors(ErrorType.NOTIFICATION_TEMPLATES_RETRIEVAL, "Error al obtener templates de notificaciones")
 async def get_notification_templates(
-    current_user: Dict = Depends(require_auth)
+    request: Request,
+    notification_service: NotificationService = Depends(get_notification_service),
+    current_user: Dict = Depends(get_authenticated_user)
 ):
     """Obtener templates de notificaciones disponibles"""
-    try:
-        templates = notification_service.get_templates()
-        return templates
-        
-    except Exception as e:
-        log_error(e, ErrorType.NOTIFICATION_TEMPLATES_RETRIEVAL)
-        raise HTTPException(status_code=500, detail="Error al obtener templates de notificaciones")
+    etag = f'W/"templates-{notification_service.templates_version}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    return Response(
+        content=_templates_json(notification_service, notification_service.templates_version),
+        media_type="application/json",
+        headers={"ETag": etag}
+    )
 
 @router.post("/templates/{template_id}/create", response_model=NotificationResponse, summary="Crear notificación desde template")
-@require_auth()
-@require_usage_check()
+@classify_errors(ErrorType.NOTIFICATION_TEMPLATE_CREATION, "Error al crear notificación desde template")
 async def create_notification_from_template(
     template_id: str,
     variables: Dict[str, Any] = Body(..., description="Variables para el template"),
-    current_user: Dict = Depends(require_auth)
+    notification_service: NotificationService = Depends(get_notification_service),
+    current_user: Dict = Depends(get_authenticated_user)
 ):
     """Crear una notificación usando un template"""
-    try:
-        notification = notification_service.create_from_template(
-            template_id, current_user["user_id"], variables
-        )
-        if not notification:
-            raise HTTPException(status_code=404, detail="Template no encontrado")
-        
-        return notification
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        log_error(e, ErrorType.NOTIFICATION_TEMPLATE_CREATION, context={"template_id": template_id})
-        raise HTTPException(status_code=500, detail="Error al crear notificación desde template")
+    notification = notification_service.create_from_template(
+        template_id, current_user["id"], variables
+    )
+    if not notification:
+        raise HTTPException(status_code=404, detail="Template no encontrado")
+    
+    return notification
+
+@router.post("/templates/{template_id}/create-bulk", summary="Crear notificación desde template para varios usuarios")
+@classify_errors(ErrorType.NOTIFICATION_TEMPLATE_CREATION, "Error al crear notificaciones desde template")
+async def create_notifications_from_template_bulk(
+    template_id: str,
+    user_ids: List[str] = Body(..., min_length=1, max_length=MAX_BULK_RECIPIENTS, description="IDs de los usuarios destinatarios"),
+    variables: Dict[str, Any] = Body(..., description="Variables para el template"),
+    notification_service: NotificationService = Depends(get_notification_service),
+    current_user: Dict = Depends(require_admin)
+):
+    """Crear la misma notificación de template para varios usuarios (solo administradores)"""
+    created = notification_service.create_from_template_bulk(template_id, user_ids, variables)
+    if created is None:
+        raise HTTPException(status_code=404, detail="Template no encontrado")
+    
+    return {"message": "Notificaciones creadas exitosamente", "created": created}
+
+@router.get("/meta/{kind}", summary="Obtener catálogo de notificaciones")
+async def get_notification_metadata(
+    kind: str,
+    request: Request,
+    current_user: Dict = Depends(get_authenticated_user)
+):
+    """Obtener un catálogo (types, priorities, status-options, actions, categories)"""
+    if kind not in _METADATA_JSON:
+        raise HTTPException(status_code=404, detail="Catálogo no encontrado")
+    return _metadata_response(request, kind)
 
 @router.get("/types", summary="Obtener tipos de notificaciones")
-@require_auth()
 async def get_notification_types(
-    current_user: Dict = Depends(require_auth)
+    request: Request,
+    current_user: Dict = Depends(get_authenticated_user)
 ):
     """Obtener tipos de notificaciones disponibles"""
-    try:
-        types = [{"value": t.value, "label": t.name} for t in NotificationType]
-        return {"types": types}
-        
-    except Exception as e:
-        log_error(e, ErrorType.NOTIFICATION_TYPES_RETRIEVAL)
-        raise HTTPException(status_code=500, detail="Error al obtener tipos de notificaciones")
+    return _metadata_response(request, "types")
 
 @router.get("/priorities", summary="Obtener prioridades de notificaciones")
-@require_auth()
 async def get_notification_priorities(
-    current_user: Dict = Depends(require_auth)
+    request: Request,
+    current_user: Dict = Depends(get_authenticated_user)
 ):
     """Obtener prioridades de notificaciones disponibles"""
-    try:
-        priorities = [{"value": p.value, "label": p.name} for p in NotificationPriority]
-        return {"priorities": priorities}
-        
-    except Exception as e:
-        log_error(e, ErrorType.NOTIFICATION_PRIORITIES_RETRIEVAL)
-        raise HTTPException(status_code=500, detail="Error al obtener prioridades de notificaciones")
+    return _metadata_response(request, "priorities")
 
 @router.get("/status-options", summary="Obtener opciones de estado")
-@require_auth()
 async def get_notification_status_options(
-    current_user: Dict = Depends(require_auth)
+    request: Request,
+    current_user: Dict = Depends(get_authenticated_user)
 ):
     """Obtener opciones de estado de notificaciones"""
-    try:
-        status_options = [{"value": s.value, "label": s.name} for s in NotificationStatus]
-        return {"status_options": status_options}
-        
-    except Exception as e:
-        log_error(e, ErrorType.NOTIFICATION_STATUS_OPTIONS_RETRIEVAL)
-        raise HTTPException(status_code=500, detail="Error al obtener opciones de estado")
+    return _metadata_response(request, "status-options")
 
 @router.get("/actions", summary="Obtener acciones disponibles")
-@require_auth()
 async def get_notification_actions(
-    current_user: Dict = Depends(require_auth)
+    request: Request,
+    current_user: Dict = Depends(get_authenticated_user)
 ):
     """Obtener acciones disponibles para notificaciones"""
-    try:
-        actions = [{"value": a.value, "label": a.name} for a in NotificationAction]
-        return {"actions": actions}
-        
-    except Exception as e:
-        log_error(e, ErrorType.NOTIFICATION_ACTIONS_RETRIEVAL)
-        raise HTTPException(status_code=500, detail="Error al obtener acciones de notificaciones")
+    return _metadata_response(request, "actions")
 
 @router.get("/categories", summary="Obtener categorías de notificaciones")
-@require_auth()
 async def get_notification_categories(
-    current_user: Dict = Depends(require_auth)
+    request: Request,
+    current_user: Dict = Depends(get_authenticated_user)
 ):
     """Obtener categorías de notificaciones disponibles"""
-    try:
-        categories = [
-            "documentos", "firmas", "chat", "sistema", "seguridad", 
-            "recordatorios", "logros", "actualizaciones", "generador", "templates"
-        ]
-        return {"categories": categories}
-        
-    except Exception as e:
-        log_error(e, ErrorType.NOTIFICATION_CATEGORIES_RETRIEVAL)
-        raise HTTPException(status_code=500, detail="Error al obtener categorías de notificaciones")
-
-@router.post("/cleanup", summary="Limpiar notificaciones expiradas")
-@require_auth()
+    return _metadata_response(request, "categories")
+
+@router.post("/cleanup", status_code=202, summary="Limpiar notificaciones expiradas")
 async def cleanup_expired_notifications(
-    current_user: Dict = Depends(require_auth)
+    background_tasks: BackgroundTasks,
+    notification_service: NotificationService = Depends(get_notification_service),
+    current_user: Dict = Depends(get_authenticated_user)
 ):
-    """Limpiar notificaciones expiradas del sistema"""
-    try:
-        cleaned_count = notification_service.cleanup_expired_notifications()
-        return {"message": f"Se limpiaron {cleaned_count} notificaciones expiradas"}
-        
-    except Exception as e:
-        log_error(e, ErrorType.NOTIFICATION_CLEANUP)
-        raise HTTPException(status_code=500, detail="Error al limpiar notificaciones expiradas")
+    """Programar la limpieza de notificaciones expiradas del sistema"""
+    background_tasks.add_task(notification_service.cleanup_expired_notifications)
+    return {"status": "scheduled", "message": "Limpieza de notificaciones expiradas programada"}
 
 @router.get("/unread-count", summary="Obtener conteo de notificaciones no leídas")
-@require_auth()
+@classify_errors(ErrorType.NOTIFICATION_UNREAD_COUNT, "Error al obtener conteo de notificaciones no leídas")
 async def get_unread_count(
-    current_user: Dict = Depends(require_auth)
+    notification_service: NotificationService = Depends(get_notification_service),
+    current_user: Dict = Depends(get_authenticated_user)
 ):
     """Obtener el número de notificaciones no leídas del usuario"""
-    try:
-        stats = notification_service.get_notification_stats(current_user["user_id"])
-        return {"unread_count": stats.unread_count}
-        
-    except Exception as e:
-        log_error(e, ErrorType.NOTIFICATION_UNREAD_COUNT, context={"user_id": current_user["user_id"]})
-        raise HTTPException(status_code=500, detail="Error al obtener conteo de notificaciones no leídas") 
\ No newline at end of file
+    return {"unread_count": notification_service.get_unread_count(current_user["id"])}
+
+@router.get("/{notification_id}", summary="Obtener notificación")
+@classify_errors(ErrorType.NOTIFICATION_RETRIEVAL, "Error al obtener la notificación")
+async def get_notification(
+    notification_id: str,
+    notification_service: NotificationService = Depends(get_notification_service),
+    current_user: Dict = Depends(get_authenticated_user)
+):
+    """Obtener una notificación específica"""
+    notification = notification_service.get_notification(notification_id, current_user["id"])
+    if not notification:
+        raise HTTPException(status_code=404, detail="Notificación no encontrada")
+    
+    return ORJSONResponse(notification.model_dump())
+
+@router.put("/{notification_id}", response_model=NotificationResponse, summary="Actualizar notificación")
+@classify_errors(ErrorType.NOTIFICATION_UPDATE, "Error al actualizar la notificación")
+async def update_notification(
+    notification_id: str,
+    update_data: NotificationUpdate,
+    notification_service: NotificationService = Depends(get_notification_service),
+    current_user: Dict = Depends(get_authenticated_user)
+):
+    """Actualizar una notificación"""
+    notification = notification_service.update_notification(
+        notification_id, current_user["id"], update_data
+    )
+    if not notification:
+        raise HTTPException(status_code=404, detail="Notificación no encontrada")
+    
+    return notification
+
+@router.delete("/{notification_id}", summary="Eliminar notificación")
+@classify_errors(ErrorType.NOTIFICATION_DELETION, "Error al eliminar la notificación")
+async def delete_notification(
+    notification_id: str,
+    notification_service: NotificationService = Depends(get_notification_service),
+    current_user: Dict = Depends(get_authenticated_user)
+):
+    """Eliminar una notificación"""
+    success = notification_service.delete_notification(notification_id, current_user["id"])
+    if not success:
+        raise HTTPException(status_code=404, detail="Notificación no encontrada")
+    
+    return {"message": "Notificación eliminada exitosamente"}
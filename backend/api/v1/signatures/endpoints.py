@@ -1,5 +1,7 @@
-from fastapi import APIRouter, HTTPException, Request, Depends
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import ORJSONResponse, Response
+from typing import Dict, List, Optional
+import orjson
 
 from models.signatures import (
     DocumentSignatureCreate,
@@ -9,6 +11,7 @@ from models.signatures import (
     SignatoryCreate,
     SignatoryResponse,
     SignatureRequest,
+    SignatureDeclineRequest,
     SignatureData,
     SignatureStats,
     SignatureSearchRequest,
@@ -16,18 +19,51 @@ from models.signatures import (
     SignatureStatus
 )
 from services.signatures import signature_service
-from services.auth.auth_middleware import require_auth, require_usage_check
+from core.config import SIGNATURE_CONFIG
+from services.auth.auth_middleware import get_authenticated_user, require_usage
 from services.monitoring.error_handler import log_error, ErrorType
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
+# Opciones de estado: enums estáticos, se serializan una sola vez al cargar el módulo
+_STATUS_OPTIONS_JSON = orjson.dumps({
+    "document_statuses": [
+        {"value": status.value, "label": status.value.replace("_", " ").title()}
+        for status in DocumentStatus
+    ],
+    "signature_statuses": [
+        {"value": status.value, "label": status.value.title()}
+        for status in SignatureStatus
+    ]
+})
+_STATUS_OPTIONS_CACHE_CONTROL = "public, max-age=86400, immutable"
 
-@router.post("/documents/", response_model=DocumentSignatureResponse)
-@require_auth()
-@require_usage_check("signature_creation")
+
+async def require_owned_document(
+    document_id: str,
+    current_user: Dict = Depends(get_authenticated_user)
+) -> Dict:
+    """
+    🔐 Dependencia que verifica que el documento pertenezca al usuario
+    
+    Se resuelve antes del handler, así que los endpoints solo se ejecutan
+    para el dueño del documento.
+    """
+    try:
+        owner_id = await signature_service.get_owner(document_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    if owner_id != current_user["id"]:
+        raise HTTPException(status_code=403, detail="No tienes permisos sobre este documento")
+    
+    return current_user
+
+
+@router.post("/documents/", responses={200: {"model": DocumentSignatureResponse}})
 async def create_signature_document(
     document_data: DocumentSignatureCreate,
-    request: Request
+    current_user: Dict = Depends(require_usage("signature_creation"))
 ):
     """
     📄 Crear un nuevo documento para firma digital
@@ -36,24 +72,21 @@ async def create_signature_document(
     con certificación digital y seguimiento de estado.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
         document = await signature_service.create_document(user_id, document_data)
-        return document
+        return ORJSONResponse(document.model_dump(mode="json", exclude_none=True))
         
     except Exception as e:
-        log_error(e, ErrorType.SIGNATURE_CREATION, {"user_id": user_data["id"]})
+        log_error(e, ErrorType.SIGNATURE_CREATION, context={"user_id": current_user["id"]})
         raise HTTPException(status_code=500, detail="Error creando documento de firma")
 
 
-@router.get("/documents/", response_model=DocumentSignatureListResponse)
-@require_auth()
-@require_usage_check("signature_listing")
+@router.get("/documents/", responses={200: {"model": DocumentSignatureListResponse}})
 async def list_signature_documents(
     page: int = 1,
     per_page: int = 10,
-    request: Request = None
+    current_user: Dict = Depends(require_usage("signature_listing"))
 ):
     """
     📋 Listar documentos de firma del usuario
@@ -61,24 +94,18 @@ async def list_signature_documents(
     Obtiene la lista paginada de documentos de firma del usuario autenticado.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
         documents = await signature_service.list_documents(user_id, page, per_page)
-        return documents
+        return ORJSONResponse(documents.model_dump(mode="json", exclude_none=True))
         
     except Exception as e:
-        log_error(e, ErrorType.SIGNATURE_RETRIEVAL, {"user_id": user_data["id"]})
+        log_error(e, ErrorType.SIGNATURE_RETRIEVAL, context={"user_id": current_user["id"]})
         raise HTTPException(status_code=500, detail="Error obteniendo documentos de firma")
 
 
-@router.get("/documents/{document_id}", response_model=DocumentSignatureResponse)
-@require_auth()
-@require_usage_check("signature_retrieval")
-async def get_signature_document(
-    document_id: str,
-    request: Request
-):
+@router.get("/documents/{document_id}", responses={200: {"model": DocumentSignatureResponse}}, dependencies=[Depends(require_owned_document), Depends(require_usage("signature_retrieval"))])
+async def get_signature_document(document_id: str):
     """
     📄 Obtener un documento de firma específico
     
@@ -86,31 +113,20 @@ async def get_signature_document(
     incluyendo firmantes y estado de firmas.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
-        
         document = await signature_service.get_document(document_id)
-        
-        # Verificar que el documento pertenece al usuario
-        if document.user_id != user_id:
-            raise HTTPException(status_code=403, detail="No tienes permisos para ver este documento")
-        
-        return document
+        return ORJSONResponse(document.model_dump(mode="json", exclude_none=True))
         
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        log_error(e, ErrorType.SIGNATURE_RETRIEVAL, {"document_id": document_id})
+        log_error(e, ErrorType.SIGNATURE_RETRIEVAL, context={"document_id": document_id})
         raise HTTPException(status_code=500, detail="Error obteniendo documento de firma")
 
 
-@router.put("/documents/{document_id}", response_model=DocumentSignatureResponse)
-@require_auth()
-@require_usage_check("signature_update")
+@router.put("/documents/{document_id}", responses={200: {"model": DocumentSignatureResponse}}, dependencies=[Depends(require_owned_document), Depends(require_usage("signature_update"))])
 async def update_signature_document(
     document_id: str,
-    update_data: DocumentSignatureUpdate,
-    request: Request
+    update_data: DocumentSignatureUpdate
 ):
     """
     📝 Actualizar documento de firma
@@ -118,62 +134,38 @@ async def update_signature_document(
     Actualiza los datos de un documento de firma existente.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
-        
-        # Verificar que el documento pertenece al usuario
-        document = await signature_service.get_document(document_id)
-        if document.user_id != user_id:
-            raise HTTPException(status_code=403, detail="No tienes permisos para modificar este documento")
-        
         updated_document = await signature_service.update_document(document_id, update_data)
-        return updated_document
+        return ORJSONResponse(updated_document.model_dump(mode="json", exclude_none=True))
         
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        log_error(e, ErrorType.SIGNATURE_UPDATE, {"document_id": document_id})
+        log_error(e, ErrorType.SIGNATURE_UPDATE, context={"document_id": document_id})
         raise HTTPException(status_code=500, detail="Error actualizando documento de firma")
 
 
-@router.delete("/documents/{document_id}")
-@require_auth()
-@require_usage_check("signature_deletion")
-async def delete_signature_document(
-    document_id: str,
-    request: Request
-):
+@router.delete("/documents/{document_id}", dependencies=[Depends(require_owned_document), Depends(require_usage("signature_deletion"))])
+async def delete_signature_document(document_id: str):
     """
     🗑️ Eliminar documento de firma
     
     Elimina un documento de firma y todos sus datos asociados.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
-        
-        # Verificar que el documento pertenece al usuario
-        document = await signature_service.get_document(document_id)
-        if document.user_id != user_id:
-            raise HTTPException(status_code=403, detail="No tienes permisos para eliminar este documento")
-        
         success = await signature_service.delete_document(document_id)
         return {"message": "Documento eliminado correctamente", "success": success}
         
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        log_error(e, ErrorType.SIGNATURE_DELETION, {"document_id": document_id})
+        log_error(e, ErrorType.SIGNATURE_DELETION, context={"document_id": document_id})
         raise HTTPException(status_code=500, detail="Error eliminando documento de firma")
 
 
-@router.post("/documents/{document_id}/signatories", response_model=SignatoryResponse)
-@require_auth()
-@require_usage_check("signature_signatory_add")
+@router.post("/documents/{document_id}/signatories", responses={200: {"model": SignatoryResponse}}, dependencies=[Depends(require_owned_document), Depends(require_usage("signature_signatory_add"))])
 async def add_signatory_to_document(
     document_id: str,
-    signatory_data: SignatoryCreate,
-    request: Request
+    signatory_data: SignatoryCreate
 ):
     """
     👤 Añadir firmante a documento
@@ -181,31 +173,20 @@ async def add_signatory_to_document(
     Añade un nuevo firmante a un documento de firma existente.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
-        
-        # Verificar que el documento pertenece al usuario
-        document = await signature_service.get_document(document_id)
-        if document.user_id != user_id:
-            raise HTTPException(status_code=403, detail="No tienes permisos para modificar este documento")
-        
         signatory = await signature_service.add_signatory(document_id, signatory_data)
-        return signatory
+        return ORJSONResponse(signatory.model_dump(mode="json", exclude_none=True))
         
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        log_error(e, ErrorType.SIGNATURE_SIGNATORY_ADD, {"document_id": document_id})
+        log_error(e, ErrorType.SIGNATURE_SIGNATORY_ADD, context={"document_id": document_id})
         raise HTTPException(status_code=500, detail="Error añadiendo firmante")
 
 
-@router.post("/documents/{document_id}/sign", response_model=SignatureData)
-@require_auth()
-@require_usage_check("signature_signing")
+@router.post("/documents/{document_id}/sign", responses={200: {"model": SignatureData}}, dependencies=[Depends(require_usage("signature_signing"))])
 async def sign_document(
     document_id: str,
-    signature_request: SignatureRequest,
-    request: Request
+    signature_request: SignatureRequest
 ):
     """
     ✍️ Firmar documento
@@ -213,40 +194,23 @@ async def sign_document(
     Permite a un firmante añadir su firma digital al documento.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
-        
-        # Verificar que el documento existe
-        document = await signature_service.get_document(document_id)
-        
-        # Verificar que el firmante existe y pertenece al documento
-        signatory_found = False
-        for signatory in document.signatories:
-            if signatory.id == signature_request.signatory_id:
-                signatory_found = True
-                break
-        
-        if not signatory_found:
-            raise HTTPException(status_code=404, detail="Firmante no encontrado en este documento")
-        
+        # El servicio valida que el firmante pertenezca al documento
         signature_data = await signature_service.sign_document(document_id, signature_request)
-        return signature_data
+        return ORJSONResponse(signature_data.model_dump(mode="json"))
         
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Firmante no encontrado en este documento")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        log_error(e, ErrorType.SIGNATURE_SIGNING, {"document_id": document_id})
+        log_error(e, ErrorType.SIGNATURE_SIGNING, context={"document_id": document_id})
         raise HTTPException(status_code=500, detail="Error firmando documento")
 
 
-@router.post("/documents/{document_id}/decline")
-@require_auth()
-@require_usage_check("signature_decline")
+@router.post("/documents/{document_id}/decline", dependencies=[Depends(require_usage("signature_decline"))])
 async def decline_signature(
     document_id: str,
-    signatory_id: str,
-    reason: str = "",
-    request: Request = None
+    decline_request: SignatureDeclineRequest
 ):
     """
     ❌ Rechazar firma
@@ -254,90 +218,69 @@ async def decline_signature(
     Permite a un firmante rechazar la firma de un documento.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
-        
-        # Verificar que el documento existe
-        document = await signature_service.get_document(document_id)
-        
-        # Verificar que el firmante existe y pertenece al documento
-        signatory_found = False
-        for signatory in document.signatories:
-            if signatory.id == signatory_id:
-                signatory_found = True
-                break
-        
-        if not signatory_found:
-            raise HTTPException(status_code=404, detail="Firmante no encontrado en este documento")
-        
-        success = await signature_service.decline_signature(document_id, signatory_id, reason)
+        # El servicio valida que el firmante pertenezca al documento
+        success = await signature_service.decline_signature(
+            document_id,
+            decline_request.signatory_id,
+            decline_request.reason
+        )
         return {"message": "Firma rechazada correctamente", "success": success}
         
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Firmante no encontrado en este documento")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        log_error(e, ErrorType.SIGNATURE_DECLINE, {"document_id": document_id})
+        log_error(e, ErrorType.SIGNATURE_DECLINE, context={"document_id": document_id})
         raise HTTPException(status_code=500, detail="Error rechazando firma")
 
 
-@router.post("/documents/{document_id}/resend")
-@require_auth()
-@require_usage_check("signature_resend")
-async def resend_signature_invitations(
-    document_id: str,
-    request: Request
-):
+@router.post("/documents/{document_id}/resend", dependencies=[Depends(require_owned_document), Depends(require_usage("signature_resend"))])
+async def resend_signature_invitations(document_id: str):
     """
     📧 Reenviar invitaciones de firma
     
     Reenvía las invitaciones de firma a los firmantes pendientes.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
-        
-        # Verificar que el documento pertenece al usuario
-        document = await signature_service.get_document(document_id)
-        if document.user_id != user_id:
-            raise HTTPException(status_code=403, detail="No tienes permisos para reenviar invitaciones")
-        
-        success = await signature_service.resend_invitations(document_id)
-        return {"message": "Invitaciones reenviadas correctamente", "success": success}
+        result = await signature_service.resend_invitations(document_id)
+        return {
+            "message": "Invitaciones reenviadas correctamente",
+            "success": result["failed"] == 0,
+            **result
+        }
         
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        log_error(e, ErrorType.SIGNATURE_RESEND, {"document_id": document_id})
+        log_error(e, ErrorType.SIGNATURE_RESEND, context={"document_id": document_id})
         raise HTTPException(status_code=500, detail="Error reenviando invitaciones")
 
 
-@router.get("/stats/", response_model=SignatureStats)
-@require_auth()
-@require_usage_check("signature_stats")
-async def get_signature_stats(request: Request):
+@router.get("/stats/", responses={200: {"model": SignatureStats}})
+async def get_signature_stats(
+    current_user: Dict = Depends(require_usage("signature_stats"))
+):
     """
     📊 Obtener estadísticas de firmas
     
     Obtiene estadísticas generales de los documentos de firma del usuario.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
         stats = await signature_service.get_signature_stats(user_id)
-        return stats
+        return ORJSONResponse(stats.model_dump(mode="json"))
         
     except Exception as e:
-        log_error(e, ErrorType.SIGNATURE_STATS, {"user_id": user_data["id"]})
+        log_error(e, ErrorType.SIGNATURE_STATS, context={"user_id": current_user["id"]})
         raise HTTPException(status_code=500, detail="Error obteniendo estadísticas de firmas")
 
 
-@router.post("/search/", response_model=DocumentSignatureListResponse)
-@require_auth()
-@require_usage_check("signature_search")
+@router.post("/search/", responses={200: {"model": DocumentSignatureListResponse}})
 async def search_signature_documents(
     search_request: SignatureSearchRequest,
-    request: Request
+    current_user: Dict = Depends(require_usage("signature_search"))
 ):
     """
     🔍 Buscar documentos de firma
@@ -345,83 +288,86 @@ async def search_signature_documents(
     Busca documentos de firma con filtros avanzados.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
         results = await signature_service.search_documents(user_id, search_request)
-        return results
+        return ORJSONResponse(results.model_dump(mode="json", exclude_none=True))
         
     except Exception as e:
-        log_error(e, ErrorType.SIGNATURE_SEARCH, {"user_id": user_data["id"]})
+        log_error(e, ErrorType.SIGNATURE_SEARCH, context={"user_id": current_user["id"]})
         raise HTTPException(status_code=500, detail="Error buscando documentos de firma")
 
 
-@router.get("/documents/{document_id}/download")
-@require_auth()
-@require_usage_check("signature_download")
-async def download_signed_document(
+@router.get("/documents/{document_id}/signatories/{signatory_id}/image", dependencies=[Depends(require_owned_document), Depends(require_usage("signature_retrieval"))])
+async def get_signatory_signature_image(
     document_id: str,
-    request: Request
+    signatory_id: str
 ):
     """
-    📥 Descargar documento firmado
+    🖼️ Obtener imagen de firma
     
-    Genera y descarga el documento firmado en formato PDF.
+    Devuelve la imagen de la firma de un firmante. Se sirve aparte para no
+    incluir el base64 en cada listado de documentos.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
-        
-        # Verificar que el documento pertenece al usuario
-        document = await signature_service.get_document(document_id)
-        if document.user_id != user_id:
-            raise HTTPException(status_code=403, detail="No tienes permisos para descargar este documento")
-        
-        # Verificar que el documento esté completado
-        if document.status != DocumentStatus.COMPLETED:
-            raise HTTPException(status_code=400, detail="El documento debe estar completamente firmado para descargarlo")
-        
-        # Aquí se generaría el PDF real
-        # Por ahora retornamos un mensaje de éxito
-        return {
-            "message": "Documento listo para descarga",
-            "document_id": document_id,
-            "download_url": f"/api/v1/signatures/documents/{document_id}/download/file"
-        }
+        content, media_type = await signature_service.get_signature_image(document_id, signatory_id)
+        return Response(content=content, media_type=media_type)
         
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Firmante no encontrado en este documento")
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        log_error(e, ErrorType.SIGNATURE_DOWNLOAD, {"document_id": document_id})
+        log_error(e, ErrorType.SIGNATURE_RETRIEVAL, context={"document_id": document_id, "signatory_id": signatory_id})
+        raise HTTPException(status_code=500, detail="Error obteniendo imagen de firma")
+
+
+@router.get("/documents/{document_id}/download", dependencies=[Depends(require_owned_document), Depends(require_usage("signature_download"))])
+async def download_signed_document(document_id: str):
+    """
+    📥 Descargar documento firmado
+    
+    Devuelve una URL firmada y temporal para descargar el PDF directamente
+    desde el almacenamiento.
+    """
+    try:
+        download_url = await signature_service.create_download_url(document_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        log_error(e, ErrorType.SIGNATURE_DOWNLOAD, context={"document_id": document_id})
         raise HTTPException(status_code=500, detail="Error generando documento para descarga")
+    
+    # Verificar que el documento esté completado
+    if download_url is None:
+        raise HTTPException(status_code=400, detail="El documento debe estar completamente firmado para descargarlo")
+    
+    return {
+        "message": "Documento listo para descarga",
+        "document_id": document_id,
+        "download_url": download_url,
+        "expires_in": SIGNATURE_CONFIG["download_url_expires_seconds"]
+    }
 
 
 @router.get("/status/options")
-@require_auth()
 async def get_signature_status_options():
     """
     📋 Obtener opciones de estado
     
     Retorna las opciones disponibles para filtrar por estado de firma.
     """
-    return {
-        "document_statuses": [
-            {"value": status.value, "label": status.value.replace("_", " ").title()}
-            for status in DocumentStatus
-        ],
-        "signature_statuses": [
-            {"value": status.value, "label": status.value.title()}
-            for status in SignatureStatus
-        ]
-    }
+    return Response(
+        content=_STATUS_OPTIONS_JSON,
+        media_type="application/json",
+        headers={"Cache-Control": _STATUS_OPTIONS_CACHE_CONTROL}
+    )
 
 
-@router.get("/documents/{document_id}/progress")
-@require_auth()
-@require_usage_check("signature_progress")
+@router.get("/documents/{document_id}/progress", dependencies=[Depends(require_owned_document), Depends(require_usage("signature_progress"))])
 async def get_document_progress(
     document_id: str,
-    request: Request
+    include_signatories: bool = True
 ):
     """
     📈 Obtener progreso de firma
@@ -429,35 +375,14 @@ async def get_document_progress(
     Obtiene el progreso detallado de firma de un documento.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
-        
-        document = await signature_service.get_document(document_id)
-        
-        # Verificar que el documento pertenece al usuario
-        if document.user_id != user_id:
-            raise HTTPException(status_code=403, detail="No tienes permisos para ver este documento")
-        
-        return {
-            "document_id": document_id,
-            "progress_percentage": document.progress_percentage,
-            "signed_count": document.signed_count,
-            "total_count": document.total_count,
-            "status": document.status,
-            "signatories": [
-                {
-                    "id": sig.id,
-                    "name": sig.name,
-                    "email": sig.email,
-                    "status": sig.status,
-                    "signed_at": sig.signed_at
-                }
-                for sig in document.signatories
-            ]
-        }
+        progress = await signature_service.get_document_progress(
+            document_id,
+            include_signatories=include_signatories
+        )
+        return ORJSONResponse(progress)
         
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        log_error(e, ErrorType.SIGNATURE_PROGRESS, {"document_id": document_id})
+        log_error(e, ErrorType.SIGNATURE_PROGRESS, context={"document_id": document_id})
         raise HTTPException(status_code=500, detail="Error obteniendo progreso de firma") 
\ No newline at end of file
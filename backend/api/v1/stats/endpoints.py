@@ -10,29 +10,43 @@ Este módulo proporciona endpoints para:
 - Exportación de datos
 """
 
-from fastapi import APIRouter, HTTPException, Request, Query, Depends
-from fastapi.responses import JSONResponse, StreamingResponse
-from typing import Optional, List
-import json
+from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from typing import Optional, List, Dict, Any
+import asyncio
+import logging
 from datetime import datetime, timedelta
+from urllib.parse import quote
 
 from models.stats import (
     DashboardResponse, AnalyticsRequest, ExportStatsRequest,
     CategoryStats, DocumentStats, ChatStats, UsageStats, ActivityLog
 )
 from services.stats.stats_service import stats_service
-from services.auth.auth_middleware import require_auth, require_usage_check
+from services.auth.auth_middleware import get_authenticated_user, require_admin, require_usage
 from services.monitoring.usage_service import usage_service
 from services.documents.document_service import document_service
 from services.legal.chat_service import chat_service
 from core.config import STATS_CONFIG
 
-router = APIRouter(prefix="/stats", tags=["Estadísticas y Dashboard"])
+logger = logging.getLogger(__name__)
+
+EXPORT_MEDIA_TYPES = {
+    "json": "application/json",
+    "csv": "text/csv",
+    "pdf": "application/pdf"
+}
+
+router = APIRouter(
+    prefix="/stats",
+    tags=["Estadísticas y Dashboard"],
+    default_response_class=ORJSONResponse
+)
 
 @router.get("/dashboard", response_model=DashboardResponse)
-@require_auth()
-@require_usage_check("dashboard_view")
-async def get_dashboard_stats(request: Request):
+async def get_dashboard_stats(
+    current_user: Dict[str, Any] = Depends(require_usage("dashboard_view"))
+):
     """
     📊 Obtener estadísticas completas del dashboard
     
@@ -47,26 +61,29 @@ async def get_dashboard_stats(request: Request):
     - Actividad reciente
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
-        # Obtener estadísticas completas del dashboard
-        dashboard_data = await stats_service.get_dashboard_stats(user_id)
+        # Obtener estadísticas completas del dashboard (cacheadas por usuario)
+        body = await stats_service.get_cached_response(
+            user_id, "dashboard", stats_service.get_dashboard_stats
+        )
         
-        return dashboard_data
+        return Response(content=body, media_type="application/json")
         
     except Exception as e:
-        print(f"❌ Error obteniendo estadísticas del dashboard: {e}")
+        logger.exception(
+            "Error obteniendo estadísticas del dashboard",
+            extra={"user_id": current_user["id"], "endpoint": "get_dashboard_stats"}
+        )
         raise HTTPException(
             status_code=500,
             detail="Error obteniendo estadísticas del dashboard"
         )
 
 @router.get("/documents", response_model=DocumentStats)
-@require_auth()
 async def get_document_stats(
-    request: Request,
-    period: str = Query("month", description="Período: day, week, month, year")
+    period: str = Query("month", description="Período: day, week, month, year"),
+    current_user: Dict[str, Any] = Depends(get_authenticated_user)
 ):
     """
     📄 Obtener estadísticas de documentos por usuario
@@ -78,34 +95,12 @@ async def get_document_stats(
         Estadísticas detalladas de documentos
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
-        
-        # Obtener documentos del usuario
-        documents = await document_service.get_user_documents(user_id)
-        
-        # Filtrar por período si es necesario
-        if period != "all":
-            filtered_docs = await stats_service._filter_documents_by_period(
-                documents, period
-            )
-        else:
-            filtered_docs = documents
-        
-        # Calcular estadísticas
-        total_documents = len(filtered_docs)
-        status_counts = {}
-        type_counts = {}
-        total_size = 0
-        
-        for doc in filtered_docs:
-            status = doc.get("status", "unknown")
-            doc_type = doc.get("file_type", "unknown")
-            size = doc.get("file_size", 0)
-            
-            status_counts[status] = status_counts.get(status, 0) + 1
-            type_counts[doc_type] = type_counts.get(doc_type, 0) + 1
-            total_size += size
+        user_id = current_user["id"]
+        
+        # Agregar documentos por estado y tipo en la consulta del período
+        doc_stats = await document_service.get_user_document_stats(user_id, period)
+        total_documents = doc_stats["total_documents"]
+        total_size = doc_stats["total_size"]
         
         # Calcular promedios
         average_size_kb = total_size / total_documents if total_documents > 0 else 0
@@ -113,22 +108,26 @@ async def get_document_stats(
         
         return DocumentStats(
             total_documents=total_documents,
-            documents_by_status=status_counts,
-            documents_by_type=type_counts,
+            documents_by_status=doc_stats["documents_by_status"],
+            documents_by_type=doc_stats["documents_by_type"],
             total_size_mb=round(total_size_mb, 2),
             average_size_kb=round(average_size_kb, 2)
         )
         
     except Exception as e:
-        print(f"❌ Error obteniendo estadísticas de documentos: {e}")
+        logger.exception(
+            "Error obteniendo estadísticas de documentos",
+            extra={"user_id": current_user["id"], "endpoint": "get_document_stats"}
+        )
         raise HTTPException(
             status_code=500,
             detail="Error obteniendo estadísticas de documentos"
         )
 
 @router.get("/usage", response_model=UsageStats)
-@require_auth()
-async def get_usage_stats(request: Request):
+async def get_usage_stats(
+    current_user: Dict[str, Any] = Depends(get_authenticated_user)
+):
     """
     📊 Obtener métricas de uso del sistema
     
@@ -136,14 +135,13 @@ async def get_usage_stats(request: Request):
         Estadísticas detalladas de uso con límites
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
-        # Obtener estadísticas de uso
-        usage_stats = await usage_service.get_usage_stats(user_id)
-        
-        # Obtener límites
-        limits = await usage_service.check_usage_limits(user_id)
+        # Obtener estadísticas de uso y límites en paralelo
+        usage_stats, limits = await asyncio.gather(
+            usage_service.get_usage_stats(user_id),
+            usage_service.check_usage_limits(user_id)
+        )
         
         return UsageStats(
             daily_queries=usage_stats.daily_queries,
@@ -159,17 +157,19 @@ async def get_usage_stats(request: Request):
         )
         
     except Exception as e:
-        print(f"❌ Error obteniendo estadísticas de uso: {e}")
+        logger.exception(
+            "Error obteniendo estadísticas de uso",
+            extra={"user_id": current_user["id"], "endpoint": "get_usage_stats"}
+        )
         raise HTTPException(
             status_code=500,
             detail="Error obteniendo estadísticas de uso"
         )
 
 @router.get("/activity", response_model=List[ActivityLog])
-@require_auth()
 async def get_recent_activity(
-    request: Request,
-    limit: int = Query(10, ge=1, le=50, description="Número máximo de actividades")
+    limit: int = Query(10, ge=1, le=50, description="Número máximo de actividades"),
+    current_user: Dict[str, Any] = Depends(get_authenticated_user)
 ):
     """
     📝 Obtener actividad reciente del usuario
@@ -181,27 +181,25 @@ async def get_recent_activity(
         Lista de actividades recientes
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
         # Obtener actividad del usuario
-        activity = await stats_service._get_recent_activity(user_id)
-        
-        # Limitar resultados
-        return activity[:limit]
+        return await stats_service._get_recent_activity(user_id, limit)
         
     except Exception as e:
-        print(f"❌ Error obteniendo actividad reciente: {e}")
+        logger.exception(
+            "Error obteniendo actividad reciente",
+            extra={"user_id": current_user["id"], "endpoint": "get_recent_activity"}
+        )
         raise HTTPException(
             status_code=500,
             detail="Error obteniendo actividad reciente"
         )
 
 @router.get("/categories", response_model=List[CategoryStats])
-@require_auth()
 async def get_category_stats(
-    request: Request,
-    period: str = Query("month", description="Período: day, week, month, year")
+    period: str = Query("month", description="Período: day, week, month, year"),
+    current_user: Dict[str, Any] = Depends(get_authenticated_user)
 ):
     """
     📊 Obtener estadísticas por categoría
@@ -213,24 +211,29 @@ async def get_category_stats(
         Lista de estadísticas por categoría
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
-        # Obtener estadísticas por categoría
-        categories = await stats_service._get_category_stats(user_id)
+        # Obtener estadísticas por categoría (cacheadas por usuario)
+        body = await stats_service.get_cached_response(
+            user_id, "categories", stats_service._get_category_stats
+        )
         
-        return categories
+        return Response(content=body, media_type="application/json")
         
     except Exception as e:
-        print(f"❌ Error obteniendo estadísticas por categoría: {e}")
+        logger.exception(
+            "Error obteniendo estadísticas por categoría",
+            extra={"user_id": current_user["id"], "endpoint": "get_category_stats"}
+        )
         raise HTTPException(
             status_code=500,
             detail="Error obteniendo estadísticas por categoría"
         )
 
 @router.get("/chat", response_model=ChatStats)
-@require_auth()
-async def get_chat_stats(request: Request):
+async def get_chat_stats(
+    current_user: Dict[str, Any] = Depends(get_authenticated_user)
+):
     """
     💬 Obtener estadísticas de chat
     
@@ -238,8 +241,7 @@ async def get_chat_stats(request: Request):
         Estadísticas detalladas del chat
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
         # Obtener estadísticas de chat
         chat_stats = await chat_service.get_chat_stats(user_id)
@@ -247,17 +249,19 @@ async def get_chat_stats(request: Request):
         return chat_stats
         
     except Exception as e:
-        print(f"❌ Error obteniendo estadísticas de chat: {e}")
+        logger.exception(
+            "Error obteniendo estadísticas de chat",
+            extra={"user_id": current_user["id"], "endpoint": "get_chat_stats"}
+        )
         raise HTTPException(
             status_code=500,
             detail="Error obteniendo estadísticas de chat"
         )
 
 @router.post("/analytics")
-@require_auth()
 async def get_analytics(
-    request: Request,
-    analytics_request: AnalyticsRequest
+    analytics_request: AnalyticsRequest,
+    current_user: Dict[str, Any] = Depends(get_authenticated_user)
 ):
     """
     📈 Obtener analytics avanzados
@@ -269,8 +273,7 @@ async def get_analytics(
         Analytics detallados según los parámetros
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
         # Obtener analytics según los parámetros
         analytics_data = await stats_service._get_analytics(
@@ -283,17 +286,19 @@ async def get_analytics(
         return analytics_data
         
     except Exception as e:
-        print(f"❌ Error obteniendo analytics: {e}")
+        logger.exception(
+            "Error obteniendo analytics",
+            extra={"user_id": current_user["id"], "endpoint": "get_analytics"}
+        )
         raise HTTPException(
             status_code=500,
             detail="Error obteniendo analytics"
         )
 
 @router.post("/export")
-@require_auth()
 async def export_stats(
-    request: Request,
-    export_request: ExportStatsRequest
+    export_request: ExportStatsRequest,
+    current_user: Dict[str, Any] = Depends(get_authenticated_user)
 ):
     """
     📤 Exportar estadísticas
@@ -305,54 +310,51 @@ async def export_stats(
         Archivo con las estadísticas exportadas
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
+        
+        # Generar archivo según formato
+        extension = export_request.format if export_request.format in EXPORT_MEDIA_TYPES else "pdf"
+        stamp = datetime.now().strftime("%Y%m%d")
+        filename = f"stats_{user_id}_{stamp}.{extension}"
         
-        # Generar datos de exportación
-        export_data = await stats_service._generate_export_data(
+        # El primer bloque se genera aquí para que los errores sigan devolviendo 500
+        chunks = stats_service.stream_export(
             user_id,
+            extension,
             export_request.period,
             export_request.include_charts
         )
+        first_chunk = await chunks.__anext__()
         
-        # Generar archivo según formato
-        if export_request.format == "json":
-            content = json.dumps(export_data, indent=2, ensure_ascii=False)
-            media_type = "application/json"
-            filename = f"stats_{user_id}_{datetime.now().strftime('%Y%m%d')}.json"
-            
-        elif export_request.format == "csv":
-            content = await stats_service._convert_to_csv(export_data)
-            media_type = "text/csv"
-            filename = f"stats_{user_id}_{datetime.now().strftime('%Y%m%d')}.csv"
-            
-        else:  # pdf
-            content = await stats_service._convert_to_pdf(export_data)
-            media_type = "application/pdf"
-            filename = f"stats_{user_id}_{datetime.now().strftime('%Y%m%d')}.pdf"
-        
-        # Crear respuesta de streaming
-        def generate():
-            yield content
+        # Enviar el resto de la exportación a medida que se genera
+        async def generate():
+            yield first_chunk
+            async for chunk in chunks:
+                yield chunk
         
         return StreamingResponse(
             generate(),
-            media_type=media_type,
+            media_type=EXPORT_MEDIA_TYPES[extension],
             headers={
-                "Content-Disposition": f"attachment; filename={filename}"
+                # RFC 5987: el nombre puede contener caracteres no ASCII
+                "Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"
             }
         )
         
     except Exception as e:
-        print(f"❌ Error exportando estadísticas: {e}")
+        logger.exception(
+            "Error exportando estadísticas",
+            extra={"user_id": current_user["id"], "endpoint": "export_stats"}
+        )
         raise HTTPException(
             status_code=500,
             detail="Error exportando estadísticas"
         )
 
 @router.get("/summary")
-@require_auth()
-async def get_stats_summary(request: Request):
+async def get_stats_summary(
+    current_user: Dict[str, Any] = Depends(get_authenticated_user)
+):
     """
     📋 Obtener resumen de estadísticas
     
@@ -360,24 +362,29 @@ async def get_stats_summary(request: Request):
         Resumen rápido de las métricas principales
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
-        # Obtener resumen de estadísticas
-        summary = await stats_service._get_stats_summary(user_id)
+        # Obtener resumen de estadísticas (cacheadas por usuario)
+        body = await stats_service.get_cached_response(
+            user_id, "summary", stats_service._get_stats_summary
+        )
         
-        return summary
+        return Response(content=body, media_type="application/json")
         
     except Exception as e:
-        print(f"❌ Error obteniendo resumen de estadísticas: {e}")
+        logger.exception(
+            "Error obteniendo resumen de estadísticas",
+            extra={"user_id": current_user["id"], "endpoint": "get_stats_summary"}
+        )
         raise HTTPException(
             status_code=500,
             detail="Error obteniendo resumen de estadísticas"
         )
 
 @router.get("/achievements")
-@require_auth()
-async def get_user_achievements(request: Request):
+async def get_user_achievements(
+    current_user: Dict[str, Any] = Depends(get_authenticated_user)
+):
     """
     🏆 Obtener logros del usuario
     
@@ -385,24 +392,29 @@ async def get_user_achievements(request: Request):
         Lista de logros obtenidos
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
-        # Obtener logros del usuario
-        achievements = await stats_service._get_achievements(user_id)
+        # Obtener logros del usuario (cacheadas por usuario)
+        body = await stats_service.get_cached_response(
+            user_id, "achievements", stats_service._get_achievements
+        )
         
-        return achievements
+        return Response(content=body, media_type="application/json")
         
     except Exception as e:
-        print(f"❌ Error obteniendo logros: {e}")
+        logger.exception(
+            "Error obteniendo logros",
+            extra={"user_id": current_user["id"], "endpoint": "get_user_achievements"}
+        )
         raise HTTPException(
             status_code=500,
             detail="Error obteniendo logros"
         )
 
 @router.get("/weekly-activity")
-@require_auth()
-async def get_weekly_activity(request: Request):
+async def get_weekly_activity(
+    current_user: Dict[str, Any] = Depends(get_authenticated_user)
+):
     """
     📅 Obtener actividad semanal
     
@@ -410,24 +422,29 @@ async def get_weekly_activity(request: Request):
         Actividad organizada por día de la semana
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
-        # Obtener actividad semanal
-        weekly_activity = await stats_service._get_weekly_activity(user_id)
+        # Obtener actividad semanal (cacheadas por usuario)
+        body = await stats_service.get_cached_response(
+            user_id, "weekly_activity", stats_service._get_weekly_activity
+        )
         
-        return weekly_activity
+        return Response(content=body, media_type="application/json")
         
     except Exception as e:
-        print(f"❌ Error obteniendo actividad semanal: {e}")
+        logger.exception(
+            "Error obteniendo actividad semanal",
+            extra={"user_id": current_user["id"], "endpoint": "get_weekly_activity"}
+        )
         raise HTTPException(
             status_code=500,
             detail="Error obteniendo actividad semanal"
         )
 
 @router.get("/system-metrics")
-@require_auth()
-async def get_system_metrics(request: Request):
+async def get_system_metrics(
+    current_user: Dict[str, Any] = Depends(require_admin)
+):
     """
     🔧 Obtener métricas del sistema (solo admin)
     
@@ -435,24 +452,16 @@ async def get_system_metrics(request: Request):
         Métricas generales del sistema
     """
     try:
-        user_data = request.state.user
-        
-        # Verificar si es admin
-        if user_data.get("role") != "admin":
-            raise HTTPException(
-                status_code=403,
-                detail="Acceso denegado. Se requieren permisos de administrador."
-            )
-        
         # Obtener métricas del sistema
         system_metrics = await usage_service.get_admin_stats()
         
         return system_metrics
         
-    except HTTPException:
-        raise
     except Exception as e:
-        print(f"❌ Error obteniendo métricas del sistema: {e}")
+        logger.exception(
+            "Error obteniendo métricas del sistema",
+            extra={"user_id": current_user["id"], "endpoint": "get_system_metrics"}
+        )
         raise HTTPException(
             status_code=500,
             detail="Error obteniendo métricas del sistema"
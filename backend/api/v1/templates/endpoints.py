@@ -1,7 +1,8 @@
-from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Request, Depends, Query
-from fastapi.responses import StreamingResponse
+from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 import io
+import orjson
 
 from models.templates import (
     TemplateCreate, TemplateUpdate, TemplateResponse, TemplateListResponse,
@@ -10,17 +11,21 @@ from models.templates import (
     TemplateCategory
 )
 from services.templates.template_service import template_service
-from services.auth.auth_middleware import require_auth, require_usage_check
+from services.auth.auth_middleware import get_authenticated_user, require_usage
 from services.monitoring.error_handler import log_error, ErrorType
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Las categorías son un Enum fijo: se serializan una sola vez al importar
+_CATEGORIES_JSON = orjson.dumps({
+    "categories": [category.value for category in TemplateCategory],
+    "total": len(TemplateCategory)
+})
 
 @router.post("/", response_model=TemplateResponse)
-@require_auth()
-@require_usage_check("template_creation")
 async def create_template(
     template_data: TemplateCreate,
-    request: Request
+    current_user: Dict[str, Any] = Depends(require_usage("template_creation"))
 ):
     """
     📝 Crear un nuevo template de documento
@@ -28,22 +33,19 @@ async def create_template(
     Crea una plantilla reutilizable para consultas legales con variables dinámicas.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
         template = await template_service.create_template(user_id, template_data)
         return template
         
     except Exception as e:
-        log_error(e, ErrorType.TEMPLATE_CREATION, {"user_id": user_data["id"]})
+        log_error(e, ErrorType.TEMPLATE_CREATION, context={"user_id": current_user["id"]})
         raise HTTPException(status_code=500, detail="Error creando template")
 
 @router.get("/{template_id}", response_model=TemplateResponse)
-@require_auth()
-@require_usage_check("template_view")
 async def get_template(
     template_id: str,
-    request: Request
+    current_user: Dict[str, Any] = Depends(require_usage("template_view"))
 ):
     """
     📖 Obtener un template específico
@@ -51,8 +53,7 @@ async def get_template(
     Retorna los detalles de un template si el usuario tiene acceso.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
         template = await template_service.get_template(template_id, user_id)
         if not template:
@@ -63,21 +64,19 @@ async def get_template(
     except HTTPException:
         raise
     except Exception as e:
-        log_error(e, ErrorType.TEMPLATE_RETRIEVAL, {"template_id": template_id, "user_id": user_data["id"]})
+        log_error(e, ErrorType.TEMPLATE_RETRIEVAL, context={"template_id": template_id, "user_id": current_user["id"]})
         raise HTTPException(status_code=500, detail="Error obteniendo template")
 
 @router.get("/", response_model=TemplateListResponse)
-@require_auth()
-@require_usage_check("template_listing")
 async def list_templates(
-    request: Request,
     query: Optional[str] = Query(None, description="Término de búsqueda"),
     category: Optional[TemplateCategory] = Query(None, description="Filtrar por categoría"),
     tags: Optional[str] = Query(None, description="Etiquetas separadas por coma"),
     is_public: Optional[bool] = Query(None, description="Filtrar por visibilidad"),
     is_favorite: Optional[bool] = Query(None, description="Filtrar por favoritos"),
     page: int = Query(1, ge=1, description="Número de página"),
-    per_page: int = Query(20, ge=1, le=100, description="Elementos por página")
+    per_page: int = Query(20, ge=1, le=100, description="Elementos por página"),
+    current_user: Dict[str, Any] = Depends(require_usage("template_listing"))
 ):
     """
     📋 Listar templates con filtros
@@ -85,8 +84,7 @@ async def list_templates(
     Retorna una lista paginada de templates con opciones de filtrado.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
         # Procesar etiquetas
         tag_list = None
@@ -107,16 +105,14 @@ async def list_templates(
         return templates
         
     except Exception as e:
-        log_error(e, ErrorType.TEMPLATE_LISTING, {"user_id": user_data["id"]})
+        log_error(e, ErrorType.TEMPLATE_LISTING, context={"user_id": current_user["id"]})
         raise HTTPException(status_code=500, detail="Error listando templates")
 
 @router.put("/{template_id}", response_model=TemplateResponse)
-@require_auth()
-@require_usage_check("template_update")
 async def update_template(
     template_id: str,
     update_data: TemplateUpdate,
-    request: Request
+    current_user: Dict[str, Any] = Depends(require_usage("template_update"))
 ):
     """
     ✏️ Actualizar un template
@@ -124,8 +120,7 @@ async def update_template(
     Actualiza los campos de un template existente.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
         template = await template_service.update_template(template_id, user_id, update_data)
         if not template:
@@ -136,15 +131,13 @@ async def update_template(
     except HTTPException:
         raise
     except Exception as e:
-        log_error(e, ErrorType.TEMPLATE_UPDATE, {"template_id": template_id, "user_id": user_data["id"]})
+        log_error(e, ErrorType.TEMPLATE_UPDATE, context={"template_id": template_id, "user_id": current_user["id"]})
         raise HTTPException(status_code=500, detail="Error actualizando template")
 
 @router.delete("/{template_id}")
-@require_auth()
-@require_usage_check("template_deletion")
 async def delete_template(
     template_id: str,
-    request: Request
+    current_user: Dict[str, Any] = Depends(require_usage("template_deletion"))
 ):
     """
     🗑️ Eliminar un template
@@ -152,8 +145,7 @@ async def delete_template(
     Elimina un template si el usuario es el propietario.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
         success = await template_service.delete_template(template_id, user_id)
         if not success:
@@ -164,16 +156,14 @@ async def delete_template(
     except HTTPException:
         raise
     except Exception as e:
-        log_error(e, ErrorType.TEMPLATE_DELETION, {"template_id": template_id, "user_id": user_data["id"]})
+        log_error(e, ErrorType.TEMPLATE_DELETION, context={"template_id": template_id, "user_id": current_user["id"]})
         raise HTTPException(status_code=500, detail="Error eliminando template")
 
 @router.post("/{template_id}/use", response_model=TemplateUsageResponse)
-@require_auth()
-@require_usage_check("template_usage")
 async def use_template(
     template_id: str,
     usage_data: TemplateUsageRequest,
-    request: Request
+    current_user: Dict[str, Any] = Depends(require_usage("template_usage"))
 ):
     """
     🎯 Usar un template con variables
@@ -181,8 +171,7 @@ async def use_template(
     Procesa un template reemplazando las variables con los valores proporcionados.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
         result = await template_service.use_template(template_id, user_id, usage_data)
         if not result:
@@ -195,15 +184,13 @@ async def use_template(
     except HTTPException:
         raise
     except Exception as e:
-        log_error(e, ErrorType.TEMPLATE_USAGE, {"template_id": template_id, "user_id": user_data["id"]})
+        log_error(e, ErrorType.TEMPLATE_USAGE, context={"template_id": template_id, "user_id": current_user["id"]})
         raise HTTPException(status_code=500, detail="Error usando template")
 
 @router.post("/{template_id}/favorite")
-@require_auth()
-@require_usage_check("template_favorite")
 async def toggle_favorite(
     template_id: str,
-    request: Request
+    current_user: Dict[str, Any] = Depends(require_usage("template_favorite"))
 ):
     """
     ⭐ Marcar/desmarcar template como favorito
@@ -211,8 +198,7 @@ async def toggle_favorite(
     Cambia el estado de favorito de un template.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
         is_favorite = await template_service.toggle_favorite(template_id, user_id)
         
@@ -223,14 +209,12 @@ async def toggle_favorite(
         }
         
     except Exception as e:
-        log_error(e, ErrorType.TEMPLATE_FAVORITE, {"template_id": template_id, "user_id": user_data["id"]})
+        log_error(e, ErrorType.TEMPLATE_FAVORITE, context={"template_id": template_id, "user_id": current_user["id"]})
         raise HTTPException(status_code=500, detail="Error cambiando estado de favorito")
 
 @router.get("/stats/overview", response_model=TemplateStatsResponse)
-@require_auth()
-@require_usage_check("template_stats")
 async def get_template_stats(
-    request: Request
+    current_user: Dict[str, Any] = Depends(require_usage("template_stats"))
 ):
     """
     📊 Obtener estadísticas de templates
@@ -238,41 +222,28 @@ async def get_template_stats(
     Retorna estadísticas generales sobre templates del usuario.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
         stats = await template_service.get_template_stats(user_id)
         return stats
         
     except Exception as e:
-        log_error(e, ErrorType.TEMPLATE_STATS, {"user_id": user_data["id"]})
+        log_error(e, ErrorType.TEMPLATE_STATS, context={"user_id": current_user["id"]})
         raise HTTPException(status_code=500, detail="Error obteniendo estadísticas")
 
-@router.get("/categories/list")
-@require_auth()
+@router.get("/categories/list", dependencies=[Depends(get_authenticated_user)])
 async def get_template_categories():
     """
     📂 Obtener lista de categorías disponibles
     
     Retorna todas las categorías de templates disponibles.
     """
-    try:
-        categories = [category.value for category in TemplateCategory]
-        return {
-            "categories": categories,
-            "total": len(categories)
-        }
-        
-    except Exception as e:
-        log_error(e, ErrorType.TEMPLATE_CATEGORIES)
-        raise HTTPException(status_code=500, detail="Error obteniendo categorías")
+    return Response(content=_CATEGORIES_JSON, media_type="application/json")
 
 @router.post("/export")
-@require_auth()
-@require_usage_check("template_export")
 async def export_templates(
     export_request: TemplateExportRequest,
-    request: Request
+    current_user: Dict[str, Any] = Depends(require_usage("template_export"))
 ):
     """
     📤 Exportar templates
@@ -280,8 +251,7 @@ async def export_templates(
     Exporta templates en formato JSON o CSV.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
         content = await template_service.export_templates(
             export_request.template_ids,
@@ -304,15 +274,13 @@ async def export_templates(
         )
         
     except Exception as e:
-        log_error(e, ErrorType.TEMPLATE_EXPORT, {"user_id": user_data["id"]})
+        log_error(e, ErrorType.TEMPLATE_EXPORT, context={"user_id": current_user["id"]})
         raise HTTPException(status_code=500, detail="Error exportando templates")
 
 @router.post("/import")
-@require_auth()
-@require_usage_check("template_import")
 async def import_templates(
     import_request: TemplateImportRequest,
-    request: Request
+    current_user: Dict[str, Any] = Depends(require_usage("template_import"))
 ):
     """
     📥 Importar templates
@@ -320,11 +288,10 @@ async def import_templates(
     Importa templates desde archivo JSON.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
-        # Convertir templates a formato de diccionario
-        templates_data = [template.dict() for template in import_request.templates]
+        # Convertir templates a diccionarios a medida que se importan
+        templates_data = (template.model_dump() for template in import_request.templates)
         
         imported_ids = await template_service.import_templates(
             templates_data,
@@ -339,14 +306,13 @@ async def import_templates(
         }
         
     except Exception as e:
-        log_error(e, ErrorType.TEMPLATE_IMPORT, {"user_id": user_data["id"]})
+        log_error(e, ErrorType.TEMPLATE_IMPORT, context={"user_id": current_user["id"]})
         raise HTTPException(status_code=500, detail="Error importando templates")
 
 @router.get("/search/suggestions")
-@require_auth()
 async def get_search_suggestions(
-    request: Request,
-    query: str = Query(..., description="Término de búsqueda")
+    query: str = Query(..., description="Término de búsqueda"),
+    current_user: Dict[str, Any] = Depends(get_authenticated_user)
 ):
     """
     🔍 Obtener sugerencias de búsqueda
@@ -354,21 +320,10 @@ async def get_search_suggestions(
     Retorna sugerencias basadas en el término de búsqueda.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
         # Buscar templates que coincidan
-        search_params = TemplateSearchRequest(query=query, page=1, per_page=10)
-        templates = await template_service.list_templates(user_id, search_params)
-        
-        suggestions = []
-        for template in templates.templates:
-            suggestions.append({
-                "id": template.id,
-                "title": template.title,
-                "category": template.category.value,
-                "description": template.description[:100] + "..." if len(template.description) > 100 else template.description
-            })
+        suggestions = await template_service.suggest(user_id, query, limit=10)
         
         return {
             "suggestions": suggestions,
@@ -376,14 +331,13 @@ async def get_search_suggestions(
         }
         
     except Exception as e:
-        log_error(e, ErrorType.TEMPLATE_SEARCH, {"user_id": user_data["id"]})
+        log_error(e, ErrorType.TEMPLATE_SEARCH, context={"user_id": current_user["id"]})
         raise HTTPException(status_code=500, detail="Error obteniendo sugerencias")
 
 @router.get("/popular/list")
-@require_auth()
 async def get_popular_templates(
-    request: Request,
-    limit: int = Query(10, ge=1, le=50, description="Número de templates a retornar")
+    limit: int = Query(10, ge=1, le=50, description="Número de templates a retornar"),
+    current_user: Dict[str, Any] = Depends(get_authenticated_user)
 ):
     """
     🔥 Obtener templates populares
@@ -391,12 +345,9 @@ async def get_popular_templates(
     Retorna los templates más utilizados.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
-        # Obtener estadísticas y extraer los más populares
-        stats = await template_service.get_template_stats(user_id)
-        popular_templates = stats.most_used_templates[:limit]
+        popular_templates = await template_service.get_popular_templates(user_id, limit)
         
         return {
             "templates": popular_templates,
@@ -404,14 +355,13 @@ async def get_popular_templates(
         }
         
     except Exception as e:
-        log_error(e, ErrorType.TEMPLATE_POPULAR, {"user_id": user_data["id"]})
+        log_error(e, ErrorType.TEMPLATE_POPULAR, context={"user_id": current_user["id"]})
         raise HTTPException(status_code=500, detail="Error obteniendo templates populares")
 
 @router.get("/recent/list")
-@require_auth()
 async def get_recent_templates(
-    request: Request,
-    limit: int = Query(10, ge=1, le=50, description="Número de templates a retornar")
+    limit: int = Query(10, ge=1, le=50, description="Número de templates a retornar"),
+    current_user: Dict[str, Any] = Depends(get_authenticated_user)
 ):
     """
     ⏰ Obtener templates recientes
@@ -419,12 +369,9 @@ async def get_recent_templates(
     Retorna los templates creados más recientemente.
     """
     try:
-        user_data = request.state.user
-        user_id = user_data["id"]
+        user_id = current_user["id"]
         
-        # Obtener estadísticas y extraer los recientes
-        stats = await template_service.get_template_stats(user_id)
-        recent_templates = stats.recent_templates[:limit]
+        recent_templates = await template_service.get_recent_templates(user_id, limit)
         
         return {
             "templates": recent_templates,
@@ -432,5 +379,5 @@ async def get_recent_templates(
         }
         
     except Exception as e:
-        log_error(e, ErrorType.TEMPLATE_RECENT, {"user_id": user_data["id"]})
+        log_error(e, ErrorType.TEMPLATE_RECENT, context={"user_id": current_user["id"]})
         raise HTTPException(status_code=500, detail="Error obteniendo templates recientes") 
\ No newline at end of file
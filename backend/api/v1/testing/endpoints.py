@@ -1,32 +1,81 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, HTTPException, Query
+from core.config import PERFORMANCE_CONFIG
+from core.database import get_supabase
 from services.monitoring.error_handler import log_error, ErrorType, ErrorSeverity
 
+# El servicio RAG se importa una sola vez; si no puede inicializarse, las
+# pruebas que dependen de él responden como desconectadas
+try:
+    from services.legal.rag import rag_service
+except Exception as e:
+    rag_service = None
+    log_error(e, ErrorType.EXTERNAL_API, severity=ErrorSeverity.HIGH, context={"service": "rag"})
+
 router = APIRouter()
 
+RAG_UNAVAILABLE = "Servicio RAG no disponible"
+
+# Presupuesto por prueba: un servicio colgado no puede bloquear /test/all
+HEALTHCHECK_TIMEOUT = PERFORMANCE_CONFIG["healthcheck_timeout_seconds"]
+
+def _timeout_result(error_type: ErrorType, service: str) -> dict:
+    """Resultado de una prueba que superó HEALTHCHECK_TIMEOUT"""
+    error_id = log_error(
+        TimeoutError(f"{service} no respondió en {HEALTHCHECK_TIMEOUT}s"),
+        error_type,
+        severity=ErrorSeverity.HIGH,
+        context={"service": service, "timeout_seconds": HEALTHCHECK_TIMEOUT}
+    )
+    return {
+        "status": "❌ Error",
+        "ok": False,
+        "message": "timeout",
+        "error_id": error_id
+    }
+
+def _error_result(error: BaseException) -> dict:
+    """Resultado de una prueba que terminó con una excepción no controlada"""
+    error_id = log_error(error, ErrorType.UNKNOWN, severity=ErrorSeverity.HIGH, context={"endpoint": "test_all"})
+    return {
+        "status": "❌ Error",
+        "ok": False,
+        "message": f"Error ejecutando la prueba: {str(error)}",
+        "error_id": error_id
+    }
+
 @router.get("/vectorstore") 
 async def test_vectorstore():
     """Probar conexión con Pinecone"""
     try:
-        from services.legal.rag import rag_service
-        if rag_service.vectorstore:
-            stats = rag_service.vectorstore.describe_index_stats()
+        if rag_service is not None and rag_service.vectorstore:
+            # El cliente de Pinecone es síncrono: ejecutarlo fuera del event loop
+            stats = await asyncio.wait_for(
+                asyncio.to_thread(rag_service.vectorstore.describe_index_stats),
+                HEALTHCHECK_TIMEOUT
+            )
             return {
                 "status": "✅ Conectado",
+                "ok": True,
                 "total_vectors": stats.total_vector_count,
                 "dimension": stats.dimension,
                 "message": "Pinecone funcionando correctamente"
             }
         else:
-            error_msg = "Vectorstore no inicializado"
-            log_error(Exception(error_msg), ErrorType.EXTERNAL_API, ErrorSeverity.HIGH)
+            error_msg = "Vectorstore no inicializado" if rag_service is not None else RAG_UNAVAILABLE
+            log_error(Exception(error_msg), ErrorType.EXTERNAL_API, severity=ErrorSeverity.HIGH)
             return {
                 "status": "❌ Desconectado", 
+                "ok": False,
                 "message": error_msg
             }
+    except asyncio.TimeoutError:
+        return _timeout_result(ErrorType.EXTERNAL_API, "pinecone")
     except Exception as e:
-        error_id = log_error(e, ErrorType.EXTERNAL_API, ErrorSeverity.HIGH, context={"service": "pinecone"})
+        error_id = log_error(e, ErrorType.EXTERNAL_API, severity=ErrorSeverity.HIGH, context={"service": "pinecone"})
         return {
             "status": "❌ Error",
+            "ok": False,
             "message": f"Error conectando Pinecone: {str(e)}",
             "error_id": error_id
         }
@@ -35,20 +84,27 @@ async def test_vectorstore():
 async def test_database():
     """Probar conexión con Supabase"""
     try:
-        from core.database import get_supabase
         supabase = get_supabase()
-        result = supabase.table('user_profiles').select('id').limit(1).execute()
+        # El cliente de Supabase es síncrono: ejecutarlo fuera del event loop
+        result = await asyncio.wait_for(
+            asyncio.to_thread(supabase.table('user_profiles').select('id').limit(1).execute),
+            HEALTHCHECK_TIMEOUT
+        )
         
         return {
             "status": "✅ Conectado",
+            "ok": True,
             "message": "Supabase funcionando correctamente",
             "test_query": "SELECT id FROM user_profiles LIMIT 1",
             "tables_available": len(result.data) >= 0
         }
+    except asyncio.TimeoutError:
+        return _timeout_result(ErrorType.DATABASE, "supabase")
     except Exception as e:
-        error_id = log_error(e, ErrorType.DATABASE, ErrorSeverity.HIGH, context={"service": "supabase"})
+        error_id = log_error(e, ErrorType.DATABASE, severity=ErrorSeverity.HIGH, context={"service": "supabase"})
         return {
             "status": "❌ Error",
+            "ok": False,
             "message": f"Error conectando Supabase: {str(e)}",
             "error_id": error_id
         }
@@ -56,41 +112,97 @@ async def test_database():
 @router.get("/ai")
 async def test_ai():
     """Probar respuesta de IA"""
+    if rag_service is None:
+        return {
+            "status": "❌ Desconectado",
+            "ok": False,
+            "message": RAG_UNAVAILABLE
+        }
+    
     try:
-        from services.legal.rag import rag_service
-        result = await rag_service.query(
-            question="¿Qué es una SAS?",
-            context=[],
-            user_info=None,
-            user_documents=[]
+        result = await asyncio.wait_for(
+            rag_service.query(
+                question="¿Qué es una SAS?",
+                context=[],
+                user_info=None,
+                user_documents=[]
+            ),
+            HEALTHCHECK_TIMEOUT
         )
         
         return {
             "status": "✅ Funcionando",
+            "ok": True,
             "message": "IA respondiendo correctamente",
             "sample_response": result.get("answer", "")[:200] + "...",
             "response_time": result.get("response_time", 0)
         }
+    except asyncio.TimeoutError:
+        return _timeout_result(ErrorType.RAG_PROCESSING, "openai")
     except Exception as e:
-        error_id = log_error(e, ErrorType.RAG_PROCESSING, ErrorSeverity.HIGH, context={"test_query": "¿Qué es una SAS?"})
+        error_id = log_error(e, ErrorType.RAG_PROCESSING, severity=ErrorSeverity.HIGH, context={"test_query": "¿Qué es una SAS?"})
         return {
             "status": "❌ Error", 
+            "ok": False,
             "message": f"Error en respuesta IA: {str(e)}",
             "error_id": error_id
         }
 
+SKIPPED_RESULT = {
+    "status": "⏭️ Omitido",
+    "ok": False,
+    "message": "Prueba cancelada: otro servicio ya falló"
+}
+
+async def _run_until_failure(probes: dict) -> dict:
+    """Ejecutar las pruebas en paralelo y cancelar las pendientes al primer fallo"""
+    tasks = {asyncio.ensure_future(probe()): name for name, probe in probes.items()}
+    results = {}
+    pending = set(tasks)
+    
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            exception = task.exception()
+            results[tasks[task]] = _error_result(exception) if exception else task.result()
+        
+        if pending and not all(result["ok"] for result in results.values()):
+            for task in pending:
+                task.cancel()
+            # Esperar la cancelación para liberar las conexiones de inmediato
+            await asyncio.gather(*pending, return_exceptions=True)
+            for task in pending:
+                results[tasks[task]] = SKIPPED_RESULT
+            break
+    
+    return results
+
 @router.get("/all")
-async def test_all():
+async def test_all(
+    fast: bool = Query(False, description="Responder en cuanto falle el primer servicio")
+):
     """Probar todos los servicios"""
-    vectorstore_test = await test_vectorstore()
-    database_test = await test_database() 
-    ai_test = await test_ai()
+    probes = {
+        "vectorstore": test_vectorstore,
+        "database": test_database,
+        "ai": test_ai
+    }
+    
+    if fast:
+        results = await _run_until_failure(probes)
+        vectorstore_test, database_test, ai_test = (results[name] for name in probes)
+    else:
+        # Las pruebas son independientes: se ejecutan en paralelo
+        results = await asyncio.gather(
+            *(probe() for probe in probes.values()),
+            return_exceptions=True
+        )
+        vectorstore_test, database_test, ai_test = (
+            _error_result(result) if isinstance(result, BaseException) else result
+            for result in results
+        )
     
-    all_working = all([
-        vectorstore_test["status"].startswith("✅"),
-        database_test["status"].startswith("✅"), 
-        ai_test["status"].startswith("✅")
-    ])
+    all_working = all(test["ok"] for test in (vectorstore_test, database_test, ai_test))
     
     return {
         "overall_status": "✅ Todo funcionando" if all_working else "⚠️ Algunos servicios con problemas",
@@ -1,11 +1,21 @@
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
 import uvicorn
+import orjson
+import asyncio
+import importlib
 import os
 import sys
+import time
+import atexit
 import logging
+import queue
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
 
 # Importar el sistema de manejo de errores
@@ -26,40 +36,71 @@ logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
+
+# Escribir los logs desde un hilo dedicado para no bloquear el event loop
+_log_queue = queue.SimpleQueue()
+_root_logger = logging.getLogger()
+_log_listener = QueueListener(_log_queue, *_root_logger.handlers, respect_handler_level=True)
+_root_logger.handlers = [QueueHandler(_log_queue)]
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logger = logging.getLogger("LegalGPT.Main")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Crear los servicios con estado de la aplicación y liberarlos al apagar"""
+    app.state.notification_service = NotificationService()
+    await app.state.notification_service.start()
+    await auth_middleware.start_activity_writer()
+    
+    # Generar el esquema OpenAPI una sola vez al arrancar; FastAPI lo guarda en
+    # app.openapi_schema y lo reutiliza, así /docs y /openapi.json no pagan el
+    # recorrido de todos los modelos en la primera petición
+    app.openapi()
+    yield
+    await auth_middleware.stop_activity_writer()
+    await app.state.notification_service.close()
+
 # Crear la aplicación FastAPI
 app = FastAPI(
     title="LegalGPT API",
     description="API para consultas legales con IA - Asesor para PyMEs colombianas",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Exception Handlers simplificados
+HTTP_ERROR_TYPES = {
+    401: ErrorType.AUTHENTICATION,
+    403: ErrorType.AUTHORIZATION,
+    400: ErrorType.VALIDATION,
+    429: ErrorType.USAGE_LIMIT
+}
+
+# La ruta se lee directamente del scope ASGI: request.url construye y
+# parsea un objeto URL completo solo para extraer el path
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     """Manejo personalizado de excepciones HTTP"""
-    error_type = {
-        401: ErrorType.AUTHENTICATION,
-        403: ErrorType.AUTHORIZATION, 
-        400: ErrorType.VALIDATION,
-        429: ErrorType.USAGE_LIMIT
-    }.get(exc.status_code, ErrorType.UNKNOWN)
+    error_type = HTTP_ERROR_TYPES.get(exc.status_code, ErrorType.UNKNOWN)
+    path = request.scope["path"]
     
     error_id = log_error(
         error=exc,
         error_type=error_type,
         severity=ErrorSeverity.MEDIUM,
         context={
-            "path": str(request.url.path),
+            "path": path,
             "method": request.method,
             "status_code": exc.status_code
         }
     )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "error": True,
@@ -67,39 +108,46 @@ async def http_exception_handler(request: Request, exc: HTTPException):
             "status_code": exc.status_code,
             "message": exc.detail,
             "type": error_type.value,
-            "path": str(request.url.path)
+            "path": path
         }
     )
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """Manejo de excepciones generales no capturadas"""
+    # Los endpoints marcados con @classify_errors convierten sus errores en
+    # HTTPException dentro de la ruta (ClassifiedErrorRoute); aquí solo llega el resto
+    error_type = ErrorType.SYSTEM
+    path = request.scope["path"]
+    method = request.method
+    
     error_id = log_error(
         error=exc,
-        error_type=ErrorType.SYSTEM,
+        error_type=error_type,
         severity=ErrorSeverity.CRITICAL,
         context={
-            "path": str(request.url.path),
-            "method": request.method
+            "path": path,
+            "method": method
         }
     )
     
-    friendly_error = error_handler.create_user_friendly_error(exc, ErrorType.SYSTEM)
+    friendly_error = error_handler.create_user_friendly_error(exc, error_type)
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             **friendly_error,
-            "path": str(request.url.path),
-            "method": request.method
+            "path": path,
+            "method": method
         }
     )
 
 # Importar configuración
-from core.config import FRONTEND_CONFIG
+from core.config import FRONTEND_CONFIG, SECURITY_CONFIG, PERFORMANCE_CONFIG, DOCUMENT_CONFIG
 
 # Importar servicios
 from services.auth.auth_service import auth_service
+from services.auth.auth_middleware import auth_middleware
 from services.documents.document_service import document_service
 from services.legal.llm_chain import legal_chain
 from services.legal.chat_service import chat_service
@@ -107,7 +155,7 @@ from services.stats.stats_service import stats_service
 from services.templates.template_service import template_service
 from services.signatures.signature_service import signature_service
 from services.document_generator.document_generator_service import document_generator_service
-from services.notifications.notification_service import notification_service
+from services.notifications import NotificationService
 from services.export.export_service import export_service
 from services.cache import cache_service
 from services.rate_limiting import rate_limiter
@@ -125,91 +173,156 @@ app.add_middleware(
     max_age=FRONTEND_CONFIG["max_age"],
 )
 
+# Comprimir respuestas JSON grandes (listados, estadísticas, templates); añade Vary: Accept-Encoding.
+# Nivel 5 en vez del 9 por defecto: casi la misma compresión con mucho menos CPU por respuesta
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=PERFORMANCE_CONFIG["gzip_minimum_size"],
+    compresslevel=PERFORMANCE_CONFIG["gzip_compress_level"]
+)
+
+# Rechazar cuerpos demasiado grandes antes de leerlos
+MAX_REQUEST_SIZE = SECURITY_CONFIG["max_request_size_mb"] * 1024 * 1024
+
+@app.middleware("http")
+async def limit_request_size(request: Request, call_next):
+    """Rechazar peticiones cuyo Content-Length excede el máximo permitido"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_REQUEST_SIZE:
+        return ORJSONResponse(
+            status_code=413,
+            content={
+                "error": True,
+                "status_code": 413,
+                "message": f"La petición excede el tamaño máximo de {SECURITY_CONFIG['max_request_size_mb']}MB",
+                "path": str(request.url.path)
+            }
+        )
+    return await call_next(request)
+
 # Endpoints principales
+# Las respuestas de / y /info son constantes: se serializan una sola vez al importar
+_ROOT_JSON = orjson.dumps({
+    "message": "🧑‍⚖️ LegalGPT API funcionando correctamente",
+    "status": "healthy",
+    "version": "1.0.0",
+    "description": "Asesor legal automatizado para PyMEs colombianas",
+    "features": [
+        "✅ Consultas legales con IA",
+        "✅ Sistema de autenticación con Supabase", 
+        "✅ Subida de documentos legales",
+        "✅ Análisis personalizado de contratos",
+        "✅ Especializado en legislación colombiana",
+        "✅ Manejo robusto de errores"
+    ],
+    "docs": "/docs"
+})
+
 @app.get("/")
 async def root():
     """Endpoint principal - Health check"""
-    return {
-        "message": "🧑‍⚖️ LegalGPT API funcionando correctamente",
-        "status": "healthy",
-        "version": "1.0.0",
-        "description": "Asesor legal automatizado para PyMEs colombianas",
-        "features": [
-            "✅ Consultas legales con IA",
-            "✅ Sistema de autenticación con Supabase", 
-            "✅ Subida de documentos legales",
-            "✅ Análisis personalizado de contratos",
-            "✅ Especializado en legislación colombiana",
-            "✅ Manejo robusto de errores"
-        ],
-        "docs": "/docs"
+    return Response(content=_ROOT_JSON, media_type="application/json")
+
+# Estado estático del health check: la configuración y los directorios no
+# cambian mientras el proceso está vivo, así que se evalúan una sola vez
+_CONFIG_STATUS = {
+    "supabase": "✅" if os.getenv("SUPABASE_URL") else "❌",
+    "openai": "✅" if os.getenv("OPENAI_API_KEY") else "❌",
+    "jwt_secret": "✅" if os.getenv("SECRET_KEY") else "❌",
+    "pinecone": "✅" if os.getenv("PINECONE_API_KEY") else "❌"
+}
+
+_DIRECTORIES_STATUS = {
+    "uploads": "✅" if UPLOAD_DIR.is_dir() else "❌",
+    "logs": "✅" if logger_service.log_dir.is_dir() else "❌"
+}
+
+_SERVICES_STATUS = {
+    "api": "✅ Funcionando",
+    "cors": "✅ Configurado",
+    "auth": "✅ Disponible",
+    "documents": "✅ Disponible",
+    "legal_queries": "✅ Disponible",
+    "templates": "✅ Disponible",
+    "signatures": "✅ Disponible",
+    "document_generator": "✅ Disponible",
+    "notifications": "✅ Disponible",
+    "export": "✅ Disponible",
+    "cache": "✅ Disponible",
+    "rate_limiting": "✅ Disponible",
+    "logging": "✅ Disponible",
+    "database_optimizer": "✅ Disponible"
+}
+
+_HEALTH_STATIC = {
+    "status": "healthy",
+    "message": "LegalGPT API funcionando correctamente",
+    "version": "1.0.0",
+    "frontend_compatible": True,
+    "config": _CONFIG_STATUS,
+    "directories": _DIRECTORIES_STATUS,
+    "services": _SERVICES_STATUS,
+    "python_version": sys.version.split()[0],
+    "frontend_config": {
+        "allowed_origins": len(FRONTEND_CONFIG["allowed_origins"]),
+        "cors_enabled": True,
+        "auth_enabled": True
+    },
+    "document_config": {
+        "max_file_size_mb": DOCUMENT_CONFIG["max_file_size_mb"],
+        "allowed_extensions": DOCUMENT_CONFIG["allowed_extensions"],
+        "categories": DOCUMENT_CONFIG["categories"]
     }
+}
 
+_LIVENESS = {"status": "alive"}
+
+@app.get("/health/live")
 @app.get("/health")
+async def liveness_check():
+    """Liveness probe: responde de inmediato, sin E/S ni consultas"""
+    return _LIVENESS
+
+# Caché stale-while-revalidate del readiness probe: las sondas concurrentes
+# reciben la última respuesta y solo una tarea en segundo plano la recalcula
+HEALTH_CACHE_TTL = 10  # Segundos
+_health_cache = {"payload": None, "updated_at": 0.0}
+_health_refresh: Optional[asyncio.Task] = None
+
+def _compute_health() -> dict:
+    """Calcular el health check detallado"""
+    return {
+        **_HEALTH_STATIC,
+        "error_stats": error_handler.get_error_stats(),
+        "cache_stats": cache_service.get_stats(),
+        "rate_limiting_stats": rate_limiter.get_stats(),
+        "logging_stats": logger_service.get_stats()
+    }
+
+async def _refresh_health_cache():
+    """Recalcular el health check en segundo plano"""
+    global _health_refresh
+    try:
+        _health_cache["payload"] = _compute_health()
+        _health_cache["updated_at"] = time.monotonic()
+    except Exception as e:
+        log_error(e, ErrorType.SYSTEM, context={"health_check": "refresh_failed"})
+    finally:
+        _health_refresh = None
+
+@app.get("/health/ready")
 async def health_check():
-    """Health check detallado para el frontend"""
+    """Readiness probe: health check detallado para el frontend"""
+    global _health_refresh
     try:
-        from core.config import FRONTEND_CONFIG, AUTH_CONFIG, DOCUMENT_CONFIG
-        
-        config_status = {
-            "supabase": "✅" if os.getenv("SUPABASE_URL") else "❌",
-            "openai": "✅" if os.getenv("OPENAI_API_KEY") else "❌", 
-            "jwt_secret": "✅" if os.getenv("SECRET_KEY") else "❌",
-            "pinecone": "✅" if os.getenv("PINECONE_API_KEY") else "❌"
-        }
+        if _health_cache["payload"] is None:
+            # Arranque en frío: calcular en línea la primera vez
+            _health_cache["payload"] = _compute_health()
+            _health_cache["updated_at"] = time.monotonic()
+        elif time.monotonic() - _health_cache["updated_at"] > HEALTH_CACHE_TTL and _health_refresh is None:
+            _health_refresh = asyncio.create_task(_refresh_health_cache())
         
-        directories = {
-            "uploads": "✅" if UPLOAD_DIR.exists() else "❌",
-            "logs": "✅" if Path("backend/logs").exists() else "❌"
-        }
-        
-        error_stats = error_handler.get_error_stats()
-        cache_stats = cache_service.get_stats()
-        rate_limiting_stats = rate_limiter.get_stats()
-        logging_stats = logger_service.get_stats()
-        
-        # Verificar conectividad con servicios externos
-        services_status = {
-            "api": "✅ Funcionando",
-            "cors": "✅ Configurado",
-            "auth": "✅ Disponible",
-            "documents": "✅ Disponible",
-            "legal_queries": "✅ Disponible",
-            "templates": "✅ Disponible",
-            "signatures": "✅ Disponible",
-            "document_generator": "✅ Disponible",
-            "notifications": "✅ Disponible",
-            "export": "✅ Disponible",
-            "cache": "✅ Disponible",
-            "rate_limiting": "✅ Disponible",
-            "logging": "✅ Disponible",
-            "database_optimizer": "✅ Disponible"
-        }
-        
-        return {
-            "status": "healthy",
-            "message": "LegalGPT API funcionando correctamente",
-            "version": "1.0.0",
-            "frontend_compatible": True,
-            "config": config_status,
-            "directories": directories,
-            "services": services_status,
-            "error_stats": error_stats,
-            "cache_stats": cache_stats,
-            "rate_limiting_stats": rate_limiting_stats,
-            "logging_stats": logging_stats,
-            "python_version": sys.version.split()[0],
-            "frontend_config": {
-                "allowed_origins": len(FRONTEND_CONFIG["allowed_origins"]),
-                "cors_enabled": True,
-                "auth_enabled": True
-            },
-            "document_config": {
-                "max_file_size_mb": DOCUMENT_CONFIG["max_file_size_mb"],
-                "allowed_extensions": DOCUMENT_CONFIG["allowed_extensions"],
-                "categories": DOCUMENT_CONFIG["categories"]
-            }
-        }
+        return _health_cache["payload"]
         
     except Exception as e:
         error_id = log_error(e, ErrorType.SYSTEM, context={"health_check": "failed"})
@@ -219,320 +332,269 @@ async def health_check():
         )
 
 # Importar y registrar routers (nueva estructura API v1)
-try:
-    from api.v1.auth.endpoints import router as auth_router
-    app.include_router(auth_router, prefix="/api/v1/auth", tags=["🔐 Authentication"])
-except ImportError as e:
-    log_error(e, ErrorType.SYSTEM, context={"router": "auth"})
-    print(f"⚠️  No se pudo importar auth router: {e}")
-
-try:
-    from api.v1.documents.endpoints import router as documents_router
-    app.include_router(documents_router, prefix="/api/v1/documents", tags=["📄 Documents"])
-except ImportError as e:
-    log_error(e, ErrorType.SYSTEM, context={"router": "documents"})
-    print(f"⚠️  No se pudo importar documents router: {e}")
-
-try:
-    from api.v1.legal.endpoints import router as legal_router
-    app.include_router(legal_router, prefix="/api/v1/legal", tags=["🧠 Legal Queries"])
-except ImportError as e:
-    log_error(e, ErrorType.SYSTEM, context={"router": "legal"})
-    print(f"⚠️  No se pudo importar legal router: {e}")
-
-try:
-    from api.v1.admin.fine_tuning import router as fine_tuning_router
-    app.include_router(fine_tuning_router, prefix="/api/v1/admin/fine-tuning", tags=["🎯 Fine-Tuning"])
-except ImportError as e:
-    log_error(e, ErrorType.SYSTEM, context={"router": "fine_tuning"})
-    print(f"⚠️  No se pudo importar fine-tuning router: {e}")
-
-try:
-    from api.v1.stats.endpoints import router as stats_router
-    app.include_router(stats_router, prefix="/api/v1/stats", tags=["📊 Estadísticas"])
-except ImportError as e:
-    log_error(e, ErrorType.SYSTEM, context={"router": "stats"})
-    print(f"⚠️  No se pudo importar stats router: {e}")
-
-try:
-    from api.v1.templates.endpoints import router as templates_router
-    app.include_router(templates_router, prefix="/api/v1/templates", tags=["📝 Templates"])
-except ImportError as e:
-    log_error(e, ErrorType.SYSTEM, context={"router": "templates"})
-    print(f"⚠️  No se pudo importar templates router: {e}")
-
-try:
-    from api.v1.signatures.endpoints import router as signatures_router
-    app.include_router(signatures_router, prefix="/api/v1/signatures", tags=["🖊️ Firmas Digitales"])
-except ImportError as e:
-    log_error(e, ErrorType.SYSTEM, context={"router": "signatures"})
-    print(f"⚠️  No se pudo importar signatures router: {e}")
-
-try:
-    from api.v1.document_generator.endpoints import router as document_generator_router
-    app.include_router(document_generator_router, prefix="/api/v1/document-generator", tags=["📄 Generador de Documentos"])
-except ImportError as e:
-    log_error(e, ErrorType.SYSTEM, context={"router": "document_generator"})
-    print(f"⚠️  No se pudo importar document_generator router: {e}")
-
-try:
-    from api.v1.notifications.endpoints import router as notifications_router
-    app.include_router(notifications_router, prefix="/api/v1/notifications", tags=["🔔 Notificaciones"])
-except ImportError as e:
-    log_error(e, ErrorType.SYSTEM, context={"router": "notifications"})
-    print(f"⚠️  No se pudo importar notifications router: {e}")
-
-try:
-    from api.v1.export.endpoints import export_router
-    app.include_router(export_router, prefix="/api/v1/export", tags=["📤 Exportación"])
-except ImportError as e:
-    log_error(e, ErrorType.SYSTEM, context={"router": "export"})
-    print(f"⚠️  No se pudo importar export router: {e}")
-
-try:
-    from api.v1.testing.endpoints import router as testing_router
-    app.include_router(testing_router, prefix="/test", tags=["🧪 Testing"])
-except ImportError as e:
-    log_error(e, ErrorType.SYSTEM, context={"router": "testing"})
-    print(f"⚠️  No se pudo importar testing router: {e}")
+# (nombre, módulo, atributo, prefijo, tag)
+ROUTERS = [
+    ("auth", "api.v1.auth.endpoints", "router", "/api/v1/auth", "🔐 Authentication"),
+    ("documents", "api.v1.documents.endpoints", "router", "/api/v1/documents", "📄 Documents"),
+    ("legal", "api.v1.legal.endpoints", "router", "/api/v1/legal", "🧠 Legal Queries"),
+    ("fine_tuning", "api.v1.admin.fine_tuning", "router", "/api/v1/admin/fine-tuning", "🎯 Fine-Tuning"),
+    ("stats", "api.v1.stats.endpoints", "router", "/api/v1/stats", "📊 Estadísticas"),
+    ("templates", "api.v1.templates.endpoints", "router", "/api/v1/templates", "📝 Templates"),
+    ("signatures", "api.v1.signatures.endpoints", "router", "/api/v1/signatures", "🖊️ Firmas Digitales"),
+    ("document_generator", "api.v1.document_generator.endpoints", "router", "/api/v1/document-generator", "📄 Generador de Documentos"),
+    ("notifications", "api.v1.notifications.endpoints", "router", "/api/v1/notifications", "🔔 Notificaciones"),
+    ("export", "api.v1.export.endpoints", "export_router", "/api/v1/export", "📤 Exportación"),
+    ("testing", "api.v1.testing.endpoints", "router", "/test", "🧪 Testing"),
+]
+
+for name, module_path, attribute, prefix, tag in ROUTERS:
+    try:
+        router = getattr(importlib.import_module(module_path), attribute)
+    except ImportError as e:
+        log_error(e, ErrorType.SYSTEM, context={"router": name})
+        logger.warning("No se pudo importar %s router: %s", name, e)
+        continue
+    app.include_router(router, prefix=prefix, tags=[tag])
 
 # Eliminar el bloque try/except que importa y registra routes.admin
 
 # Endpoint de información de la API
-@app.get("/info")
-async def api_info():
-    """Información detallada de la API"""
-    return {
-        "name": "LegalGPT API",
-        "version": "1.0.0",
-        "description": "Asesor legal automatizado para PyMEs colombianas",
-        "endpoints": {
-            "auth": {
-                "prefix": "/auth",
-                "endpoints": [
-                    "POST /auth/register - Registrar nueva PyME",
-                    "POST /auth/login - Iniciar sesión",
-                    "GET /auth/me - Info del usuario",
-                    "POST /auth/logout - Cerrar sesión"
-                ]
-            },
-            "documents": {
-                "prefix": "/documents", 
-                "endpoints": [
-                    "POST /documents/upload - Subir documento",
-                    "GET /documents/list - Listar documentos",
-                    "GET /documents/{id} - Ver documento",
-                    "DELETE /documents/{id} - Eliminar documento"
-                ]
-            },
-            "rag": {
-                "prefix": "/rag",
-                "endpoints": [
-                    "POST /rag/query - Consulta legal con IA",
-                    "GET /rag/suggestions - Sugerencias de consultas"
-                ]
-            },
-            "stats": {
-                "prefix": "/stats",
-                "endpoints": [
-                    "GET /stats/dashboard - Dashboard completo",
-                    "GET /stats/documents - Estadísticas de documentos",
-                    "GET /stats/usage - Métricas de uso",
-                    "GET /stats/activity - Actividad reciente",
-                    "GET /stats/categories - Estadísticas por categoría",
-                    "GET /stats/chat - Estadísticas de chat",
-                    "POST /stats/analytics - Analytics avanzados",
-                    "POST /stats/export - Exportar estadísticas"
-                ]
-            },
-            "templates": {
-                "prefix": "/templates",
-                "endpoints": [
-                    "POST /templates/ - Crear template",
-                    "GET /templates/ - Listar templates",
-                    "GET /templates/{id} - Obtener template",
-                    "PUT /templates/{id} - Actualizar template",
-                    "DELETE /templates/{id} - Eliminar template",
-                    "POST /templates/{id}/use - Usar template",
-                    "POST /templates/{id}/favorite - Marcar favorito",
-                    "GET /templates/stats/overview - Estadísticas",
-                    "GET /templates/categories/list - Categorías",
-                    "POST /templates/export - Exportar templates",
-                    "POST /templates/import - Importar templates"
-                ]
-            },
-            "signatures": {
-                "prefix": "/signatures",
-                "endpoints": [
-                    "POST /signatures/documents/ - Crear documento para firma",
-                    "GET /signatures/documents/ - Listar documentos de firma",
-                    "GET /signatures/documents/{id} - Obtener documento de firma",
-                    "PUT /signatures/documents/{id} - Actualizar documento",
-                    "DELETE /signatures/documents/{id} - Eliminar documento",
-                    "POST /signatures/documents/{id}/signatories - Añadir firmante",
-                    "POST /signatures/documents/{id}/sign - Firmar documento",
-                    "POST /signatures/documents/{id}/decline - Rechazar firma",
-                    "POST /signatures/documents/{id}/resend - Reenviar invitaciones",
-                    "GET /signatures/stats/ - Estadísticas de firmas",
-                    "POST /signatures/search/ - Buscar documentos",
-                    "GET /signatures/documents/{id}/download - Descargar documento firmado",
-                    "GET /signatures/status/options - Opciones de estado",
-                    "GET /signatures/documents/{id}/progress - Progreso de firma"
-                ]
-            },
-            "document_generator": {
-                "prefix": "/document-generator",
-                "endpoints": [
-                    "POST /document-generator/generate - Generar documento",
-                    "POST /document-generator/preview - Previsualizar documento",
-                    "POST /document-generator/validate - Validar variables",
-                    "GET /document-generator/history - Historial de generación",
-                    "GET /document-generator/stats - Estadísticas de generación",
-                    "POST /document-generator/export - Exportar documentos",
-                    "GET /document-generator/document/{id} - Obtener documento generado",
-                    "DELETE /document-generator/document/{id} - Eliminar documento",
-                    "GET /document-generator/templates - Templates disponibles",
-                    "GET /document-generator/templates/{id} - Detalles de template",
-                    "GET /document-generator/variables/types - Tipos de variables",
-                    "GET /document-generator/preview/{id} - Previsualizar documento generado",
-                    "GET /document-generator/categories - Categorías disponibles",
-                    "GET /document-generator/formats - Formatos soportados"
-                ]
-            },
-            "notifications": {
-                "prefix": "/notifications",
-                "endpoints": [
-                    "POST /notifications/ - Crear notificación",
-                    "GET /notifications/ - Listar notificaciones",
-                    "GET /notifications/{id} - Obtener notificación",
-                    "PUT /notifications/{id} - Actualizar notificación",
-                    "DELETE /notifications/{id} - Eliminar notificación",
-                    "POST /notifications/mark-read - Marcar como leídas",
-                    "POST /notifications/mark-all-read - Marcar todas como leídas",
-                    "GET /notifications/stats/summary - Estadísticas",
-                    "GET /notifications/settings - Configuración",
-                    "PUT /notifications/settings - Actualizar configuración",
-                    "POST /notifications/bulk-action - Acción masiva",
-                    "GET /notifications/templates - Templates disponibles",
-                    "POST /notifications/templates/{id}/create - Crear desde template",
-                    "GET /notifications/types - Tipos disponibles",
-                    "GET /notifications/priorities - Prioridades",
-                    "GET /notifications/status-options - Opciones de estado",
-                    "GET /notifications/actions - Acciones disponibles",
-                    "GET /notifications/categories - Categorías",
-                    "POST /notifications/cleanup - Limpiar expiradas",
-                    "GET /notifications/unread-count - Conteo no leídas"
-                ]
-            },
-            "export": {
-                "prefix": "/export",
-                "endpoints": [
-                    "POST /export/ - Crear exportación",
-                    "GET /export/progress/{task_id} - Progreso de exportación",
-                    "GET /export/result/{task_id} - Resultado de exportación",
-                    "GET /export/download/{task_id} - Descargar archivo",
-                    "GET /export/history - Historial de exportaciones",
-                    "GET /export/stats - Estadísticas de exportaciones",
-                    "POST /export/validate - Validar solicitud",
-                    "POST /export/templates - Crear plantilla",
-                    "GET /export/templates - Listar plantillas",
-                    "GET /export/templates/{id} - Obtener plantilla",
-                    "PUT /export/templates/{id} - Actualizar plantilla",
-                    "DELETE /export/templates/{id} - Eliminar plantilla",
-                    "POST /export/bulk - Exportación masiva",
-                    "GET /export/formats - Formatos soportados",
-                    "GET /export/types - Tipos de exportación",
-                    "GET /export/templates/default - Plantillas por defecto",
-                    "POST /export/templates/{id}/use - Usar plantilla",
-                    "POST /export/cleanup - Limpiar expiradas",
-                    "GET /export/status - Estado del servicio",
-                    "GET /export/estimate/{type} - Estimar exportación",
-                    "GET /export/recent - Exportaciones recientes"
-                ]
-            },
-            "fine_tuning": {
-                "prefix": "/fine-tuning",
-                "endpoints": [
-                    "GET /fine-tuning/stats - Estadísticas del sistema",
-                    "POST /fine-tuning/start - Iniciar fine-tuning",
-                    "GET /fine-tuning/status/{job_id} - Estado del proceso"
-                ]
-            },
-            "testing": {
-                "prefix": "/test",
-                "endpoints": [
-                    "GET /test/vectorstore - Probar Pinecone",
-                    "GET /test/database - Probar Supabase",
-                    "GET /test/ai - Probar respuesta de IA",
-                    "GET /test/all - Probar todos los servicios"
-                ]
-            },
-            "admin": {
-                "prefix": "/admin",
-                "endpoints": [
-                    "GET /admin/errors - Estadísticas de errores",
-                    "POST /admin/init-database - Configurar base de datos"
-                ]
-            },
-            "cache": {
-                "prefix": "/admin/cache",
-                "endpoints": [
-                    "GET /admin/cache/stats - Estadísticas del caché",
-                    "POST /admin/cache/clear - Limpiar caché",
-                    "DELETE /admin/cache/key/{key} - Eliminar clave específica",
-                    "GET /admin/cache/keys - Listar claves del caché",
-                    "GET /admin/cache/key/{key}/info - Información de clave",
-                    "POST /admin/cache/invalidate-pattern - Invalidar por patrón",
-                    "GET /admin/cache/health - Salud del caché"
-                ]
-            },
-            "rate_limiting": {
-                "prefix": "/admin/rate-limiting",
-                "endpoints": [
-                    "GET /admin/rate-limiting/stats - Estadísticas del rate limiting",
-                    "POST /admin/rate-limiting/reset-stats - Reiniciar estadísticas",
-                    "POST /admin/rate-limiting/clear-all - Limpiar todos los límites",
-                    "GET /admin/rate-limiting/blocked-users - Listar usuarios bloqueados",
-                    "GET /admin/rate-limiting/blocked-ips - Listar IPs bloqueadas",
-                    "DELETE /admin/rate-limiting/unblock-user/{user_id} - Desbloquear usuario",
-                    "DELETE /admin/rate-limiting/unblock-ip/{ip_address} - Desbloquear IP",
-                    "GET /admin/rate-limiting/config - Configuración actual",
-                    "GET /admin/rate-limiting/health - Salud del rate limiting"
-                ]
-            },
-            "logging": {
-                "prefix": "/admin/logging",
-                "endpoints": [
-                    "GET /admin/logging/stats - Estadísticas del sistema de logging",
-                    "GET /admin/logging/export - Exportar logs filtrados",
-                    "POST /admin/logging/clear - Limpiar archivos de log",
-                    "GET /admin/logging/levels - Niveles de logging disponibles",
-                    "GET /admin/logging/categories - Categorías de logging disponibles",
-                    "GET /admin/logging/files - Información de archivos de log",
-                    "GET /admin/logging/recent - Logs recientes",
-                    "GET /admin/logging/health - Salud del sistema de logging",
-                    "POST /admin/logging/test - Generar log de prueba"
-                ]
-            },
-            "database": {
-                "prefix": "/admin/database",
-                "endpoints": [
-                    "GET /admin/database/stats - Estadísticas de consultas",
-                    "GET /admin/database/slow-queries - Consultas lentas",
-                    "POST /admin/database/optimize-table - Optimizar tabla específica",
-                    "POST /admin/database/batch-query - Ejecutar consultas en lote",
-                    "GET /admin/database/performance-metrics - Métricas de performance",
-                    "POST /admin/database/clear-query-cache - Limpiar caché de consultas",
-                    "GET /admin/database/health - Salud del optimizador",
-                    "GET /admin/database/query-patterns - Analizar patrones de consultas"
-                ]
-            }
+_INFO_JSON = orjson.dumps({
+    "name": "LegalGPT API",
+    "version": "1.0.0",
+    "description": "Asesor legal automatizado para PyMEs colombianas",
+    "endpoints": {
+        "auth": {
+            "prefix": "/auth",
+            "endpoints": [
+                "POST /auth/register - Registrar nueva PyME",
+                "POST /auth/login - Iniciar sesión",
+                "GET /auth/me - Info del usuario",
+                "POST /auth/logout - Cerrar sesión"
+            ]
+        },
+        "documents": {
+            "prefix": "/documents", 
+            "endpoints": [
+                "POST /documents/upload - Subir documento",
+                "GET /documents/list - Listar documentos",
+                "GET /documents/{id} - Ver documento",
+                "DELETE /documents/{id} - Eliminar documento"
+            ]
+        },
+        "rag": {
+            "prefix": "/rag",
+            "endpoints": [
+                "POST /rag/query - Consulta legal con IA",
+                "GET /rag/suggestions - Sugerencias de consultas"
+            ]
+        },
+        "stats": {
+            "prefix": "/stats",
+            "endpoints": [
+                "GET /stats/dashboard - Dashboard completo",
+                "GET /stats/documents - Estadísticas de documentos",
+                "GET /stats/usage - Métricas de uso",
+                "GET /stats/activity - Actividad reciente",
+                "GET /stats/categories - Estadísticas por categoría",
+                "GET /stats/chat - Estadísticas de chat",
+                "POST /stats/analytics - Analytics avanzados",
+                "POST /stats/export - Exportar estadísticas"
+            ]
         },
-        "documentation": {
-            "swagger": "/docs",
-            "redoc": "/redoc"
+        "templates": {
+            "prefix": "/templates",
+            "endpoints": [
+                "POST /templates/ - Crear template",
+                "GET /templates/ - Listar templates",
+                "GET /templates/{id} - Obtener template",
+                "PUT /templates/{id} - Actualizar template",
+                "DELETE /templates/{id} - Eliminar template",
+                "POST /templates/{id}/use - Usar template",
+                "POST /templates/{id}/favorite - Marcar favorito",
+                "GET /templates/stats/overview - Estadísticas",
+                "GET /templates/categories/list - Categorías",
+                "POST /templates/export - Exportar templates",
+                "POST /templates/import - Importar templates"
+            ]
+        },
+        "signatures": {
+            "prefix": "/signatures",
+            "endpoints": [
+                "POST /signatures/documents/ - Crear documento para firma",
+                "GET /signatures/documents/ - Listar documentos de firma",
+                "GET /signatures/documents/{id} - Obtener documento de firma",
+                "PUT /signatures/documents/{id} - Actualizar documento",
+                "DELETE /signatures/documents/{id} - Eliminar documento",
+                "POST /signatures/documents/{id}/signatories - Añadir firmante",
+                "POST /signatures/documents/{id}/sign - Firmar documento",
+                "POST /signatures/documents/{id}/decline - Rechazar firma",
+                "POST /signatures/documents/{id}/resend - Reenviar invitaciones",
+                "GET /signatures/stats/ - Estadísticas de firmas",
+                "POST /signatures/search/ - Buscar documentos",
+                "GET /signatures/documents/{id}/download - Descargar documento firmado",
+                "GET /signatures/status/options - Opciones de estado",
+                "GET /signatures/documents/{id}/progress - Progreso de firma"
+            ]
+        },
+        "document_generator": {
+            "prefix": "/document-generator",
+            "endpoints": [
+                "POST /document-generator/generate - Generar documento",
+                "POST /document-generator/preview - Previsualizar documento",
+                "POST /document-generator/validate - Validar variables",
+                "GET /document-generator/history - Historial de generación",
+                "GET /document-generator/stats - Estadísticas de generación",
+                "POST /document-generator/export - Exportar documentos",
+                "GET /document-generator/document/{id} - Obtener documento generado",
+                "DELETE /document-generator/document/{id} - Eliminar documento",
+                "GET /document-generator/templates - Templates disponibles",
+                "GET /document-generator/templates/{id} - Detalles de template",
+                "GET /document-generator/variables/types - Tipos de variables",
+                "GET /document-generator/preview/{id} - Previsualizar documento generado",
+                "GET /document-generator/categories - Categorías disponibles",
+                "GET /document-generator/formats - Formatos soportados"
+            ]
+        },
+        "notifications": {
+            "prefix": "/notifications",
+            "endpoints": [
+                "POST /notifications/ - Crear notificación",
+                "GET /notifications/ - Listar notificaciones",
+                "GET /notifications/{id} - Obtener notificación",
+                "PUT /notifications/{id} - Actualizar notificación",
+                "DELETE /notifications/{id} - Eliminar notificación",
+                "POST /notifications/mark-read - Marcar como leídas",
+                "POST /notifications/mark-all-read - Marcar todas como leídas",
+                "GET /notifications/stats/summary - Estadísticas",
+                "GET /notifications/settings - Configuración",
+                "PUT /notifications/settings - Actualizar configuración",
+                "POST /notifications/bulk-action - Acción masiva",
+                "GET /notifications/templates - Templates disponibles",
+                "POST /notifications/templates/{id}/create - Crear desde template",
+                "GET /notifications/types - Tipos disponibles",
+                "GET /notifications/priorities - Prioridades",
+                "GET /notifications/status-options - Opciones de estado",
+                "GET /notifications/actions - Acciones disponibles",
+                "GET /notifications/categories - Categorías",
+                "POST /notifications/cleanup - Limpiar expiradas",
+                "GET /notifications/unread-count - Conteo no leídas"
+            ]
+        },
+        "export": {
+            "prefix": "/export",
+            "endpoints": [
+                "POST /export/ - Crear exportación",
+                "GET /export/progress/{task_id} - Progreso de exportación",
+                "GET /export/result/{task_id} - Resultado de exportación",
+                "GET /export/download/{task_id} - Descargar archivo",
+                "GET /export/history - Historial de exportaciones",
+                "GET /export/stats - Estadísticas de exportaciones",
+                "POST /export/validate - Validar solicitud",
+                "POST /export/templates - Crear plantilla",
+                "GET /export/templates - Listar plantillas",
+                "GET /export/templates/{id} - Obtener plantilla",
+                "PUT /export/templates/{id} - Actualizar plantilla",
+                "DELETE /export/templates/{id} - Eliminar plantilla",
+                "POST /export/bulk - Exportación masiva",
+                "GET /export/formats - Formatos soportados",
+                "GET /export/types - Tipos de exportación",
+                "GET /export/templates/default - Plantillas por defecto",
+                "POST /export/templates/{id}/use - Usar plantilla",
+                "POST /export/cleanup - Limpiar expiradas",
+                "GET /export/status - Estado del servicio",
+                "GET /export/estimate/{type} - Estimar exportación",
+                "GET /export/recent - Exportaciones recientes"
+            ]
+        },
+        "fine_tuning": {
+            "prefix": "/fine-tuning",
+            "endpoints": [
+                "GET /fine-tuning/stats - Estadísticas del sistema",
+                "POST /fine-tuning/start - Iniciar fine-tuning",
+                "GET /fine-tuning/status/{job_id} - Estado del proceso"
+            ]
+        },
+        "testing": {
+            "prefix": "/test",
+            "endpoints": [
+                "GET /test/vectorstore - Probar Pinecone",
+                "GET /test/database - Probar Supabase",
+                "GET /test/ai - Probar respuesta de IA",
+                "GET /test/all - Probar todos los servicios"
+            ]
+        },
+        "admin": {
+            "prefix": "/admin",
+            "endpoints": [
+                "GET /admin/errors - Estadísticas de errores",
+                "POST /admin/init-database - Configurar base de datos"
+            ]
+        },
+        "cache": {
+            "prefix": "/admin/cache",
+            "endpoints": [
+                "GET /admin/cache/stats - Estadísticas del caché",
+                "POST /admin/cache/clear - Limpiar caché",
+                "DELETE /admin/cache/key/{key} - Eliminar clave específica",
+                "GET /admin/cache/keys - Listar claves del caché",
+                "GET /admin/cache/key/{key}/info - Información de clave",
+                "POST /admin/cache/invalidate-pattern - Invalidar por patrón",
+                "GET /admin/cache/health - Salud del caché"
+            ]
+        },
+        "rate_limiting": {
+            "prefix": "/admin/rate-limiting",
+            "endpoints": [
+                "GET /admin/rate-limiting/stats - Estadísticas del rate limiting",
+                "POST /admin/rate-limiting/reset-stats - Reiniciar estadísticas",
+                "POST /admin/rate-limiting/clear-all - Limpiar todos los límites",
+                "GET /admin/rate-limiting/blocked-users - Listar usuarios bloqueados",
+                "GET /admin/rate-limiting/blocked-ips - Listar IPs bloqueadas",
+                "DELETE /admin/rate-limiting/unblock-user/{user_id} - Desbloquear usuario",
+                "DELETE /admin/rate-limiting/unblock-ip/{ip_address} - Desbloquear IP",
+                "GET /admin/rate-limiting/config - Configuración actual",
+                "GET /admin/rate-limiting/health - Salud del rate limiting"
+            ]
+        },
+        "logging": {
+            "prefix": "/admin/logging",
+            "endpoints": [
+                "GET /admin/logging/stats - Estadísticas del sistema de logging",
+                "GET /admin/logging/export - Exportar logs filtrados",
+                "POST /admin/logging/clear - Limpiar archivos de log",
+                "GET /admin/logging/levels - Niveles de logging disponibles",
+                "GET /admin/logging/categories - Categorías de logging disponibles",
+                "GET /admin/logging/files - Información de archivos de log",
+                "GET /admin/logging/recent - Logs recientes",
+                "GET /admin/logging/health - Salud del sistema de logging",
+                "POST /admin/logging/test - Generar log de prueba"
+            ]
+        },
+        "database": {
+            "prefix": "/admin/database",
+            "endpoints": [
+                "GET /admin/database/stats - Estadísticas de consultas",
+                "GET /admin/database/slow-queries - Consultas lentas",
+                "POST /admin/database/optimize-table - Optimizar tabla específica",
+                "POST /admin/database/batch-query - Ejecutar consultas en lote",
+                "GET /admin/database/performance-metrics - Métricas de performance",
+                "POST /admin/database/clear-query-cache - Limpiar caché de consultas",
+                "GET /admin/database/health - Salud del optimizador",
+                "GET /admin/database/query-patterns - Analizar patrones de consultas"
+            ]
         }
+    },
+    "documentation": {
+        "swagger": "/docs",
+        "redoc": "/redoc"
     }
+})
+
+@app.get("/info")
+async def api_info():
+    """Información detallada de la API"""
+    return Response(content=_INFO_JSON, media_type="application/json")
 
 
 
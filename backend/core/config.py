@@ -12,7 +12,7 @@ APP_CONFIG = {
 }
 
 # Configuración de la base de datos (Supabase)
-DATABASE_CONFIG = {
+SUPABASE_CONFIG = {
     "url": os.getenv("SUPABASE_URL"),
     "key": os.getenv("SUPABASE_KEY"),
     "service_role_key": os.getenv("SUPABASE_SERVICE_ROLE_KEY"),
@@ -43,15 +43,23 @@ JWT_CONFIG = {
 }
 
 # Configuración del frontend
+# Lista explícita de orígenes (CORS_ORIGINS separados por comas): con credenciales
+# no se puede usar "*" y los preflight se resuelven contra un conjunto fijo
+DEFAULT_ALLOWED_ORIGINS = [
+    "http://localhost:3000",
+    "https://legalgpt.vercel.app",
+    "https://legalgpt-git-main-legalgpt.vercel.app",
+    "https://legalgpt-legalgpt.vercel.app"
+]
+
 FRONTEND_CONFIG = {
     "allowed_origins": [
-        "http://localhost:3000",
-        "https://legalgpt.vercel.app",
-        "https://legalgpt-git-main-legalgpt.vercel.app",
-        "https://legalgpt-legalgpt.vercel.app"
-    ],
+        origin.strip() for origin in os.getenv("CORS_ORIGINS", "").split(",") if origin.strip()
+    ] or DEFAULT_ALLOWED_ORIGINS,
     "allowed_methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    "allowed_headers": ["*"]
+    "allowed_headers": ["Authorization", "Content-Type", "If-None-Match"],
+    "expose_headers": ["Content-Disposition", "ETag"],
+    "max_age": int(os.getenv("CORS_MAX_AGE", "600"))
 }
 
 # Configuración de autenticación
@@ -111,7 +119,10 @@ PERFORMANCE_CONFIG = {
     "cache_enabled": True,
     "max_context_length": 4000,
     "max_sources": 5,
-    "vector_search_k": 10
+    "vector_search_k": 10,
+    "gzip_minimum_size": int(os.getenv("GZIP_MINIMUM_SIZE", "500")),
+    "gzip_compress_level": int(os.getenv("GZIP_COMPRESS_LEVEL", "5")),
+    "healthcheck_timeout_seconds": float(os.getenv("HEALTHCHECK_TIMEOUT_S", "3"))
 }
 
 # Configuración de caché
@@ -203,6 +214,7 @@ NOTIFICATION_CONFIG = {
 STATS_CONFIG = {
     "cache_enabled": os.getenv("STATS_CACHE_ENABLED", "true").lower() == "true",
     "cache_duration": int(os.getenv("STATS_CACHE_DURATION", "300")),  # 5 minutos
+    "user_cache_ttl": int(os.getenv("STATS_USER_CACHE_TTL", "30")),  # Respuestas por usuario ya serializadas
     "max_export_size": int(os.getenv("MAX_EXPORT_SIZE", "10000")),
     "analytics_enabled": os.getenv("ANALYTICS_ENABLED", "true").lower() == "true",
     "achievements_enabled": os.getenv("ACHIEVEMENTS_ENABLED", "true").lower() == "true",
@@ -247,7 +259,10 @@ SIGNATURE_CONFIG = {
     "supported_signature_methods": ["draw", "type", "upload"],
     "auto_extend_expiration": os.getenv("SIGNATURE_AUTO_EXTEND_EXPIRATION", "false").lower() == "true",
     "reminder_days_before_expiry": int(os.getenv("SIGNATURE_REMINDER_DAYS", "7")),
-    "max_reminders_per_document": int(os.getenv("SIGNATURE_MAX_REMINDERS", "3"))
+    "max_reminders_per_document": int(os.getenv("SIGNATURE_MAX_REMINDERS", "3")),
+    "storage_bucket": os.getenv("SIGNATURE_STORAGE_BUCKET", "signatures"),
+    "download_url_expires_seconds": int(os.getenv("SIGNATURE_DOWNLOAD_URL_EXPIRES_SECONDS", "300")),
+    "max_concurrent_invitations": int(os.getenv("SIGNATURE_MAX_CONCURRENT_INVITATIONS", "10"))
 }
 
 # Configuración del generador de documentos
@@ -1,24 +1,32 @@
 from supabase import create_client, Client
-from core.config import SUPABASE_URL, SUPABASE_ANON_KEY, SUPABASE_SERVICE_ROLE_KEY
+from core.config import SUPABASE_CONFIG
 import asyncio
 from typing import Optional
 
-# Cliente de Supabase
+# Cliente de Supabase compartido por todos los servicios. Se crea una sola vez
+# para reutilizar su pool de conexiones HTTP keep-alive hacia PostgREST en lugar
+# de negociar una conexión nueva por consulta.
 supabase: Optional[Client] = None
 
-async def init_db():
-    """Inicializar conexión con Supabase"""
+def _create_client() -> Client:
+    """Crear el cliente compartido de Supabase"""
     global supabase
     
+    if supabase is None:
+        supabase = create_client(SUPABASE_CONFIG["url"], SUPABASE_CONFIG["anon_key"])
+    return supabase
+
+async def init_db():
+    """Inicializar conexión con Supabase"""
     try:
         # Crear cliente de Supabase
-        supabase = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+        client = _create_client()
         
-        # Verificar conexión
-        result = supabase.table('users').select('id').limit(1).execute()
+        # Verificar conexión (y precalentar el pool)
+        result = client.table('users').select('id').limit(1).execute()
         
         print("✅ Conexión con Supabase establecida")
-        return supabase
+        return client
         
     except Exception as e:
         print(f"❌ Error conectando con Supabase: {e}")
@@ -27,7 +35,7 @@ async def init_db():
 def get_supabase() -> Client:
     """Obtener cliente de Supabase"""
     if supabase is None:
-        raise RuntimeError("Supabase no ha sido inicializado")
+        return _create_client()
     return supabase
 
 async def create_tables():
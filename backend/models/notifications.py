@@ -8,8 +8,10 @@ del backend de LegalGPT.
 from typing import Dict, List, Optional, Any, Union
 from enum import Enum
 from datetime import datetime
-from pydantic import BaseModel, Field, validator
-import re
+from pydantic import BaseModel, ConfigDict, Field
+
+# Formato de hora HH:MM
+_TIME_PATTERN = r'^([01]?[0-9]|2[0-3]):[0-5][0-9]$'
 
 class NotificationType(str, Enum):
     """Tipos de notificaciones disponibles"""
@@ -53,31 +55,17 @@ class NotificationAction(str, Enum):
 
 class NotificationCreate(BaseModel):
     """Modelo para crear una nueva notificación"""
+    model_config = ConfigDict(str_strip_whitespace=True)
+    
     user_id: str = Field(..., description="ID del usuario destinatario")
     type: NotificationType = Field(..., description="Tipo de notificación")
-    title: str = Field(..., description="Título de la notificación")
-    message: str = Field(..., description="Mensaje de la notificación")
+    title: str = Field(..., min_length=1, max_length=200, description="Título de la notificación")
+    message: str = Field(..., min_length=1, max_length=1000, description="Mensaje de la notificación")
     priority: NotificationPriority = Field(default=NotificationPriority.MEDIUM, description="Prioridad")
     data: Optional[Dict[str, Any]] = Field(default=None, description="Datos adicionales")
     actions: Optional[List[NotificationAction]] = Field(default=None, description="Acciones disponibles")
     expires_at: Optional[datetime] = Field(default=None, description="Fecha de expiración")
     category: Optional[str] = Field(default=None, description="Categoría de la notificación")
-    
-    @validator('title')
-    def validate_title(cls, v):
-        if len(v.strip()) == 0:
-            raise ValueError('El título no puede estar vacío')
-        if len(v) > 200:
-            raise ValueError('El título no puede exceder 200 caracteres')
-        return v.strip()
-    
-    @validator('message')
-    def validate_message(cls, v):
-        if len(v.strip()) == 0:
-            raise ValueError('El mensaje no puede estar vacío')
-        if len(v) > 1000:
-            raise ValueError('El mensaje no puede exceder 1000 caracteres')
-        return v.strip()
 
 class NotificationResponse(BaseModel):
     """Modelo de respuesta para notificaciones"""
@@ -105,10 +93,11 @@ class NotificationUpdate(BaseModel):
 class NotificationListResponse(BaseModel):
     """Modelo de respuesta para listar notificaciones"""
     notifications: List[NotificationResponse] = Field(..., description="Lista de notificaciones")
-    total: int = Field(..., description="Total de notificaciones")
+    total: Optional[int] = Field(None, description="Total de notificaciones (solo si se solicita)")
     unread_count: int = Field(..., description="Cantidad de no leídas")
-    page: int = Field(..., description="Página actual")
     per_page: int = Field(..., description="Notificaciones por página")
+    has_more: bool = Field(default=False, description="Si hay más páginas")
+    next_cursor: Optional[str] = Field(None, description="Cursor de la página siguiente")
 
 class NotificationSearchRequest(BaseModel):
     """Modelo para buscar notificaciones"""
@@ -119,8 +108,9 @@ class NotificationSearchRequest(BaseModel):
     search: Optional[str] = Field(None, description="Buscar en título y mensaje")
     date_from: Optional[datetime] = Field(None, description="Fecha desde")
     date_to: Optional[datetime] = Field(None, description="Fecha hasta")
-    page: int = Field(default=1, ge=1, description="Página")
+    cursor: Optional[str] = Field(None, description="Cursor de paginación")
     per_page: int = Field(default=20, ge=1, le=100, description="Elementos por página")
+    include_total: bool = Field(default=False, description="Calcular el total de resultados")
 
 class NotificationStats(BaseModel):
     """Modelo para estadísticas de notificaciones"""
@@ -138,17 +128,10 @@ class NotificationSettings(BaseModel):
     in_app_enabled: bool = Field(default=True, description="Notificaciones en la app")
     types_enabled: Dict[NotificationType, bool] = Field(default_factory=dict, description="Tipos habilitados")
     quiet_hours_enabled: bool = Field(default=False, description="Horas silenciosas")
-    quiet_hours_start: Optional[str] = Field(default=None, description="Inicio horas silenciosas (HH:MM)")
-    quiet_hours_end: Optional[str] = Field(default=None, description="Fin horas silenciosas (HH:MM)")
+    quiet_hours_start: Optional[str] = Field(default=None, pattern=_TIME_PATTERN, description="Inicio horas silenciosas (HH:MM)")
+    quiet_hours_end: Optional[str] = Field(default=None, pattern=_TIME_PATTERN, description="Fin horas silenciosas (HH:MM)")
     max_notifications: int = Field(default=100, ge=10, le=1000, description="Máximo de notificaciones")
     auto_archive_days: int = Field(default=30, ge=1, le=365, description="Días para auto-archivar")
-    
-    @validator('quiet_hours_start', 'quiet_hours_end')
-    def validate_time_format(cls, v):
-        if v is not None:
-            if not re.match(r'^([01]?[0-9]|2[0-3]):[0-5][0-9]$', v):
-                raise ValueError('Formato de hora inválido (HH:MM)')
-        return v
 
 class NotificationBulkAction(BaseModel):
     """Modelo para acciones masivas en notificaciones"""
@@ -1,10 +1,11 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from fastapi import UploadFile
+from core.config import CHAT_CONFIG
 
 class QueryRequest(BaseModel):
     """Solicitud de consulta legal"""
-    question: str
+    question: str = Field(..., max_length=CHAT_CONFIG["max_message_length"])
     context: Optional[str] = ""
     use_uploaded_docs: Optional[bool] = True
     
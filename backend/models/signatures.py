@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, validator
 from uuid import UUID, uuid4
 
 
@@ -44,10 +44,17 @@ class SignatoryCreate(SignatoryBase):
 
 class SignatoryResponse(SignatoryBase):
     """Modelo de respuesta para firmantes"""
+    # Respuestas de solo lectura: inmutables una vez construidas
+    model_config = ConfigDict(frozen=True)
+    
     id: str = Field(..., description="ID único del firmante")
     status: SignatureStatus = Field(..., description="Estado de la firma")
     signed_at: Optional[datetime] = Field(None, description="Fecha de firma")
-    signature_data: Optional[str] = Field(None, description="Datos de la firma")
+    signature_data: Optional[str] = Field(
+        None,
+        exclude=True,
+        description="Datos de la firma (se obtienen en /documents/{id}/signatories/{sid}/image)"
+    )
     ip_address: Optional[str] = Field(None, description="Dirección IP de firma")
     location: Optional[str] = Field(None, description="Ubicación de firma")
     certificate_hash: Optional[str] = Field(None, description="Hash del certificado")
@@ -93,6 +100,8 @@ class DocumentSignatureUpdate(BaseModel):
 
 class DocumentSignatureResponse(DocumentSignatureBase):
     """Modelo de respuesta para documentos de firma"""
+    model_config = ConfigDict(frozen=True)
+    
     id: str = Field(..., description="ID único del documento")
     user_id: str = Field(..., description="ID del usuario creador")
     status: DocumentStatus = Field(..., description="Estado del documento")
@@ -108,6 +117,8 @@ class DocumentSignatureResponse(DocumentSignatureBase):
 
 class DocumentSignatureListResponse(BaseModel):
     """Modelo de respuesta para lista de documentos de firma"""
+    model_config = ConfigDict(frozen=True)
+    
     documents: List[DocumentSignatureResponse] = Field(..., description="Lista de documentos")
     total: int = Field(..., description="Total de documentos")
     page: int = Field(..., description="Página actual")
@@ -124,8 +135,16 @@ class SignatureRequest(BaseModel):
     location: Optional[str] = Field(None, description="Ubicación")
 
 
+class SignatureDeclineRequest(BaseModel):
+    """Modelo para rechazar una firma"""
+    signatory_id: str = Field(..., description="ID del firmante")
+    reason: str = Field(default="", description="Razón del rechazo")
+
+
 class SignatureStats(BaseModel):
     """Estadísticas de firmas"""
+    model_config = ConfigDict(frozen=True)
+    
     total_documents: int = Field(..., description="Total de documentos")
     completed_documents: int = Field(..., description="Documentos completados")
     pending_documents: int = Field(..., description="Documentos pendientes")
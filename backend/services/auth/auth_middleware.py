@@ -5,15 +5,20 @@ Este módulo proporciona middleware para proteger endpoints
 y validar permisos de usuario según su tipo de empresa.
 """
 
-from fastapi import Request, HTTPException, status
+from fastapi import Request, HTTPException, Depends, status
 from fastapi.responses import JSONResponse
 from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime, timedelta
+import asyncio
 import time
-from models.auth import UserPermissions
+from models.auth import UserPermissions, UserActivity
 from services.auth.auth_service import auth_service
 from services.rate_limiting import rate_limiter
-from services.logging import logger_service, LogContext, LogCategory
+from services.logging import logger_service, LogContext, LogCategory, LogLevel
+from services.monitoring.error_handler import log_error, ErrorType
+
+ACTIVITY_FLUSH_INTERVAL = 0.05  # Segundos entre escrituras por lote de actividad
+ACTIVITY_QUEUE_MAXSIZE = 10000  # Con la cola llena se registra en línea
 
 class AuthMiddleware:
     """Middleware para autenticación y autorización"""
@@ -23,6 +28,10 @@ class AuthMiddleware:
         self.rate_limit_store = {}
         self.rate_limit_window = 60  # 1 minuto
         self.max_requests_per_window = 100
+        
+        # Registro diferido de actividad: los requests solo encolan
+        self.activity_queue: Optional[asyncio.Queue] = None
+        self.activity_writer: Optional[asyncio.Task] = None
     
     async def authenticate_request(self, request: Request) -> Optional[Dict[str, Any]]:
         """
@@ -233,9 +242,181 @@ class AuthMiddleware:
                 exception=e
             )
 
+    def queue_activity(self, user_data: Dict[str, Any], request: Request, action: str) -> bool:
+        """
+        📝 Encolar actividad para registrarla fuera del request
+        
+        Returns:
+            False si el escritor en segundo plano no está activo o la cola está llena
+        """
+        if self.activity_queue is None:
+            return False
+        
+        try:
+            self.activity_queue.put_nowait({
+                "user_id": user_data["id"],
+                "action": action,
+                "timestamp": datetime.now(),
+                "ip_address": request.client.host if request.client else None,
+                "user_agent": request.headers.get("user-agent"),
+                "endpoint": str(request.url.path),
+                "method": request.method
+            })
+        except asyncio.QueueFull:
+            return False
+        return True
+    
+    async def start_activity_writer(self):
+        """Iniciar el escritor de actividad en segundo plano"""
+        if self.activity_writer is None:
+            self.activity_queue = asyncio.Queue(maxsize=ACTIVITY_QUEUE_MAXSIZE)
+            self.activity_writer = asyncio.create_task(self._write_activity())
+    
+    async def stop_activity_writer(self):
+        """Detener el escritor y registrar la actividad pendiente"""
+        if self.activity_writer is None:
+            return
+        
+        self.activity_writer.cancel()
+        try:
+            await self.activity_writer
+        except asyncio.CancelledError:
+            pass
+        
+        pending = []
+        while not self.activity_queue.empty():
+            pending.append(self.activity_queue.get_nowait())
+        await self._safe_flush_activity(pending)
+        
+        self.activity_queue = None
+        self.activity_writer = None
+    
+    async def _write_activity(self):
+        """Vaciar la cola por lotes cada ACTIVITY_FLUSH_INTERVAL segundos"""
+        while True:
+            batch = [await self.activity_queue.get()]
+            await asyncio.sleep(ACTIVITY_FLUSH_INTERVAL)
+            while not self.activity_queue.empty():
+                batch.append(self.activity_queue.get_nowait())
+            await self._safe_flush_activity(batch)
+    
+    async def _safe_flush_activity(self, batch: List[Dict[str, Any]]):
+        """Registrar un lote sin propagar errores: un fallo no debe detener el escritor"""
+        try:
+            await self._flush_activity(batch)
+        except Exception as e:
+            log_error(e, ErrorType.SYSTEM, context={"operation": "flush_activity", "batch_size": len(batch)})
+    
+    async def _flush_activity(self, batch: List[Dict[str, Any]]):
+        """Registrar un lote de actividad en el log y en el servicio de auth"""
+        if not batch:
+            return
+        
+        for item in batch:
+            logger_service.log(
+                name="auth",
+                level=LogLevel.INFO,
+                message=f"User activity: {item['action']}",
+                context=LogContext(
+                    user_id=item["user_id"],
+                    ip_address=item["ip_address"],
+                    user_agent=item["user_agent"],
+                    endpoint=item["endpoint"],
+                    method=item["method"]
+                ),
+                category=LogCategory.AUTH
+            )
+        
+        await auth_service.record_activities([
+            UserActivity(
+                user_id=item["user_id"],
+                activity_type=item["action"],
+                timestamp=item["timestamp"],
+                ip_address=item["ip_address"]
+            )
+            for item in batch
+        ])
+
 # Instancia global del middleware
 auth_middleware = AuthMiddleware()
 
+def _rate_limit_detail(rate_limit_info: Dict[str, Any]) -> str:
+    """Mensaje de error según el tipo de bloqueo por rate limiting"""
+    if rate_limit_info.get("blocked"):
+        remaining_seconds = rate_limit_info.get("remaining_seconds", 0)
+        reason = rate_limit_info.get("reason", "rate_limit_exceeded")
+        
+        if reason == "user_blocked":
+            return f"Usuario bloqueado temporalmente. Intenta en {remaining_seconds} segundos."
+        if reason == "ip_blocked":
+            return f"IP bloqueada temporalmente. Intenta en {remaining_seconds} segundos."
+        return f"Rate limit excedido. Intenta en {remaining_seconds} segundos."
+    return "Demasiadas requests. Intenta más tarde."
+
+async def get_authenticated_user(request: Request) -> Dict[str, Any]:
+    """
+    🔐 Dependencia para requerir autenticación
+    
+    Aplica rate limiting y valida el token una sola vez por request. El usuario
+    queda en request.state, así que las demás dependencias del mismo request
+    lo reutilizan sin volver a verificar el JWT.
+    """
+    user_data = getattr(request.state, "user", None)
+    if user_data is not None:
+        return user_data
+    
+    user_data = await auth_middleware.authenticate_request(request)
+    
+    allowed, rate_limit_info = await auth_middleware.check_rate_limit(request, user_data)
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=_rate_limit_detail(rate_limit_info)
+        )
+    
+    if not user_data:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de autenticación requerido"
+        )
+    
+    request.state.user = user_data
+    
+    endpoint = request.scope.get("endpoint")
+    action = getattr(endpoint, "__name__", request.url.path)
+    if not auth_middleware.queue_activity(user_data, request, action):
+        await auth_middleware.log_activity(user_data, request, action)
+    
+    return user_data
+
+def require_usage(action: str):
+    """
+    📊 Dependencia para verificar límites de uso
+    
+    Args:
+        action: Acción para verificar límites
+    """
+    async def dependency(user_data: Dict[str, Any] = Depends(get_authenticated_user)) -> Dict[str, Any]:
+        if not await auth_middleware.check_usage_limits(user_data, action):
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Límite de {action} alcanzado"
+            )
+        return user_data
+    
+    return dependency
+
+async def require_admin(user_data: Dict[str, Any] = Depends(get_authenticated_user)) -> Dict[str, Any]:
+    """
+    🔧 Dependencia para endpoints exclusivos de administradores
+    """
+    if user_data.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acceso denegado. Se requieren permisos de administrador."
+        )
+    return user_data
+
 # Decoradores para endpoints
 def require_auth(required_permissions: List[str] = None):
     """
@@ -252,27 +433,11 @@ def require_auth(required_permissions: List[str] = None):
             # Verificar rate limiting con datos del usuario
             allowed, rate_limit_info = await auth_middleware.check_rate_limit(request, user_data)
             if not allowed:
-                # Determinar el tipo de bloqueo
-                if rate_limit_info.get("blocked"):
-                    remaining_seconds = rate_limit_info.get("remaining_seconds", 0)
-                    reason = rate_limit_info.get("reason", "rate_limit_exceeded")
-                    
-                    if reason == "user_blocked":
-                        detail = f"Usuario bloqueado temporalmente. Intenta en {remaining_seconds} segundos."
-                    elif reason == "ip_blocked":
-                        detail = f"IP bloqueada temporalmente. Intenta en {remaining_seconds} segundos."
-                    else:
-                        detail = f"Rate limit excedido. Intenta en {remaining_seconds} segundos."
-                else:
-                    detail = "Demasiadas requests. Intenta más tarde."
-                
                 raise HTTPException(
                     status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail=detail
+                    detail=_rate_limit_detail(rate_limit_info)
                 )
             
-            # Autenticar usuario
-            user_data = await auth_middleware.authenticate_request(request)
             if not user_data:
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,6 +1,9 @@
 import jwt
 import os
+import asyncio
 import uuid
+import hashlib
+import heapq
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
 from fastapi import HTTPException, status, Depends
@@ -9,6 +12,7 @@ from supabase import create_client, Client
 from dotenv import load_dotenv
 from models.auth import UserPermissions, LoginAttempt, UserActivity
 from core.config import AUTH_CONFIG
+from services.cache import cache_service
 
 # Cargar variables de entorno
 load_dotenv()
@@ -19,6 +23,7 @@ REFRESH_SECRET_KEY = os.getenv("REFRESH_SECRET_KEY", "your-refresh-secret-key-ch
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = AUTH_CONFIG["access_token_expire_minutes"]
 REFRESH_TOKEN_EXPIRE_DAYS = AUTH_CONFIG["refresh_token_expire_days"]
+TOKEN_USER_CACHE_TTL = 60  # Segundos que se reutiliza el perfil de Supabase de un token
 
 # Cliente Supabase
 supabase: Client = create_client(
@@ -369,16 +374,34 @@ class AuthService:
         except Exception as e:
             print(f"Error registrando actividad: {e}")
 
-    async def get_user_activity(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
-        """Obtener actividad del usuario"""
+    async def record_activities(self, activities: List[UserActivity]):
+        """Registrar un lote de actividades, podando el historial una vez por usuario"""
         try:
-            activities = self.user_activity.get(user_id, [])
+            touched_users = set()
+            for activity in activities:
+                self.user_activity.setdefault(activity.user_id, []).append(activity)
+                touched_users.add(activity.user_id)
             
-            # Ordenar por timestamp (más reciente primero)
-            activities.sort(key=lambda x: x.timestamp, reverse=True)
+            # Limpiar actividad antigua (más de 30 días)
+            cutoff_time = datetime.now() - timedelta(days=30)
+            for user_id in touched_users:
+                self.user_activity[user_id] = [
+                    activity for activity in self.user_activity[user_id]
+                    if activity.timestamp > cutoff_time
+                ]
             
-            # Aplicar límite
-            activities = activities[:limit]
+        except Exception as e:
+            print(f"Error registrando actividades: {e}")
+
+    async def get_user_activity(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Obtener actividad del usuario"""
+        try:
+            # Solo las `limit` más recientes, sin ordenar todo el historial
+            activities = heapq.nlargest(
+                limit,
+                self.user_activity.get(user_id, []),
+                key=lambda x: x.timestamp
+            )
             
             # Convertir a diccionarios para JSON
             return [
@@ -396,9 +419,22 @@ class AuthService:
 
     async def get_user_from_token(self, token: str) -> Dict[str, Any]:
         """Obtener datos del usuario desde el token"""
-        # Verificar token JWT personalizado
+        # Verificar token JWT personalizado (firma y expiración en cada request)
         token_data = self.verify_token(token)
         
+        # Reutilizar el perfil ya resuelto para este token
+        cache_key = f"token_user:{hashlib.sha256(token.encode()).hexdigest()}"
+        user_data = await cache_service.get(cache_key)
+        if user_data is not None:
+            return user_data
+        
+        # supabase.auth.get_user es una llamada HTTP síncrona: ejecutarla fuera del event loop
+        user_data = await asyncio.to_thread(self._resolve_token_user, token, token_data)
+        await cache_service.set(cache_key, user_data, TOKEN_USER_CACHE_TTL)
+        return user_data
+    
+    def _resolve_token_user(self, token: str, token_data: Dict[str, str]) -> Dict[str, Any]:
+        """Obtener el perfil del usuario desde Supabase o, si falla, desde el token"""
         try:
             # Intentar obtener datos completos desde Supabase
             result = supabase.auth.get_user(token)
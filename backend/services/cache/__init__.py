@@ -1,3 +1,3 @@
-from .cache_service import cache_service, cache_result, invalidate_cache, CacheStrategy
+from .cache_service import cache_service, cache_result, invalidate_cache, user_stats_key, CacheStrategy
 
-__all__ = ["cache_service", "cache_result", "invalidate_cache", "CacheStrategy"] 
\ No newline at end of file
+__all__ = ["cache_service", "cache_result", "invalidate_cache", "user_stats_key", "CacheStrategy"] 
\ No newline at end of file
@@ -198,6 +198,10 @@ class CacheService:
 # Instancia global del servicio de caché
 cache_service = CacheService()
 
+def user_stats_key(user_id: str) -> str:
+    """Clave con las estadísticas serializadas de un usuario, compartida por lectores y escritores"""
+    return f"stats:{user_id}"
+
 # Decorador para caché automático
 def cache_result(ttl: Optional[int] = None, key_prefix: str = ""):
     """Decorador para cachear resultados de funciones"""
@@ -1,19 +1,26 @@
 import os
 import uuid
+import asyncio
 import hashlib
+from itertools import islice
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 from fastapi import HTTPException, UploadFile
-from datetime import datetime
+from collections import Counter
+from datetime import datetime, timedelta
 import PyPDF2
 
 from core.database import get_supabase
+from services.cache import cache_service, user_stats_key
 
 # Configuración
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 ALLOWED_EXTENSIONS = {".pdf", ".txt", ".docx"}
+READY_DOCUMENTS_TTL = 30  # Los documentos solo cambian al subir o eliminar
+MAX_READY_DOCUMENTS = 3  # Documentos del usuario usados como contexto en consultas
+STATS_PERIODS = {"week": timedelta(days=7), "month": timedelta(days=30), "year": timedelta(days=365)}
 
 class DocumentService:
     """Servicio para manejo de documentos - Ahora usando Supabase"""
@@ -176,6 +183,8 @@ class DocumentService:
                     detail="Error guardando documento en la base de datos"
                 )
             
+            await self.invalidate_ready_documents(user_id)
+            
             # Agregar path del archivo para compatibilidad
             document = result.data[0]
             document["file_path"] = str(file_path)
@@ -236,6 +245,60 @@ class DocumentService:
             print(f"Error obteniendo documentos del usuario {user_id}: {e}")
             return []
 
+    @staticmethod
+    def _period_cutoff(period: str) -> Optional[datetime]:
+        """Fecha de inicio de un período de estadísticas (None para todo el historial)"""
+        now = datetime.now()
+        if period == "day":
+            return now.replace(hour=0, minute=0, second=0, microsecond=0)
+        delta = STATS_PERIODS.get(period)
+        return now - delta if delta else None
+    
+    def _fetch_document_stats_rows(self, user_id: str, cutoff: Optional[datetime]) -> List[Dict[str, Any]]:
+        """Leer solo las columnas necesarias para agregar, filtrando el período en la base de datos"""
+        supabase = self.get_supabase_client()
+        query = supabase.table('uploaded_documents').select('processed,file_type,file_size').eq('user_id', user_id)
+        if cutoff is not None:
+            query = query.gte('created_at', cutoff.isoformat())
+        return query.execute().data or []
+    
+    async def get_user_document_stats(self, user_id: str, period: str = "month") -> Dict[str, Any]:
+        """Agregar los documentos del usuario por estado y tipo en una sola pasada"""
+        rows = await asyncio.to_thread(
+            self._fetch_document_stats_rows, user_id, self._period_cutoff(period)
+        )
+        
+        status_counts = Counter("ready" if row.get("processed") else "error" for row in rows)
+        type_counts = Counter(row.get("file_type") or "unknown" for row in rows)
+        
+        return {
+            "total_documents": len(rows),
+            "documents_by_status": dict(status_counts),
+            "documents_by_type": dict(type_counts),
+            "total_size": sum(row.get("file_size") or 0 for row in rows)
+        }
+
+    async def get_ready_documents(self, user_id: str) -> List[Dict[str, Any]]:
+        """Obtener los primeros documentos listos del usuario con caché de corta duración"""
+        cache_key = f"ready_documents:{user_id}"
+        ready_documents = await cache_service.get(cache_key)
+        
+        if ready_documents is None:
+            # get_user_documents es síncrono: ejecutarlo fuera del event loop
+            documents = await asyncio.to_thread(self.get_user_documents, user_id)
+            ready_documents = list(islice(
+                (doc for doc in documents if doc.get("status") == "ready"),
+                MAX_READY_DOCUMENTS
+            ))
+            await cache_service.set(cache_key, ready_documents, READY_DOCUMENTS_TTL)
+        
+        return ready_documents
+    
+    async def invalidate_ready_documents(self, user_id: str) -> None:
+        """Invalidar la caché de documentos listos tras subir o eliminar"""
+        await cache_service.delete(f"ready_documents:{user_id}")
+        await cache_service.delete(user_stats_key(user_id))
+    
     def get_document_by_id(self, doc_id: str, user_id: str) -> Optional[Dict[str, Any]]:
         """Obtener documento por ID - Ahora usando Supabase"""
         try:
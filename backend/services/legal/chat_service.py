@@ -11,11 +11,15 @@ Este módulo maneja todas las funcionalidades relacionadas con el chat:
 import uuid
 from datetime import datetime
 from typing import List, Dict, Any, Optional
+from fastapi import UploadFile
 from models.rag import ChatMessage, ChatHistoryResponse
 from services.auth.auth_service import get_current_user_optional
+from services.cache import cache_service, user_stats_key
 from core.config import CHAT_CONFIG
 import json
 
+FILE_READ_CHUNK_SIZE = 64 * 1024  # Leer archivos subidos en bloques de 64KB
+
 class ChatService:
     """Servicio para manejar funcionalidades de chat"""
     
@@ -52,6 +56,7 @@ class ChatService:
             
             # Agregar mensaje al historial
             self.chat_history[user_id].append(message)
+            await cache_service.delete(user_stats_key(user_id))
             
             print(f"💬 Mensaje guardado para usuario {user_id}: {message.id}")
             return message.id
@@ -60,6 +65,40 @@ class ChatService:
             print(f"❌ Error guardando mensaje: {e}")
             raise
     
+    async def save_messages_bulk(
+        self,
+        user_id: str,
+        messages: List[ChatMessage],
+        session_id: Optional[str] = None
+    ) -> List[str]:
+        """
+        💾 Guardar varios mensajes en el historial en una sola operación
+        
+        Args:
+            user_id: ID del usuario
+            messages: Mensajes a guardar, en orden
+            session_id: ID de sesión opcional
+            
+        Returns:
+            IDs de los mensajes guardados
+        """
+        try:
+            history = self.chat_history.setdefault(user_id, [])
+            history.extend(messages)
+            
+            # Limitar historial según configuración
+            overflow = len(history) - CHAT_CONFIG["max_history_messages"]
+            if overflow > 0:
+                del history[:overflow]
+            await cache_service.delete(user_stats_key(user_id))
+            
+            print(f"💬 {len(messages)} mensajes guardados para usuario {user_id}")
+            return [message.id for message in messages]
+            
+        except Exception as e:
+            print(f"❌ Error guardando mensajes: {e}")
+            raise
+    
     async def get_chat_history(
         self, 
         user_id: str, 
@@ -107,6 +146,7 @@ class ChatService:
         try:
             if user_id in self.chat_history:
                 self.chat_history[user_id] = []
+                await cache_service.delete(user_stats_key(user_id))
                 print(f"🗑️ Historial limpiado para usuario {user_id}")
                 return True
             return False
@@ -160,45 +200,48 @@ class ChatService:
             print(f"❌ Error obteniendo sugerencias: {e}")
             return []
     
-    async def process_file_in_chat(
-        self, 
-        file_content: bytes,
-        file_name: str,
-        file_type: str
-    ) -> Dict[str, Any]:
+    async def process_file_in_chat(self, file: UploadFile) -> Dict[str, Any]:
         """
         📄 Procesar archivo subido en el chat
         
+        El archivo se consume por bloques, de modo que la memoria por subida
+        no depende del tamaño del archivo y los archivos demasiado grandes se
+        rechazan en cuanto superan el límite.
+        
         Args:
-            file_content: Contenido del archivo
-            file_name: Nombre del archivo
-            file_type: Tipo de archivo
+            file: Archivo subido
             
         Returns:
             Información procesada del archivo
         """
         try:
-            # Verificar tamaño del archivo
-            max_size = CHAT_CONFIG["max_file_size_mb"] * 1024 * 1024
-            if len(file_content) > max_size:
-                raise ValueError(f"Archivo demasiado grande. Máximo {CHAT_CONFIG['max_file_size_mb']}MB")
-            
-            # Verificar tipo de archivo
+            # Verificar tipo de archivo antes de leer el contenido
             allowed_types = CHAT_CONFIG["allowed_file_types"]
-            file_extension = f".{file_name.split('.')[-1].lower()}"
+            file_extension = f".{file.filename.split('.')[-1].lower()}"
             if file_extension not in allowed_types:
                 raise ValueError(f"Tipo de archivo no permitido. Permitidos: {', '.join(allowed_types)}")
             
+            # Verificar tamaño del archivo mientras se lee
+            max_size = CHAT_CONFIG["max_file_size_mb"] * 1024 * 1024
+            file_size = 0
+            while chunk := await file.read(FILE_READ_CHUNK_SIZE):
+                file_size += len(chunk)
+                if file_size > max_size:
+                    raise ValueError(f"Archivo demasiado grande. Máximo {CHAT_CONFIG['max_file_size_mb']}MB")
+            
+            # Dejar el archivo listo para otros consumidores
+            await file.seek(0)
+            
             # Procesar archivo (en implementación real, extraer texto)
             file_info = {
-                "name": file_name,
-                "size": len(file_content),
-                "type": file_type,
+                "name": file.filename,
+                "size": file_size,
+                "type": file.content_type,
                 "processed": True,
-                "extracted_text": f"Contenido extraído de {file_name}"  # Placeholder
+                "extracted_text": f"Contenido extraído de {file.filename}"  # Placeholder
             }
             
-            print(f"📄 Archivo procesado: {file_name} ({len(file_content)} bytes)")
+            print(f"📄 Archivo procesado: {file.filename} ({file_size} bytes)")
             return file_info
             
         except Exception as e:
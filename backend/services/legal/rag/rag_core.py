@@ -6,8 +6,9 @@ Núcleo principal del sistema RAG que orquesta todos los componentes
 para proporcionar respuestas legales especializadas.
 """
 
+import asyncio
 import time
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator
 
 from .vector_manager import VectorManager
 from .query_processor import QueryProcessor  
@@ -48,33 +49,23 @@ class RAGCore:
         try:
             print(f"🔍 Procesando consulta: {question[:100]}...")
             
-            # 1. Determinar categoría de consulta
-            category = self.query_processor.determine_query_category(question)
-            query_type = self.query_processor.determine_query_type(question)
-            
-            # 2. Preprocesar consulta para vectorstore
-            processed_question = self.query_processor.preprocess_query(question, category)
-            
-            # 3. Buscar documentos del usuario
-            relevant_docs, used_documents = self.response_generator.find_relevant_documents(
-                question, user_documents or []
+            # 1-5. Categorizar, recuperar y construir contextos
+            # (la búsqueda en Pinecone es síncrona: se ejecuta fuera del event loop)
+            prepared = await asyncio.to_thread(
+                self._prepare_query, question, context, user_info, user_documents
             )
-            
-            # 4. Buscar en vectorstore legal
-            legal_context, legal_sources = self.vector_manager.search_vectorstore(
-                processed_question, category
-            )
-            
-            # 5. Construir contextos
-            user_context = self.response_generator.build_user_context(user_info, context)
-            documents_context = self.response_generator.build_documents_context(relevant_docs)
+            category = prepared["category"]
+            query_type = prepared["query_type"]
+            processed_question = prepared["processed_question"]
+            used_documents = prepared["used_documents"]
+            legal_sources = prepared["legal_sources"]
             
             # 6. Generar respuesta usando OpenAI
             response_data = await self.response_generator.generate_response(
                 question=question,
-                legal_context=legal_context,
-                user_context=user_context,
-                documents_context=documents_context
+                legal_context=prepared["legal_context"],
+                user_context=prepared["user_context"],
+                documents_context=prepared["documents_context"]
             )
             
             # 7. Construir fuentes
@@ -100,6 +91,8 @@ class RAGCore:
                 query_type=query_type,
                 confidence=confidence
             )
+            if response_data.get("error"):
+                final_response["error"] = response_data["error"]
             
             # 10. Agregar análisis de consulta
             final_response["query_analysis"] = {
@@ -140,6 +133,81 @@ class RAGCore:
                 }
             }
     
+    async def stream_query(
+        self,
+        question: str,
+        context: str = "",
+        user_info: Optional[Dict[str, Any]] = None,
+        user_documents: Optional[List[Dict[str, Any]]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Procesar consulta legal emitiendo la respuesta token a token
+        
+        Args:
+            question: Pregunta del usuario
+            context: Contexto adicional
+            user_info: Información del usuario
+            user_documents: Documentos del usuario
+            
+        Yields:
+            Fragmentos de la respuesta a medida que el modelo los genera
+        """
+        print(f"🔍 Procesando consulta en streaming: {question[:100]}...")
+        
+        prepared = await asyncio.to_thread(
+            self._prepare_query, question, context, user_info, user_documents
+        )
+        
+        async for token in self.response_generator.stream_response(
+            question=question,
+            legal_context=prepared["legal_context"],
+            user_context=prepared["user_context"],
+            documents_context=prepared["documents_context"]
+        ):
+            yield token
+    
+    def _prepare_query(
+        self,
+        question: str,
+        context: str,
+        user_info: Optional[Dict[str, Any]],
+        user_documents: Optional[List[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Categorizar la consulta, recuperar fuentes y construir los contextos del prompt
+        
+        Returns:
+            Diccionario con categoría, tipo, fuentes y contextos
+        """
+        # 1. Determinar categoría de consulta
+        category = self.query_processor.determine_query_category(question)
+        query_type = self.query_processor.determine_query_type(question)
+        
+        # 2. Preprocesar consulta para vectorstore
+        processed_question = self.query_processor.preprocess_query(question, category)
+        
+        # 3. Buscar documentos del usuario
+        relevant_docs, used_documents = self.response_generator.find_relevant_documents(
+            question, user_documents or []
+        )
+        
+        # 4. Buscar en vectorstore legal
+        legal_context, legal_sources = self.vector_manager.search_vectorstore(
+            processed_question, category
+        )
+        
+        # 5. Construir contextos
+        return {
+            "category": category,
+            "query_type": query_type,
+            "processed_question": processed_question,
+            "used_documents": used_documents,
+            "legal_context": legal_context,
+            "legal_sources": legal_sources,
+            "user_context": self.response_generator.build_user_context(user_info, context),
+            "documents_context": self.response_generator.build_documents_context(relevant_docs)
+        }
+    
     def _calculate_confidence(
         self,
         legal_sources: List[str],
@@ -8,22 +8,37 @@ contextualización y formateo de respuestas legales.
 
 import os
 import time
-from typing import Dict, Any, List, Optional
-from openai import OpenAI
+from typing import Dict, Any, List, Optional, AsyncIterator
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Modelo fine-tuned para consultas legales
+FINE_TUNED_MODEL = "ft:gpt-4o-mini-2024-07-18:curso-llm:legalgpt-pymes-v1:Bx0Zsdni"
+
+SYSTEM_PROMPT = "Eres LegalGPT, asesor legal para PyMEs colombianas. Responde de forma concisa y práctica."
+
 class ResponseGenerator:
     """Generador de respuestas legales especializadas"""
     
     def __init__(self):
         self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         
         # Caché simple para respuestas frecuentes
         self.response_cache = {}
         self.cache_size_limit = 50  # Máximo 50 respuestas en caché
         
+        # Parámetros de generación compartidos por respuesta completa y streaming
+        self.completion_params = {
+            "max_tokens": 1200,  # Reducir tokens para mayor velocidad
+            "temperature": 0.1,
+            "top_p": 0.9,  # Optimizar para velocidad
+            "frequency_penalty": 0.1,  # Reducir repeticiones
+            "presence_penalty": 0.1
+        }
+        
         # Prompts especializados por tipo de consulta (optimizados para velocidad)
         self.specialized_prompts = {
             "procedimiento": """
@@ -193,7 +208,7 @@ class ResponseGenerator:
         legal_context: str,
         user_context: str,
         documents_context: str,
-        model: str = "ft:gpt-4o-mini-2024-07-18:curso-llm:legalgpt-pymes-v1:Bx0Zsdni"  # Mantener modelo fine-tuned
+        model: str = FINE_TUNED_MODEL  # Mantener modelo fine-tuned
     ) -> Dict[str, Any]:
         """
         Generar respuesta usando OpenAI optimizada para velocidad
@@ -220,37 +235,11 @@ class ResponseGenerator:
             return cached_response
         
         try:
-            # Obtener prompt especializado
-            prompt_template = self.get_specialized_prompt(question)
-            
-            # Limitar el contexto para mejorar velocidad
-            max_context_length = 2000
-            if len(legal_context) > max_context_length:
-                legal_context = legal_context[:max_context_length] + "..."
-            
-            if len(documents_context) > max_context_length:
-                documents_context = documents_context[:max_context_length] + "..."
-            
-            # Construir prompt final optimizado
-            final_prompt = prompt_template.format(
-                question=question,
-                context_text=user_context[:500] if user_context else "",  # Limitar contexto usuario
-                documents_context=documents_context,
-                legal_context=legal_context if legal_context else "Legislación colombiana aplicable."
-            )
-            
             # Consulta a OpenAI optimizada (manteniendo modelo fine-tuned)
             response = self.client.chat.completions.create(
                 model=model,
-                messages=[
-                    {"role": "system", "content": "Eres LegalGPT, asesor legal para PyMEs colombianas. Responde de forma concisa y práctica."},
-                    {"role": "user", "content": final_prompt}
-                ],
-                max_tokens=1200,  # Reducir tokens para mayor velocidad
-                temperature=0.1,
-                top_p=0.9,  # Optimizar para velocidad
-                frequency_penalty=0.1,  # Reducir repeticiones
-                presence_penalty=0.1
+                messages=self._build_messages(question, legal_context, user_context, documents_context),
+                **self.completion_params
             )
             
             answer = response.choices[0].message.content
@@ -283,6 +272,70 @@ class ResponseGenerator:
                 "tokens_used": 0
             }
     
+    async def stream_response(
+        self,
+        question: str,
+        legal_context: str,
+        user_context: str,
+        documents_context: str,
+        model: str = FINE_TUNED_MODEL
+    ) -> AsyncIterator[str]:
+        """
+        Generar respuesta usando el streaming nativo de OpenAI
+        
+        Args:
+            question: Pregunta del usuario
+            legal_context: Contexto legal del vectorstore
+            user_context: Contexto del usuario
+            documents_context: Contexto de documentos
+            model: Modelo a usar
+            
+        Yields:
+            Fragmentos de texto a medida que el modelo los genera
+        """
+        stream = await self.async_client.chat.completions.create(
+            model=model,
+            messages=self._build_messages(question, legal_context, user_context, documents_context),
+            stream=True,
+            **self.completion_params
+        )
+        
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    def _build_messages(
+        self,
+        question: str,
+        legal_context: str,
+        user_context: str,
+        documents_context: str
+    ) -> List[Dict[str, str]]:
+        """Construir los mensajes del chat con el prompt especializado"""
+        # Obtener prompt especializado
+        prompt_template = self.get_specialized_prompt(question)
+        
+        # Limitar el contexto para mejorar velocidad
+        max_context_length = 2000
+        if len(legal_context) > max_context_length:
+            legal_context = legal_context[:max_context_length] + "..."
+        
+        if len(documents_context) > max_context_length:
+            documents_context = documents_context[:max_context_length] + "..."
+        
+        # Construir prompt final optimizado
+        final_prompt = prompt_template.format(
+            question=question,
+            context_text=user_context[:500] if user_context else "",  # Limitar contexto usuario
+            documents_context=documents_context,
+            legal_context=legal_context if legal_context else "Legislación colombiana aplicable."
+        )
+        
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": final_prompt}
+        ]
+    
     def _get_prompt_type(self, question: str) -> str:
         """Determinar tipo de prompt usado"""
         question_lower = question.lower()
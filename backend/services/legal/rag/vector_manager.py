@@ -19,6 +19,7 @@ class VectorManager:
     def __init__(self):
         self.vectorstore = None
         self.pc = None
+        self.index_name = None
         
         # Configuraciones optimizadas por tipo de consulta
         self.query_configs = {
@@ -56,6 +57,7 @@ class VectorManager:
             if not index_name:
                 raise ValueError("PINECONE_INDEX_NAME no encontrada")
             
+            self.index_name = index_name
             self.vectorstore = PineconeVectorStore(
                 index_name=index_name,
                 embedding=embeddings,
@@ -176,7 +178,7 @@ class VectorManager:
             
             return {
                 "status": "connected",
-                "index_name": os.getenv("PINECONE_INDEX_NAME"),
+                "index_name": self.index_name,
                 "embedding_model": "text-embedding-3-small",
                 "text_key": "chunk_text",
                 "test_results": len(test_results) > 0
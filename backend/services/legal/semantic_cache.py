@@ -0,0 +1,295 @@
+"""
+🧠 Caché semántico de respuestas para LegalGPT
+
+Evita recorrer el pipeline RAG completo (búsqueda + LLM) cuando llega
+una pregunta igual o parafraseada de otra ya respondida:
+- Búsqueda por similitud coseno sobre embeddings de las preguntas
+- Validación de evidencia: las fuentes recuperadas hoy deben coincidir
+  con las que respaldaron la respuesta cacheada
+- Expiración por TTL y desalojo LRU
+- Particionado por perfil de empresa: la respuesta depende del contexto
+  del usuario que se incluye en el prompt
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from core.config import CACHE_CONFIG
+from models.rag import QueryResponse
+from services.legal.rag import rag_service
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOURCE = "Legislación Colombiana"
+
+# Campos del perfil que build_user_context incluye en el prompt
+PROFILE_FIELDS = ("company_type", "industry", "employees", "location")
+
+class SemanticCache:
+    """Caché de respuestas indexado por embedding de la pregunta"""
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.92,
+        evidence_threshold: float = 0.6,
+        max_size: int = CACHE_CONFIG["max_size"],
+        ttl: int = CACHE_CONFIG["ttl_presets"]["long"]
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.evidence_threshold = evidence_threshold
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._embeddings = None
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Matriz preasignada de max_size filas: cada entrada ocupa un slot que
+        # se reutiliza al eliminarla, sin reconstruir la matriz en cada cambio
+        self._matrix: Optional[np.ndarray] = None
+        self._slot_keys: List[Optional[str]] = [None] * max_size
+        self._slot_profiles = np.empty(max_size, dtype=object)
+        self._slot_created = np.zeros(max_size, dtype=np.float64)
+        self._slot_active = np.zeros(max_size, dtype=bool)
+        self._free_slots: List[int] = []
+        self._used_slots = 0  # Slots asignados alguna vez (límite de la búsqueda)
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evidence_rejections": 0,
+            "sets": 0,
+            "evictions": 0
+        }
+
+    def _get_embeddings(self):
+        """Inicializar el cliente de embeddings de forma perezosa"""
+        if self._embeddings is None:
+            from langchain_openai import OpenAIEmbeddings
+
+            self._embeddings = OpenAIEmbeddings(
+                openai_api_key=os.getenv("OPENAI_API_KEY"),
+                model="text-embedding-3-small"
+            )
+        return self._embeddings
+
+    async def embed(self, text: str) -> Optional[np.ndarray]:
+        """
+        Calcular el embedding normalizado de una pregunta
+
+        Returns:
+            Vector unitario o None si no hay servicio de embeddings
+        """
+        try:
+            vector = np.asarray(
+                await self._get_embeddings().aembed_query(text.strip().lower()),
+                dtype=np.float32
+            )
+            norm = np.linalg.norm(vector)
+            return vector / norm if norm else None
+        except Exception as e:
+            logger.warning("⚠️ Caché semántico deshabilitado para esta consulta: %s", e)
+            return None
+
+    @staticmethod
+    def profile_key(user_info: Optional[Dict[str, Any]]) -> str:
+        """
+        Huella del perfil de empresa que condiciona la respuesta
+
+        Returns:
+            Hash de los campos de perfil o cadena vacía si no hay ninguno
+        """
+        if not user_info:
+            return ""
+        values = [str(user_info.get(field) or "") for field in PROFILE_FIELDS]
+        if not any(values):
+            return ""
+        return hashlib.sha256("\x1f".join(values).encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def _key(question: str, profile: str) -> str:
+        return f"{profile}:{question.strip().lower()}"
+
+    @staticmethod
+    def _signature(sources: Iterable[Any]) -> Set[str]:
+        """Normalizar las fuentes de una respuesta a un conjunto comparable"""
+        signature = {
+            source if isinstance(source, str) else source.get("title", "")
+            for source in sources or []
+        }
+        signature.discard("")
+        return signature or {DEFAULT_SOURCE}
+
+    @staticmethod
+    def _jaccard(a: Set[str], b: Set[str]) -> float:
+        union = a | b
+        return len(a & b) / len(union) if union else 1.0
+
+    async def _retrieve_evidence(self, question: str) -> Set[str]:
+        """Recuperar las fuentes que respaldarían hoy la pregunta"""
+        processor = rag_service.query_processor
+        category = processor.determine_query_category(question)
+        processed_question = processor.preprocess_query(question, category)
+        _, sources = await asyncio.to_thread(
+            rag_service.vector_manager.search_vectorstore, processed_question, category
+        )
+        return self._signature(sources)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            slot = entry["slot"]
+            self._slot_active[slot] = False
+            self._slot_keys[slot] = None
+            self._slot_profiles[slot] = None
+            self._free_slots.append(slot)
+
+    def _allocate_slot(self, embedding: np.ndarray) -> int:
+        """Reservar una fila de la matriz, creándola en el primer uso"""
+        if self._matrix is None:
+            self._matrix = np.zeros((self.max_size, embedding.shape[0]), dtype=np.float32)
+        if self._free_slots:
+            return self._free_slots.pop()
+        slot = self._used_slots
+        self._used_slots += 1
+        return slot
+
+    def _purge_expired(self, now: float) -> None:
+        """Eliminar las entradas cuyo TTL ya venció"""
+        used = self._used_slots
+        expired = np.flatnonzero(
+            self._slot_active[:used] & (now - self._slot_created[:used] > self.ttl)
+        )
+        for slot in expired:
+            self._remove(self._slot_keys[slot])
+
+    async def get(
+        self,
+        question: str,
+        embedding: Optional[np.ndarray],
+        profile: str = ""
+    ) -> Optional[QueryResponse]:
+        """
+        Buscar una respuesta cacheada para una pregunta semánticamente equivalente
+
+        Args:
+            question: Pregunta del usuario
+            embedding: Embedding normalizado de la pregunta
+            profile: Huella del perfil del usuario (ver profile_key)
+
+        Returns:
+            Respuesta cacheada o None si no supera los filtros de similitud y evidencia
+        """
+        if embedding is None or not self._entries:
+            self._stats["misses"] += 1
+            return None
+
+        # Las entradas vencidas se descartan antes de elegir la mejor, así una
+        # vencida no oculta a la siguiente candidata válida
+        self._purge_expired(time.monotonic())
+
+        # Solo se comparan respuestas vigentes generadas para el mismo perfil
+        used = self._used_slots
+        candidates = self._slot_active[:used] & (self._slot_profiles[:used] == profile)
+        if not candidates.any():
+            self._stats["misses"] += 1
+            return None
+
+        scores = np.where(candidates, self._matrix[:used] @ embedding, -np.inf)
+        best = int(np.argmax(scores))
+        key = self._slot_keys[best]
+        entry = self._entries.get(key)
+
+        if entry is None or scores[best] < self.similarity_threshold:
+            self._stats["misses"] += 1
+            return None
+
+        # Solo reutilizar la respuesta si sigue respaldada por la misma evidencia
+        try:
+            evidence = await self._retrieve_evidence(question)
+        except Exception as e:
+            logger.warning("⚠️ Error validando evidencia del caché semántico: %s", e)
+            self._stats["misses"] += 1
+            return None
+
+        if self._jaccard(evidence, entry["evidence"]) < self.evidence_threshold:
+            self._stats["evidence_rejections"] += 1
+            self._stats["misses"] += 1
+            return None
+
+        # La entrada pudo desalojarse o reemplazarse mientras se validaba la evidencia
+        if self._entries.get(key) is not entry:
+            self._stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        return entry["response"]
+
+    async def set(
+        self,
+        question: str,
+        embedding: Optional[np.ndarray],
+        response: QueryResponse,
+        sources: Iterable[Any],
+        profile: str = ""
+    ) -> bool:
+        """Guardar una respuesta junto con el embedding, su evidencia y el perfil"""
+        if embedding is None:
+            return False
+
+        key = self._key(question, profile)
+        if key in self._entries:
+            self._remove(key)
+
+        while len(self._entries) >= self.max_size:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self._stats["evictions"] += 1
+
+        slot = self._allocate_slot(embedding)
+        created_at = time.monotonic()
+        self._matrix[slot] = embedding
+        self._slot_keys[slot] = key
+        self._slot_profiles[slot] = profile
+        self._slot_created[slot] = created_at
+        self._slot_active[slot] = True
+
+        self._entries[key] = {
+            "slot": slot,
+            "response": response,
+            "evidence": self._signature(sources),
+            "profile": profile,
+            "created_at": created_at
+        }
+        self._stats["sets"] += 1
+        return True
+
+    def clear(self) -> None:
+        """Vaciar el caché"""
+        self._entries.clear()
+        self._slot_keys = [None] * self.max_size
+        self._slot_profiles[:] = None
+        self._slot_active[:] = False
+        self._free_slots.clear()
+        self._used_slots = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtener estadísticas del caché semántico"""
+        total_requests = self._stats["hits"] + self._stats["misses"]
+        hit_rate = (self._stats["hits"] / total_requests * 100) if total_requests > 0 else 0
+
+        return {
+            **self._stats,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hit_rate": round(hit_rate, 2)
+        }
+
+# Instancia global del caché semántico
+semantic_cache = SemanticCache()
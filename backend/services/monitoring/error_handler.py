@@ -1,11 +1,20 @@
+import atexit
 import logging
+import queue
 import traceback
 import uuid
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional
 from enum import Enum
 from pathlib import Path
 
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.responses import Response
+
 # Crear directorio de logs si no existe
 LOG_DIR = Path("logs")
 LOG_DIR.mkdir(exist_ok=True)
@@ -32,6 +41,7 @@ class ErrorType(Enum):
     TEMPLATE_STATS = "template_stats_error"
     TEMPLATE_EXPORT = "template_export_error"
     TEMPLATE_IMPORT = "template_import_error"
+    TEMPLATE_LISTING = "template_listing_error"
     TEMPLATE_SEARCH = "template_search_error"
     TEMPLATE_POPULAR = "template_popular_error"
     TEMPLATE_RECENT = "template_recent_error"
@@ -60,7 +70,6 @@ class ErrorType(Enum):
     DOCUMENT_EXPORT = "document_export_error"
     DOCUMENT_RETRIEVAL = "document_retrieval_error"
     DOCUMENT_DELETION = "document_deletion_error"
-    TEMPLATE_RETRIEVAL = "template_retrieval_error"
     VARIABLE_TYPES = "variable_types_error"
     CATEGORIES_RETRIEVAL = "categories_retrieval_error"
     FORMATS_RETRIEVAL = "formats_retrieval_error"
@@ -199,10 +208,28 @@ class LegalGPTErrorHandler:
         console_handler.setLevel(logging.INFO)
         console_handler.setFormatter(formatter)
         
+        # Handler para errores críticos (se crea una sola vez)
+        critical_handler = logging.FileHandler(
+            LOG_DIR / "critical_errors.log", 
+            encoding='utf-8'
+        )
+        self.critical_logger = logging.getLogger("LegalGPT.Critical")
+        
+        # Los handlers escriben desde hilos dedicados: log_error solo encola el
+        # registro y no hace I/O de disco ni de consola en el event loop
+        log_queue = queue.SimpleQueue()
+        critical_queue = queue.SimpleQueue()
+        self._listeners = [
+            QueueListener(log_queue, error_handler, info_handler, console_handler, respect_handler_level=True),
+            QueueListener(critical_queue, critical_handler)
+        ]
+        for listener in self._listeners:
+            listener.start()
+            atexit.register(listener.stop)
+        
         # Agregar handlers
-        self.logger.addHandler(error_handler)
-        self.logger.addHandler(info_handler)
-        self.logger.addHandler(console_handler)
+        self.logger.addHandler(QueueHandler(log_queue))
+        self.critical_logger.addHandler(QueueHandler(critical_queue))
     
     def log_error(
         self,
@@ -255,13 +282,7 @@ class LegalGPTErrorHandler:
         
         # Log críticos también van a un archivo especial
         if severity == ErrorSeverity.CRITICAL:
-            critical_logger = logging.getLogger("LegalGPT.Critical")
-            critical_handler = logging.FileHandler(
-                LOG_DIR / "critical_errors.log", 
-                encoding='utf-8'
-            )
-            critical_logger.addHandler(critical_handler)
-            critical_logger.critical(f"CRITICAL ERROR [{error_id}]: {error_data}")
+            self.critical_logger.critical(f"CRITICAL ERROR [{error_id}]: {error_data}")
         
         return error_id
     
@@ -381,6 +402,53 @@ def log_error(error: Exception, error_type: ErrorType = ErrorType.UNKNOWN, **kwa
     """Función de conveniencia para registrar errores"""
     return error_handler.log_error(error, error_type, **kwargs)
 
+def classify_errors(error_type: ErrorType, detail: str = "Error interno del servidor"):
+    """
+    Asociar un ErrorType y un mensaje de error a un endpoint
+    
+    No envuelve la función, solo la marca: ClassifiedErrorRoute lee la marca
+    una vez al registrar la ruta.
+    """
+    def decorator(func):
+        func.error_type = error_type
+        func.error_detail = detail
+        return func
+    return decorator
+
+class ClassifiedErrorRoute(APIRoute):
+    """
+    Ruta que convierte los errores no controlados de endpoints marcados con
+    @classify_errors en HTTPException(500)
+    
+    La conversión ocurre dentro del stack de middlewares, así que la respuesta
+    pasa por CORS y el manejador de HTTPException en lugar de llegar al
+    ServerErrorMiddleware.
+    """
+    
+    def get_route_handler(self) -> Callable[[Request], Any]:
+        route_handler = super().get_route_handler()
+        error_type = getattr(self.endpoint, "error_type", None)
+        if error_type is None:
+            return route_handler
+        detail = self.endpoint.error_detail
+        
+        async def classified_route_handler(request: Request) -> Response:
+            try:
+                return await route_handler(request)
+            except (StarletteHTTPException, RequestValidationError):
+                raise
+            except Exception as e:
+                user = getattr(request.state, "user", None)
+                log_error(
+                    e,
+                    error_type,
+                    user_id=user.get("id") if user else None,
+                    context={"path": request.scope["path"], **request.path_params}
+                )
+                raise HTTPException(status_code=500, detail=detail)
+        
+        return classified_route_handler
+
 def log_success(action: str, **kwargs):
     """Función de conveniencia para registrar éxitos"""
     return error_handler.log_success(action, **kwargs)
@@ -5,9 +5,13 @@ Este módulo proporciona funcionalidades para gestionar notificaciones
 del sistema LegalGPT.
 """
 
+import asyncio
+import copy
 import uuid
+import base64
+import bisect
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Tuple, Union
 from collections import defaultdict
 import json
 
@@ -18,7 +22,10 @@ from models.notifications import (
     NotificationType, NotificationPriority, NotificationStatus, NotificationAction
 )
 from services.monitoring.error_handler import log_error, ErrorType
-from services.monitoring.usage_service import UsageService
+from core.config import NOTIFICATION_CONFIG
+
+# Notificaciones eliminadas por lote antes de ceder el event loop
+CLEANUP_BATCH_SIZE = 1000
 
 class NotificationService:
     """Servicio para gestionar notificaciones del sistema"""
@@ -28,7 +35,16 @@ class NotificationService:
         self.notifications: Dict[str, Dict] = {}
         self.user_settings: Dict[str, Dict] = {}
         self.templates: Dict[str, Dict] = {}
-        self.usage_service = UsageService()
+        # Versiones para ETag: se incrementan en cada escritura
+        self.templates_version = 1
+        self._settings_versions: Dict[str, int] = {}
+        # Índice por usuario ordenado por (created_at, id) para paginar por cursor
+        self._user_index: Dict[str, List[Tuple[datetime, str]]] = defaultdict(list)
+        # Conteo de no leídas por usuario; se invalida en cada cambio de estado
+        self._unread_counts: Dict[str, int] = {}
+        # Texto de búsqueda (título y mensaje en minúsculas) precalculado por notificación
+        self._search_text: Dict[str, str] = {}
+        self._cleanup_task: Optional[asyncio.Task] = None
         
         # Inicializar con datos de ejemplo
         self._initialize_sample_data()
@@ -187,7 +203,7 @@ class NotificationService:
         ]
         
         for notif in sample_notifications:
-            self.notifications[notif["id"]] = notif
+            self._add_notification(notif)
         
         # Configuración por defecto para usuario de ejemplo
         self.user_settings["user_001"] = default_settings.copy()
@@ -222,10 +238,7 @@ class NotificationService:
                 "is_expired": False
             }
             
-            self.notifications[notification_id] = notification
-            
-            # Registrar uso
-            self.usage_service.record_notification_created(notification_data.user_id)
+            self._add_notification(notification)
             
             return NotificationResponse(**notification)
             
@@ -236,8 +249,8 @@ class NotificationService:
     def get_notification(self, notification_id: str, user_id: str) -> Optional[NotificationResponse]:
         """Obtener una notificación específica"""
         try:
-            notification = self.notifications.get(notification_id)
-            if not notification or notification["user_id"] != user_id:
+            notification = self._get_owned_notification(notification_id, user_id)
+            if not notification:
                 return None
             
             # Verificar si ha expirado
@@ -253,15 +266,18 @@ class NotificationService:
     def update_notification(self, notification_id: str, user_id: str, update_data: NotificationUpdate) -> Optional[NotificationResponse]:
         """Actualizar una notificación"""
         try:
-            notification = self.notifications.get(notification_id)
-            if not notification or notification["user_id"] != user_id:
+            notification = self._get_owned_notification(notification_id, user_id)
+            if not notification:
                 return None
             
+            now = datetime.now()
+            
             # Actualizar campos
             if update_data.status is not None:
                 notification["status"] = update_data.status
+                self._unread_counts.pop(user_id, None)
                 if update_data.status == NotificationStatus.READ and not notification["read_at"]:
-                    notification["read_at"] = datetime.now()
+                    notification["read_at"] = now
             
             if update_data.read_at is not None:
                 notification["read_at"] = update_data.read_at
@@ -270,7 +286,7 @@ class NotificationService:
                 notification["data"] = update_data.data
             
             # Verificar si ha expirado
-            if notification["expires_at"] and datetime.now() > notification["expires_at"]:
+            if notification["expires_at"] and now > notification["expires_at"]:
                 notification["is_expired"] = True
             
             return NotificationResponse(**notification)
@@ -282,11 +298,10 @@ class NotificationService:
     def delete_notification(self, notification_id: str, user_id: str) -> bool:
         """Eliminar una notificación"""
         try:
-            notification = self.notifications.get(notification_id)
-            if not notification or notification["user_id"] != user_id:
+            if not self._get_owned_notification(notification_id, user_id):
                 return False
             
-            del self.notifications[notification_id]
+            self._remove_notification(notification_id)
             return True
             
         except Exception as e:
@@ -296,29 +311,44 @@ class NotificationService:
     def list_notifications(self, user_id: str, search_request: NotificationSearchRequest) -> NotificationListResponse:
         """Listar notificaciones con filtros"""
         try:
-            user_notifications = self._get_user_notifications(user_id)
-            
-            # Aplicar filtros
-            filtered_notifications = self._apply_filters(user_notifications, search_request)
-            
-            # Ordenar por fecha de creación (más recientes primero)
-            filtered_notifications.sort(key=lambda x: x["created_at"], reverse=True)
-            
-            # Paginación
-            total = len(filtered_notifications)
-            start_idx = (search_request.page - 1) * search_request.per_page
-            end_idx = start_idx + search_request.per_page
-            paginated_notifications = filtered_notifications[start_idx:end_idx]
+            user_index = self._user_index.get(user_id, [])
+            
+            # Recorrer el índice (más recientes primero) desde el cursor, sin saltar filas
+            end_idx = len(user_index)
+            if search_request.cursor:
+                end_idx = bisect.bisect_left(user_index, self._decode_cursor(search_request.cursor))
+            
+            search_term = search_request.search.lower() if search_request.search else None
+            paginated_notifications = []
+            for idx in range(end_idx - 1, -1, -1):
+                notification = self.notifications[user_index[idx][1]]
+                if self._matches_filters(notification, search_request, search_term):
+                    paginated_notifications.append(notification)
+                    if len(paginated_notifications) > search_request.per_page:
+                        break
+            
+            # La fila extra solo indica si hay más páginas; nunca se devuelve
+            has_more = len(paginated_notifications) > search_request.per_page
+            next_cursor = None
+            if has_more:
+                paginated_notifications.pop()
+                next_cursor = self._encode_cursor(paginated_notifications[-1])
+            
+            # Contar todos los resultados exige recorrerlos: solo bajo demanda
+            total = None
+            if search_request.include_total:
+                total = len(self._apply_filters(self._get_user_notifications(user_id), search_request))
             
             # Contar no leídas
-            unread_count = len([n for n in user_notifications if n["status"] == NotificationStatus.UNREAD])
+            unread_count = self.get_unread_count(user_id)
             
             return NotificationListResponse(
                 notifications=[NotificationResponse(**n) for n in paginated_notifications],
                 total=total,
                 unread_count=unread_count,
-                page=search_request.page,
-                per_page=search_request.per_page
+                per_page=search_request.per_page,
+                has_more=has_more,
+                next_cursor=next_cursor
             )
             
         except Exception as e:
@@ -328,15 +358,19 @@ class NotificationService:
     def mark_as_read(self, notification_ids: List[str], user_id: str) -> bool:
         """Marcar notificaciones como leídas"""
         try:
+            # Un solo recorrido sobre los IDs únicos, con una sola marca de tiempo
+            now = datetime.now()
             updated_count = 0
-            for notification_id in notification_ids:
-                notification = self.notifications.get(notification_id)
-                if notification and notification["user_id"] == user_id:
-                    notification["status"] = NotificationStatus.READ
-                    if not notification["read_at"]:
-                        notification["read_at"] = datetime.now()
+            for notification_id in set(notification_ids):
+                notification = self._get_owned_notification(notification_id, user_id)
+                if notification:
+                    if notification["status"] != NotificationStatus.READ:
+                        notification["status"] = NotificationStatus.READ
+                        if not notification["read_at"]:
+                            notification["read_at"] = now
                     updated_count += 1
             
+            self._unread_counts.pop(user_id, None)
             return updated_count > 0
             
         except Exception as e:
@@ -346,20 +380,33 @@ class NotificationService:
     def mark_all_as_read(self, user_id: str) -> bool:
         """Marcar todas las notificaciones como leídas"""
         try:
+            now = datetime.now()
             updated_count = 0
-            for notification in self.notifications.values():
-                if notification["user_id"] == user_id and notification["status"] == NotificationStatus.UNREAD:
+            for notification in self._get_user_notifications(user_id):
+                if notification["status"] == NotificationStatus.UNREAD:
                     notification["status"] = NotificationStatus.READ
                     if not notification["read_at"]:
-                        notification["read_at"] = datetime.now()
+                        notification["read_at"] = now
                     updated_count += 1
             
+            self._unread_counts.pop(user_id, None)
             return updated_count > 0
             
         except Exception as e:
             log_error(e, ErrorType.NOTIFICATION_MARK_ALL_READ, context={"user_id": user_id})
             return False
     
+    def get_unread_count(self, user_id: str) -> int:
+        """Obtener el número de notificaciones no leídas sin calcular todas las estadísticas"""
+        unread_count = self._unread_counts.get(user_id)
+        if unread_count is None:
+            unread_count = sum(
+                1 for n in self._get_user_notifications(user_id)
+                if n["status"] == NotificationStatus.UNREAD
+            )
+            self._unread_counts[user_id] = unread_count
+        return unread_count
+    
     def get_notification_stats(self, user_id: str) -> NotificationStats:
         """Obtener estadísticas de notificaciones"""
         try:
@@ -419,45 +466,64 @@ class NotificationService:
             log_error(e, ErrorType.NOTIFICATION_SETTINGS_RETRIEVAL, context={"user_id": user_id})
             raise
     
+    def get_settings_version(self, user_id: str) -> int:
+        """Versión de la configuración del usuario (cambia con cada actualización)"""
+        return self._settings_versions.get(user_id, 0)
+    
     def update_user_settings(self, user_id: str, settings: NotificationSettings) -> NotificationSettings:
         """Actualizar configuración de notificaciones del usuario"""
         try:
-            self.user_settings[user_id] = settings.dict()
+            self.user_settings[user_id] = settings.model_dump()
+            self._settings_versions[user_id] = self._settings_versions.get(user_id, 0) + 1
             return settings
             
         except Exception as e:
             log_error(e, ErrorType.NOTIFICATION_SETTINGS_UPDATE, context={"user_id": user_id})
             raise
     
-    def bulk_action(self, user_id: str, bulk_action: NotificationBulkAction) -> bool:
-        """Realizar acción masiva en notificaciones"""
+    def bulk_action(self, user_id: str, bulk_action: NotificationBulkAction) -> int:
+        """
+        Realizar acción masiva en notificaciones
+        
+        Returns:
+            Número de notificaciones afectadas
+        """
         try:
-            updated_count = 0
-            
-            for notification_id in bulk_action.notification_ids:
-                notification = self.notifications.get(notification_id)
-                if notification and notification["user_id"] == user_id:
-                    if bulk_action.action == "mark_read":
-                        notification["status"] = NotificationStatus.READ
-                        if not notification["read_at"]:
-                            notification["read_at"] = datetime.now()
-                        updated_count += 1
-                    elif bulk_action.action == "mark_unread":
-                        notification["status"] = NotificationStatus.UNREAD
-                        notification["read_at"] = None
-                        updated_count += 1
-                    elif bulk_action.action == "archive":
-                        notification["status"] = NotificationStatus.ARCHIVED
-                        updated_count += 1
-                    elif bulk_action.action == "delete":
-                        del self.notifications[notification_id]
-                        updated_count += 1
-            
-            return updated_count > 0
+            action = bulk_action.action
+            if action not in ("mark_read", "mark_unread", "archive", "delete"):
+                return 0
+            
+            # Resolver una sola vez las notificaciones del usuario y aplicar la acción al lote
+            targets = [
+                notification_id for notification_id in set(bulk_action.notification_ids)
+                if self._get_owned_notification(notification_id, user_id)
+            ]
+            
+            if action == "delete":
+                for notification_id in targets:
+                    self._remove_notification(notification_id)
+            elif action == "mark_read":
+                now = datetime.now()
+                for notification_id in targets:
+                    notification = self.notifications[notification_id]
+                    notification["status"] = NotificationStatus.READ
+                    if not notification["read_at"]:
+                        notification["read_at"] = now
+            elif action == "mark_unread":
+                for notification_id in targets:
+                    notification = self.notifications[notification_id]
+                    notification["status"] = NotificationStatus.UNREAD
+                    notification["read_at"] = None
+            else:
+                for notification_id in targets:
+                    self.notifications[notification_id]["status"] = NotificationStatus.ARCHIVED
+            
+            self._unread_counts.pop(user_id, None)
+            return len(targets)
             
         except Exception as e:
             log_error(e, ErrorType.NOTIFICATION_BULK_ACTION, context={"user_id": user_id})
-            return False
+            return 0
     
     def get_templates(self) -> List[NotificationTemplate]:
         """Obtener templates de notificaciones disponibles"""
@@ -475,13 +541,7 @@ class NotificationService:
             if not template:
                 return None
             
-            # Reemplazar variables en el template
-            title = template["title_template"]
-            message = template["message_template"]
-            
-            for var_name, var_value in variables.items():
-                title = title.replace(f"{{{var_name}}}", str(var_value))
-                message = message.replace(f"{{{var_name}}}", str(var_value))
+            title, message = self._render_template(template, variables)
             
             notification_data = NotificationCreate(
                 user_id=user_id,
@@ -500,20 +560,89 @@ class NotificationService:
             log_error(e, ErrorType.NOTIFICATION_TEMPLATE_CREATION, context={"template_id": template_id})
             return None
     
-    def cleanup_expired_notifications(self) -> int:
-        """Limpiar notificaciones expiradas"""
+    def create_from_template_bulk(
+        self,
+        template_id: str,
+        user_ids: List[str],
+        variables: Dict[str, Any]
+    ) -> Optional[int]:
+        """
+        Crear la misma notificación de template para varios usuarios
+        
+        El template se renderiza y valida una sola vez y se inserta una copia por usuario.
+        
+        Returns:
+            Número de notificaciones creadas o None si el template no existe
+        """
+        try:
+            template = self.templates.get(template_id)
+            if not template:
+                return None
+            
+            recipients = list(dict.fromkeys(user_ids))
+            if not recipients:
+                return 0
+            
+            title, message = self._render_template(template, variables)
+            base = NotificationCreate(
+                user_id=recipients[0],
+                type=template["type"],
+                title=title,
+                message=message,
+                priority=template["priority"],
+                actions=template["actions"],
+                category=template["category"],
+                data=variables
+            )
+            
+            created_at = datetime.now()
+            for user_id in recipients:
+                user_settings = self._get_user_settings(user_id)
+                if len(self._user_index.get(user_id, ())) >= user_settings.get("max_notifications", 100):
+                    self._cleanup_old_notifications(user_id)
+                
+                self._add_notification({
+                    "id": f"notif_{uuid.uuid4().hex[:8]}",
+                    "user_id": user_id,
+                    "type": base.type,
+                    "title": base.title,
+                    "message": base.message,
+                    "priority": base.priority,
+                    "status": NotificationStatus.UNREAD,
+                    # Copias por destinatario: ninguna notificación comparte data ni actions
+                    "data": copy.deepcopy(base.data),
+                    "actions": list(base.actions) if base.actions is not None else None,
+                    "created_at": created_at,
+                    "read_at": None,
+                    "expires_at": None,
+                    "category": base.category,
+                    "is_expired": False
+                })
+            
+            return len(recipients)
+            
+        except Exception as e:
+            log_error(e, ErrorType.NOTIFICATION_TEMPLATE_CREATION, context={"template_id": template_id})
+            return None
+    
+    async def cleanup_expired_notifications(self) -> int:
+        """Limpiar notificaciones expiradas por lotes, cediendo el event loop entre lotes"""
         try:
-            expired_count = 0
             current_time = datetime.now()
             
-            notification_ids_to_delete = []
-            for notification_id, notification in self.notifications.items():
-                if notification["expires_at"] and current_time > notification["expires_at"]:
-                    notification_ids_to_delete.append(notification_id)
-                    expired_count += 1
+            notification_ids_to_delete = [
+                notification_id for notification_id, notification in self.notifications.items()
+                if notification["expires_at"] and current_time > notification["expires_at"]
+            ]
             
-            for notification_id in notification_ids_to_delete:
-                del self.notifications[notification_id]
+            expired_count = 0
+            for start in range(0, len(notification_ids_to_delete), CLEANUP_BATCH_SIZE):
+                for notification_id in notification_ids_to_delete[start:start + CLEANUP_BATCH_SIZE]:
+                    # Puede haberse eliminado por otra petición mientras se cedía el loop
+                    if notification_id in self.notifications:
+                        self._remove_notification(notification_id)
+                        expired_count += 1
+                await asyncio.sleep(0)
             
             return expired_count
             
@@ -521,9 +650,83 @@ class NotificationService:
             log_error(e, ErrorType.NOTIFICATION_CLEANUP)
             return 0
     
+    async def start(self) -> None:
+        """Iniciar las tareas de fondo del servicio"""
+        if NOTIFICATION_CONFIG["cleanup_enabled"] and self._cleanup_task is None:
+            self._cleanup_task = asyncio.create_task(self.run_periodic_cleanup())
+    
+    async def close(self) -> None:
+        """Detener las tareas de fondo del servicio"""
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            try:
+                await self._cleanup_task
+            except asyncio.CancelledError:
+                pass
+            self._cleanup_task = None
+    
+    async def run_periodic_cleanup(self) -> None:
+        """Limpiar notificaciones expiradas cada `cleanup_interval_hours`"""
+        interval = NOTIFICATION_CONFIG["cleanup_interval_hours"] * 3600
+        while True:
+            await asyncio.sleep(interval)
+            await self.cleanup_expired_notifications()
+    
     def _get_user_notifications(self, user_id: str) -> List[Dict]:
         """Obtener todas las notificaciones de un usuario"""
-        return [n for n in self.notifications.values() if n["user_id"] == user_id]
+        return [self.notifications[notification_id] for _, notification_id in self._user_index.get(user_id, [])]
+    
+    @staticmethod
+    def _render_template(template: Dict, variables: Dict[str, Any]) -> Tuple[str, str]:
+        """Reemplazar variables en el título y mensaje de un template"""
+        title = template["title_template"]
+        message = template["message_template"]
+        
+        for var_name, var_value in variables.items():
+            title = title.replace(f"{{{var_name}}}", str(var_value))
+            message = message.replace(f"{{{var_name}}}", str(var_value))
+        
+        return title, message
+    
+    def _get_owned_notification(self, notification_id: str, user_id: str) -> Optional[Dict]:
+        """Obtener una notificación solo si pertenece al usuario (id y propietario en una sola consulta)"""
+        notification = self.notifications.get(notification_id)
+        if notification is None or notification["user_id"] != user_id:
+            return None
+        return notification
+    
+    def _add_notification(self, notification: Dict) -> None:
+        """Guardar una notificación y registrarla en el índice del usuario"""
+        self.notifications[notification["id"]] = notification
+        self._search_text[notification["id"]] = f"{notification['title']}\n{notification['message']}".lower()
+        self._unread_counts.pop(notification["user_id"], None)
+        bisect.insort(self._user_index[notification["user_id"]], (notification["created_at"], notification["id"]))
+    
+    def _remove_notification(self, notification_id: str) -> None:
+        """Eliminar una notificación y su entrada en el índice del usuario"""
+        notification = self.notifications.pop(notification_id)
+        self._search_text.pop(notification_id, None)
+        self._unread_counts.pop(notification["user_id"], None)
+        user_index = self._user_index[notification["user_id"]]
+        key = (notification["created_at"], notification_id)
+        idx = bisect.bisect_left(user_index, key)
+        if idx < len(user_index) and user_index[idx] == key:
+            del user_index[idx]
+    
+    @staticmethod
+    def _encode_cursor(notification: Dict) -> str:
+        """Codificar la posición de una notificación como cursor opaco"""
+        raw = f"{notification['created_at'].isoformat()}|{notification['id']}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+    
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+        """Decodificar un cursor de paginación"""
+        try:
+            created_at, notification_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+            return datetime.fromisoformat(created_at), notification_id
+        except Exception:
+            raise ValueError("Cursor de paginación inválido")
     
     def _get_user_settings(self, user_id: str) -> Dict:
         """Obtener configuración de usuario o crear por defecto"""
@@ -552,41 +755,33 @@ class NotificationService:
             }
         return self.user_settings[user_id]
     
+    def _matches_filters(
+        self,
+        notification: Dict,
+        search_request: NotificationSearchRequest,
+        search_term: Optional[str] = None
+    ) -> bool:
+        """Verificar si una notificación cumple los filtros de búsqueda"""
+        if search_request.type and notification["type"] != search_request.type:
+            return False
+        if search_request.status and notification["status"] != search_request.status:
+            return False
+        if search_request.priority and notification["priority"] != search_request.priority:
+            return False
+        if search_request.category and notification.get("category") != search_request.category:
+            return False
+        if search_term and search_term not in self._search_text[notification["id"]]:
+            return False
+        if search_request.date_from and notification["created_at"] < search_request.date_from:
+            return False
+        if search_request.date_to and notification["created_at"] > search_request.date_to:
+            return False
+        return True
+    
     def _apply_filters(self, notifications: List[Dict], search_request: NotificationSearchRequest) -> List[Dict]:
         """Aplicar filtros a las notificaciones"""
-        filtered = notifications
-        
-        # Filtrar por tipo
-        if search_request.type:
-            filtered = [n for n in filtered if n["type"] == search_request.type]
-        
-        # Filtrar por estado
-        if search_request.status:
-            filtered = [n for n in filtered if n["status"] == search_request.status]
-        
-        # Filtrar por prioridad
-        if search_request.priority:
-            filtered = [n for n in filtered if n["priority"] == search_request.priority]
-        
-        # Filtrar por categoría
-        if search_request.category:
-            filtered = [n for n in filtered if n.get("category") == search_request.category]
-        
-        # Buscar en título y mensaje
-        if search_request.search:
-            search_term = search_request.search.lower()
-            filtered = [n for n in filtered if 
-                       search_term in n["title"].lower() or 
-                       search_term in n["message"].lower()]
-        
-        # Filtrar por fecha
-        if search_request.date_from:
-            filtered = [n for n in filtered if n["created_at"] >= search_request.date_from]
-        
-        if search_request.date_to:
-            filtered = [n for n in filtered if n["created_at"] <= search_request.date_to]
-        
-        return filtered
+        search_term = search_request.search.lower() if search_request.search else None
+        return [n for n in notifications if self._matches_filters(n, search_request, search_term)]
     
     def _cleanup_old_notifications(self, user_id: str):
         """Limpiar notificaciones antiguas del usuario"""
@@ -603,7 +798,7 @@ class NotificationService:
                     notification_ids_to_delete.append(notification_id)
             
             for notification_id in notification_ids_to_delete:
-                del self.notifications[notification_id]
+                self._remove_notification(notification_id)
                 
         except Exception as e:
             log_error(e, ErrorType.NOTIFICATION_CLEANUP, context={"user_id": user_id}) 
\ No newline at end of file
@@ -1,7 +1,8 @@
+import asyncio
 import hashlib
 import base64
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 from uuid import uuid4
 import re
 
@@ -9,6 +10,7 @@ from models.signatures import (
     DocumentSignatureCreate,
     DocumentSignatureUpdate,
     DocumentSignatureResponse,
+    DocumentSignatureListResponse,
     SignatoryCreate,
     SignatoryResponse,
     SignatureRequest,
@@ -19,6 +21,8 @@ from models.signatures import (
     SignatureMethod,
     SIGNATURE_EXAMPLES
 )
+from core.config import SIGNATURE_CONFIG
+from core.database import get_supabase
 from services.monitoring.error_handler import log_error, ErrorType
 
 
@@ -36,6 +40,8 @@ class SignatureService:
         self.signatories: Dict[str, Dict] = {}
         self.signatures: Dict[str, List[Dict]] = {}
         self.document_signatories: Dict[str, List[str]] = {}
+        # Índice firmante -> documento para validar pertenencia en O(1)
+        self.signatory_documents: Dict[str, str] = {}
         
         # Cargar datos de ejemplo
         self._load_example_data()
@@ -61,7 +67,10 @@ class SignatureService:
             "status": DocumentStatus.SENT,
             "created_at": now,
             "updated_at": now,
-            "completed_at": None
+            "completed_at": None,
+            "signed_count": 2,
+            "total_count": 2,
+            "progress_percentage": 100.0
         }
         
         # Crear firmantes de ejemplo
@@ -96,6 +105,7 @@ class SignatureService:
         self.signatories["sig_1"] = signatory_1
         self.signatories["sig_2"] = signatory_2
         self.document_signatories[doc_id] = ["sig_1", "sig_2"]
+        self.signatory_documents.update({"sig_1": doc_id, "sig_2": doc_id})
         
         # Crear firmas de ejemplo
         self.signatures[doc_id] = [
@@ -143,21 +153,53 @@ class SignatureService:
             return False
     
     def _calculate_progress(self, document_id: str) -> tuple[float, int, int]:
-        """Calcular progreso de firma del documento"""
-        signatory_ids = self.document_signatories.get(document_id, [])
-        total_count = len(signatory_ids)
-        
-        if total_count == 0:
-            return 0.0, 0, 0
+        """Obtener progreso de firma del documento (contadores materializados)"""
+        document = self.documents[document_id]
+        return document["progress_percentage"], document["signed_count"], document["total_count"]
+    
+    def _adjust_progress(self, document: Dict, signed_delta: int = 0, total_delta: int = 0):
+        """Actualizar los contadores de progreso en la misma operación que los modifica"""
+        document["signed_count"] += signed_delta
+        document["total_count"] += total_delta
+        total_count = document["total_count"]
+        document["progress_percentage"] = (document["signed_count"] / total_count) * 100 if total_count else 0.0
+    
+    def _get_owned_document(self, document_id: str, user_id: Optional[str] = None) -> Dict:
+        """Obtener el documento verificando, si se indica, que pertenezca al usuario"""
+        document = self.documents.get(document_id)
+        if not document:
+            raise ValueError(f"Documento {document_id} no encontrado")
+        if user_id is not None and document["user_id"] != user_id:
+            raise PermissionError(f"El documento {document_id} no pertenece al usuario")
+        return document
+    
+    def _get_document_signatory(self, document_id: str, signatory_id: str) -> Dict:
+        """Obtener un firmante verificando que pertenezca al documento"""
+        if self.signatory_documents.get(signatory_id) != document_id:
+            raise LookupError(f"Firmante {signatory_id} no encontrado en el documento {document_id}")
+        return self.signatories[signatory_id]
+    
+    def _build_document_response(self, document: Dict) -> DocumentSignatureResponse:
+        """Ensamblar la respuesta de un documento con sus firmantes y firmas"""
+        document_id = document["id"]
         
-        signed_count = 0
-        for sig_id in signatory_ids:
-            signatory = self.signatories.get(sig_id)
-            if signatory and signatory["status"] == SignatureStatus.SIGNED:
-                signed_count += 1
+        # Los datos ya fueron validados al guardarse: construir sin revalidar
+        signatories = [
+            SignatoryResponse.model_construct(**self.signatories[sig_id])
+            for sig_id in self.document_signatories.get(document_id, [])
+            if sig_id in self.signatories
+        ]
+        signatures = [
+            SignatureData.model_construct(**sig_data)
+            for sig_data in self.signatures.get(document_id, [])
+        ]
         
-        progress_percentage = (signed_count / total_count) * 100
-        return progress_percentage, signed_count, total_count
+        # El documento ya incluye progress_percentage, signed_count y total_count
+        return DocumentSignatureResponse.model_construct(
+            **document,
+            signatories=signatories,
+            signatures=signatures
+        )
     
     def _update_document_status(self, document_id: str):
         """Actualizar estado del documento basado en firmas"""
@@ -211,6 +253,7 @@ class SignatureService:
                     "certificate_hash": None
                 }
                 self.signatories[signatory_id] = signatory
+                self.signatory_documents[signatory_id] = document_id
                 signatory_ids.append(signatory_id)
             
             # Crear documento
@@ -221,7 +264,10 @@ class SignatureService:
                 "status": DocumentStatus.DRAFT,
                 "created_at": now,
                 "updated_at": now,
-                "completed_at": None
+                "completed_at": None,
+                "signed_count": 0,
+                "total_count": len(signatory_ids),
+                "progress_percentage": 0.0
             }
             
             self.documents[document_id] = document
@@ -231,9 +277,27 @@ class SignatureService:
             return await self.get_document(document_id)
             
         except Exception as e:
-            log_error(e, ErrorType.SIGNATURE_CREATION, {"user_id": user_id})
+            log_error(e, ErrorType.SIGNATURE_CREATION, context={"user_id": user_id})
             raise
     
+    async def get_owner(self, document_id: str) -> str:
+        """
+        👤 Obtener el dueño de un documento
+        
+        Lectura directa del almacenamiento, sin ensamblar firmantes ni firmas;
+        pensada para las verificaciones de permisos.
+        
+        Args:
+            document_id: ID del documento
+            
+        Returns:
+            ID del usuario dueño del documento
+        """
+        document = self.documents.get(document_id)
+        if not document:
+            raise ValueError(f"Documento {document_id} no encontrado")
+        return document["user_id"]
+    
     async def get_document(self, document_id: str) -> DocumentSignatureResponse:
         """
         📄 Obtener un documento de firma
@@ -249,33 +313,62 @@ class SignatureService:
             if not document:
                 raise ValueError(f"Documento {document_id} no encontrado")
             
-            # Obtener firmantes
-            signatory_ids = self.document_signatories.get(document_id, [])
-            signatories = []
-            for sig_id in signatory_ids:
-                signatory = self.signatories.get(sig_id)
-                if signatory:
-                    signatories.append(SignatoryResponse(**signatory))
-            
-            # Obtener firmas
-            signatures = []
-            for sig_data in self.signatures.get(document_id, []):
-                signatures.append(SignatureData(**sig_data))
-            
-            # Calcular progreso
-            progress_percentage, signed_count, total_count = self._calculate_progress(document_id)
-            
-            return DocumentSignatureResponse(
-                **document,
-                signatories=signatories,
-                signatures=signatures,
-                progress_percentage=progress_percentage,
-                signed_count=signed_count,
-                total_count=total_count
-            )
+            return self._build_document_response(document)
+            
+        except Exception as e:
+            log_error(e, ErrorType.SIGNATURE_RETRIEVAL, context={"document_id": document_id})
+            raise
+    
+    async def get_document_progress(
+        self,
+        document_id: str,
+        user_id: Optional[str] = None,
+        include_signatories: bool = True
+    ) -> Dict[str, Any]:
+        """
+        📈 Obtener el progreso de firma de un documento
+        
+        Se arma directamente desde los datos almacenados, sin construir el
+        modelo completo del documento.
+        
+        Args:
+            document_id: ID del documento
+            user_id: Si se indica, solo se devuelve si el documento le pertenece
+            include_signatories: Incluir el detalle de cada firmante
+            
+        Returns:
+            Progreso listo para serializar
+        """
+        try:
+            document = self._get_owned_document(document_id, user_id)
+            progress = {
+                "document_id": document_id,
+                "progress_percentage": document["progress_percentage"],
+                "signed_count": document["signed_count"],
+                "total_count": document["total_count"],
+                "status": document["status"]
+            }
+            if not include_signatories:
+                return progress
+            
+            signatories = [self.signatories[sig_id] for sig_id in self.document_signatories.get(document_id, []) if sig_id in self.signatories]
+            
+            return {
+                **progress,
+                "signatories": [
+                    {
+                        "id": sig["id"],
+                        "name": sig["name"],
+                        "email": sig["email"],
+                        "status": sig["status"],
+                        "signed_at": sig["signed_at"]
+                    }
+                    for sig in signatories
+                ]
+            }
             
         except Exception as e:
-            log_error(e, ErrorType.SIGNATURE_RETRIEVAL, {"document_id": document_id})
+            log_error(e, ErrorType.SIGNATURE_PROGRESS, context={"document_id": document_id})
             raise
     
     async def list_documents(self, user_id: str, page: int = 1, per_page: int = 10) -> DocumentSignatureListResponse:
@@ -303,15 +396,12 @@ class SignatureService:
             end_idx = start_idx + per_page
             page_documents = user_documents[start_idx:end_idx]
             
-            # Obtener documentos completos
-            documents = []
-            for doc_id in page_documents:
-                doc = await self.get_document(doc_id)
-                documents.append(doc)
+            # Ensamblar la página completa en una sola pasada
+            documents = [self._build_document_response(self.documents[doc_id]) for doc_id in page_documents]
             
             total_pages = (total + per_page - 1) // per_page
             
-            return DocumentSignatureListResponse(
+            return DocumentSignatureListResponse.model_construct(
                 documents=documents,
                 total=total,
                 page=page,
@@ -320,24 +410,28 @@ class SignatureService:
             )
             
         except Exception as e:
-            log_error(e, ErrorType.SIGNATURE_RETRIEVAL, {"user_id": user_id})
+            log_error(e, ErrorType.SIGNATURE_RETRIEVAL, context={"user_id": user_id})
             raise
     
-    async def update_document(self, document_id: str, update_data: DocumentSignatureUpdate) -> DocumentSignatureResponse:
+    async def update_document(
+        self,
+        document_id: str,
+        update_data: DocumentSignatureUpdate,
+        user_id: Optional[str] = None
+    ) -> DocumentSignatureResponse:
         """
         📝 Actualizar documento de firma
         
         Args:
             document_id: ID del documento
             update_data: Datos de actualización
+            user_id: Si se indica, solo se actualiza si el documento le pertenece
             
         Returns:
             Documento actualizado
         """
         try:
-            document = self.documents.get(document_id)
-            if not document:
-                raise ValueError(f"Documento {document_id} no encontrado")
+            document = self._get_owned_document(document_id, user_id)
             
             # Actualizar campos
             update_dict = update_data.dict(exclude_unset=True)
@@ -349,27 +443,28 @@ class SignatureService:
             return await self.get_document(document_id)
             
         except Exception as e:
-            log_error(e, ErrorType.SIGNATURE_UPDATE, {"document_id": document_id})
+            log_error(e, ErrorType.SIGNATURE_UPDATE, context={"document_id": document_id})
             raise
     
-    async def delete_document(self, document_id: str) -> bool:
+    async def delete_document(self, document_id: str, user_id: Optional[str] = None) -> bool:
         """
         🗑️ Eliminar documento de firma
         
         Args:
             document_id: ID del documento
+            user_id: Si se indica, solo se elimina si el documento le pertenece
             
         Returns:
             True si se eliminó correctamente
         """
         try:
-            if document_id not in self.documents:
-                raise ValueError(f"Documento {document_id} no encontrado")
+            self._get_owned_document(document_id, user_id)
             
             # Eliminar firmantes asociados
             signatory_ids = self.document_signatories.get(document_id, [])
             for sig_id in signatory_ids:
                 self.signatories.pop(sig_id, None)
+                self.signatory_documents.pop(sig_id, None)
             
             # Eliminar datos
             self.documents.pop(document_id)
@@ -379,24 +474,28 @@ class SignatureService:
             return True
             
         except Exception as e:
-            log_error(e, ErrorType.SIGNATURE_DELETION, {"document_id": document_id})
+            log_error(e, ErrorType.SIGNATURE_DELETION, context={"document_id": document_id})
             raise
     
-    async def add_signatory(self, document_id: str, signatory_data: SignatoryCreate) -> SignatoryResponse:
+    async def add_signatory(
+        self,
+        document_id: str,
+        signatory_data: SignatoryCreate,
+        user_id: Optional[str] = None
+    ) -> SignatoryResponse:
         """
         👤 Añadir firmante a documento
         
         Args:
             document_id: ID del documento
             signatory_data: Datos del firmante
+            user_id: Si se indica, solo se añade si el documento le pertenece
             
         Returns:
             Firmante creado
         """
         try:
-            document = self.documents.get(document_id)
-            if not document:
-                raise ValueError(f"Documento {document_id} no encontrado")
+            document = self._get_owned_document(document_id, user_id)
             
             signatory_id = f"sig_{uuid4().hex[:8]}"
             signatory = {
@@ -412,15 +511,84 @@ class SignatureService:
             }
             
             self.signatories[signatory_id] = signatory
+            self.signatory_documents[signatory_id] = document_id
             self.document_signatories[document_id].append(signatory_id)
+            self._adjust_progress(document, total_delta=1)
             
             # Actualizar estado del documento
             self._update_document_status(document_id)
             
-            return SignatoryResponse(**signatory)
+            return SignatoryResponse.model_construct(**signatory)
+            
+        except Exception as e:
+            log_error(e, ErrorType.SIGNATURE_SIGNATORY_ADD, context={"document_id": document_id})
+            raise
+    
+    async def create_download_url(self, document_id: str, user_id: Optional[str] = None) -> Optional[str]:
+        """
+        📥 Crear una URL firmada y temporal para descargar el PDF firmado
+        
+        El archivo se descarga directamente desde Supabase Storage
+        (signed/{document_id}.pdf), sin pasar sus bytes por la API.
+        
+        Args:
+            document_id: ID del documento
+            user_id: Si se indica, solo se genera si el documento le pertenece
+            
+        Returns:
+            URL firmada o None si el documento aún no está completado
+        """
+        try:
+            document = self._get_owned_document(document_id, user_id)
+            if document["status"] != DocumentStatus.COMPLETED:
+                return None
+            
+            bucket = get_supabase().storage.from_(SIGNATURE_CONFIG["storage_bucket"])
+            result = await asyncio.to_thread(
+                bucket.create_signed_url,
+                f"signed/{document_id}.pdf",
+                SIGNATURE_CONFIG["download_url_expires_seconds"]
+            )
+            return result.get("signedURL") or result.get("signedUrl")
+            
+        except Exception as e:
+            log_error(e, ErrorType.SIGNATURE_DOWNLOAD, context={"document_id": document_id})
+            raise
+    
+    async def get_signature_image(
+        self,
+        document_id: str,
+        signatory_id: str,
+        user_id: Optional[str] = None
+    ) -> Tuple[bytes, str]:
+        """
+        🖼️ Obtener la imagen de la firma de un firmante
+        
+        Args:
+            document_id: ID del documento
+            signatory_id: ID del firmante
+            user_id: Si se indica, solo se devuelve si el documento le pertenece
+            
+        Returns:
+            Bytes de la imagen y su tipo MIME
+        """
+        try:
+            self._get_owned_document(document_id, user_id)
+            signatory = self._get_document_signatory(document_id, signatory_id)
+            
+            signature_data = signatory.get("signature_data")
+            if not signature_data:
+                raise ValueError(f"El firmante {signatory_id} no ha firmado")
+            
+            media_type = "image/png"
+            if signature_data.startswith("data:"):
+                header, signature_data = signature_data.split(",", 1)
+                media_type = header[len("data:"):].split(";", 1)[0] or media_type
+            
+            return base64.b64decode(signature_data), media_type
             
         except Exception as e:
-            log_error(e, ErrorType.SIGNATURE_SIGNATORY_ADD, {"document_id": document_id})
+            log_error(e, ErrorType.SIGNATURE_RETRIEVAL, context={"document_id": document_id, "signatory_id": signatory_id})
             raise
     
     async def sign_document(self, document_id: str, signature_request: SignatureRequest) -> SignatureData:
@@ -440,10 +608,8 @@ class SignatureService:
             if not document:
                 raise ValueError(f"Documento {document_id} no encontrado")
             
-            # Validar firmante
-            signatory = self.signatories.get(signature_request.signatory_id)
-            if not signatory:
-                raise ValueError(f"Firmante {signature_request.signatory_id} no encontrado")
+            # Validar que el firmante pertenezca al documento
+            signatory = self._get_document_signatory(document_id, signature_request.signatory_id)
             
             # Validar estado
             if signatory["status"] == SignatureStatus.SIGNED:
@@ -484,6 +650,8 @@ class SignatureService:
                 "certificate_hash": certificate_hash
             })
             
+            self._adjust_progress(document, signed_delta=1)
+            
             # Añadir firma al documento
             self.signatures[document_id].append(signature_data.dict())
             
@@ -493,7 +661,7 @@ class SignatureService:
             return signature_data
             
         except Exception as e:
-            log_error(e, ErrorType.SIGNATURE_SIGNING, {"document_id": document_id})
+            log_error(e, ErrorType.SIGNATURE_SIGNING, context={"document_id": document_id})
             raise
     
     async def decline_signature(self, document_id: str, signatory_id: str, reason: str = "") -> bool:
@@ -509,9 +677,10 @@ class SignatureService:
             True si se rechazó correctamente
         """
         try:
-            signatory = self.signatories.get(signatory_id)
-            if not signatory:
-                raise ValueError(f"Firmante {signatory_id} no encontrado")
+            signatory = self._get_document_signatory(document_id, signatory_id)
+            
+            if signatory["status"] == SignatureStatus.SIGNED:
+                self._adjust_progress(self.documents[document_id], signed_delta=-1)
             
             signatory["status"] = SignatureStatus.DECLINED
             signatory["updated_at"] = datetime.now()
@@ -522,37 +691,55 @@ class SignatureService:
             return True
             
         except Exception as e:
-            log_error(e, ErrorType.SIGNATURE_DECLINE, {"document_id": document_id, "signatory_id": signatory_id})
+            log_error(e, ErrorType.SIGNATURE_DECLINE, context={"document_id": document_id, "signatory_id": signatory_id})
             raise
     
-    async def resend_invitations(self, document_id: str) -> bool:
+    async def _send_invitation(self, document: Dict, signatory: Dict) -> None:
+        """Enviar la invitación de firma a un firmante"""
+        # Aquí se enviaría el email real
+    
+    async def resend_invitations(self, document_id: str, user_id: Optional[str] = None) -> Dict[str, int]:
         """
         📧 Reenviar invitaciones de firma
         
+        Los envíos se hacen en paralelo, limitados por
+        SIGNATURE_CONFIG["max_concurrent_invitations"] para no saturar el
+        proveedor de correo.
+        
         Args:
             document_id: ID del documento
+            user_id: Si se indica, solo se reenvían si el documento le pertenece
             
         Returns:
-            True si se enviaron correctamente
+            Invitaciones enviadas y fallidas
         """
         try:
-            document = self.documents.get(document_id)
-            if not document:
-                raise ValueError(f"Documento {document_id} no encontrado")
+            document = self._get_owned_document(document_id, user_id)
             
-            signatory_ids = self.document_signatories.get(document_id, [])
-            resent_count = 0
+            pending = [
+                self.signatories[sig_id]
+                for sig_id in self.document_signatories.get(document_id, [])
+                if sig_id in self.signatories and self.signatories[sig_id]["status"] == SignatureStatus.PENDING
+            ]
             
-            for sig_id in signatory_ids:
-                signatory = self.signatories.get(sig_id)
-                if signatory and signatory["status"] == SignatureStatus.PENDING:
-                    # Aquí se enviaría el email real
-                    resent_count += 1
+            semaphore = asyncio.Semaphore(SIGNATURE_CONFIG["max_concurrent_invitations"])
             
-            return True
+            async def send(signatory: Dict) -> None:
+                async with semaphore:
+                    await self._send_invitation(document, signatory)
+            
+            results = await asyncio.gather(*(send(signatory) for signatory in pending), return_exceptions=True)
+            
+            failed = 0
+            for signatory, result in zip(pending, results):
+                if isinstance(result, Exception):
+                    failed += 1
+                    log_error(result, ErrorType.SIGNATURE_RESEND, context={"document_id": document_id, "signatory_id": signatory["id"]})
+            
+            return {"sent": len(pending) - failed, "failed": failed}
             
         except Exception as e:
-            log_error(e, ErrorType.SIGNATURE_RESEND, {"document_id": document_id})
+            log_error(e, ErrorType.SIGNATURE_RESEND, context={"document_id": document_id})
             raise
     
     async def get_signature_stats(self, user_id: str) -> SignatureStats:
@@ -566,28 +753,33 @@ class SignatureService:
             Estadísticas de firmas
         """
         try:
-            user_documents = [
-                doc for doc in self.documents.values()
-                if doc["user_id"] == user_id
-            ]
-            
-            total_documents = len(user_documents)
-            completed_documents = len([d for d in user_documents if d["status"] == DocumentStatus.COMPLETED])
-            pending_documents = len([d for d in user_documents if d["status"] in [DocumentStatus.SENT, DocumentStatus.PARTIALLY_SIGNED]])
-            expired_documents = len([d for d in user_documents if d["status"] == DocumentStatus.EXPIRED])
-            
-            total_signatures = sum(len(self.signatures.get(doc["id"], [])) for doc in user_documents)
-            
-            # Calcular tiempo promedio de completado
-            completion_times = []
-            for doc in user_documents:
-                if doc["status"] == DocumentStatus.COMPLETED and doc["completed_at"] and doc["created_at"]:
-                    time_diff = (doc["completed_at"] - doc["created_at"]).total_seconds() / 3600  # horas
-                    completion_times.append(time_diff)
-            
-            average_completion_time = sum(completion_times) / len(completion_times) if completion_times else None
-            
-            return SignatureStats(
+            # Agregar todos los contadores en una sola pasada
+            total_documents = completed_documents = pending_documents = expired_documents = 0
+            total_signatures = 0
+            completion_hours = 0.0
+            completion_count = 0
+            
+            for doc in self.documents.values():
+                if doc["user_id"] != user_id:
+                    continue
+                
+                total_documents += 1
+                total_signatures += len(self.signatures.get(doc["id"], ()))
+                
+                doc_status = doc["status"]
+                if doc_status == DocumentStatus.COMPLETED:
+                    completed_documents += 1
+                    if doc["completed_at"] and doc["created_at"]:
+                        completion_hours += (doc["completed_at"] - doc["created_at"]).total_seconds() / 3600
+                        completion_count += 1
+                elif doc_status in (DocumentStatus.SENT, DocumentStatus.PARTIALLY_SIGNED):
+                    pending_documents += 1
+                elif doc_status == DocumentStatus.EXPIRED:
+                    expired_documents += 1
+            
+            average_completion_time = completion_hours / completion_count if completion_count else None
+            
+            return SignatureStats.model_construct(
                 total_documents=total_documents,
                 completed_documents=completed_documents,
                 pending_documents=pending_documents,
@@ -597,7 +789,7 @@ class SignatureService:
             )
             
         except Exception as e:
-            log_error(e, ErrorType.SIGNATURE_STATS, {"user_id": user_id})
+            log_error(e, ErrorType.SIGNATURE_STATS, context={"user_id": user_id})
             raise
     
     async def search_documents(self, user_id: str, search_request) -> DocumentSignatureListResponse:
@@ -661,15 +853,12 @@ class SignatureService:
             end_idx = start_idx + search_request.per_page
             page_documents = filtered_documents[start_idx:end_idx]
             
-            # Obtener documentos completos
-            documents = []
-            for doc_id in page_documents:
-                doc = await self.get_document(doc_id)
-                documents.append(doc)
+            # Ensamblar la página completa en una sola pasada
+            documents = [self._build_document_response(self.documents[doc_id]) for doc_id in page_documents]
             
             total_pages = (total + search_request.per_page - 1) // search_request.per_page
             
-            return DocumentSignatureListResponse(
+            return DocumentSignatureListResponse.model_construct(
                 documents=documents,
                 total=total,
                 page=search_request.page,
@@ -678,7 +867,7 @@ class SignatureService:
             )
             
         except Exception as e:
-            log_error(e, ErrorType.SIGNATURE_SEARCH, {"user_id": user_id})
+            log_error(e, ErrorType.SIGNATURE_SEARCH, context={"user_id": user_id})
             raise
 
 
@@ -9,10 +9,16 @@ Este módulo maneja todas las estadísticas y analytics del sistema:
 - Exportación de datos
 """
 
+import asyncio
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Awaitable, AsyncIterator
 from collections import defaultdict
-import json
+from itertools import islice
+from operator import attrgetter
+import csv
+import io
+import logging
+import orjson
 from models.stats import (
     DashboardStats, CategoryStats, WeeklyActivity, Achievement,
     DocumentStats, ChatStats, UsageStats, ActivityLog, DashboardResponse
@@ -21,9 +27,17 @@ from services.monitoring.usage_service import usage_service
 from services.auth.auth_service import auth_service
 from services.documents.document_service import document_service
 from services.legal.chat_service import chat_service
-from services.cache import cache_result, cache_service
+from services.cache import cache_service, user_stats_key
 from core.config import STATS_CONFIG
 
+logger = logging.getLogger(__name__)
+
+# Esquema fijo del CSV exportado: columnas del modelo y encabezados
+EXPORT_CSV_COLUMNS = ("category", "count", "percentage")
+EXPORT_CSV_HEADER = ("Category", "Count", "Percentage")
+_export_csv_row = attrgetter(*EXPORT_CSV_COLUMNS)
+EXPORT_CSV_CHUNK_ROWS = 500  # Filas por bloque enviado al cliente
+
 class StatsService:
     """Servicio para manejar estadísticas y analytics"""
     
@@ -32,7 +46,49 @@ class StatsService:
         self.stats_cache = {}
         self.cache_duration = 300  # 5 minutos
     
-    @cache_result(ttl=300, key_prefix="dashboard")
+    async def get_cached_response(
+        self,
+        user_id: str,
+        section: str,
+        loader: Callable[[str], Awaitable[Any]]
+    ) -> bytes:
+        """
+        📦 Obtener una sección de estadísticas serializada a JSON, cacheada por usuario
+        
+        Las secciones de un usuario comparten una entrada del caché que expira
+        a los STATS_CONFIG["user_cache_ttl"] segundos y se invalida cuando
+        cambian sus documentos o su historial de chat.
+        
+        Args:
+            user_id: ID del usuario
+            section: Nombre de la sección (dashboard, summary, ...)
+            loader: Función que calcula la sección para el usuario
+            
+        Returns:
+            Cuerpo JSON listo para enviar
+        """
+        if not STATS_CONFIG["cache_enabled"]:
+            return self._serialize(await loader(user_id))
+        
+        key = user_stats_key(user_id)
+        sections = await cache_service.get(key)
+        if sections is None:
+            sections = {}
+            await cache_service.set(key, sections, STATS_CONFIG["user_cache_ttl"])
+        
+        body = sections.get(section)
+        if body is None:
+            body = sections[section] = self._serialize(await loader(user_id))
+        return body
+    
+    async def invalidate_user_stats(self, user_id: str) -> None:
+        """Descartar las estadísticas cacheadas de un usuario"""
+        await cache_service.delete(user_stats_key(user_id))
+    
+    @staticmethod
+    def _serialize(value: Any) -> bytes:
+        return orjson.dumps(value, default=lambda model: model.model_dump(mode="json"))
+    
     async def get_dashboard_stats(self, user_id: str) -> DashboardResponse:
         """
         📊 Obtener estadísticas completas del dashboard
@@ -44,29 +100,27 @@ class StatsService:
             Respuesta completa del dashboard
         """
         try:
-            # Obtener estadísticas principales
-            main_stats = await self._get_main_stats(user_id)
-            
-            # Obtener estadísticas por categoría
-            categories = await self._get_category_stats(user_id)
-            
-            # Obtener actividad semanal
-            weekly_activity = await self._get_weekly_activity(user_id)
-            
-            # Obtener logros
-            achievements = await self._get_achievements(user_id)
-            
-            # Obtener estadísticas de documentos
-            document_stats = await self._get_document_stats(user_id)
-            
-            # Obtener estadísticas de chat
-            chat_stats = await self._get_chat_stats(user_id)
+            # Las secciones son independientes entre sí: se consultan en paralelo
+            results = await asyncio.gather(
+                self._get_main_stats(user_id),
+                self._get_category_stats(user_id),
+                self._get_weekly_activity(user_id),
+                self._get_achievements(user_id),
+                self._get_document_stats(user_id),
+                self._get_chat_stats(user_id),
+                self._get_usage_stats(user_id),
+                self._get_recent_activity(user_id),
+                return_exceptions=True
+            )
             
-            # Obtener estadísticas de uso
-            usage_stats = await self._get_usage_stats(user_id)
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
             
-            # Obtener actividad reciente
-            recent_activity = await self._get_recent_activity(user_id)
+            (
+                main_stats, categories, weekly_activity, achievements,
+                document_stats, chat_stats, usage_stats, recent_activity
+            ) = results
             
             return DashboardResponse(
                 stats=main_stats,
@@ -80,21 +134,17 @@ class StatsService:
             )
             
         except Exception as e:
-            print(f"❌ Error obteniendo estadísticas del dashboard: {e}")
+            logger.exception("Error obteniendo estadísticas del dashboard", extra={"user_id": user_id})
             raise
     
-    @cache_result(ttl=180, key_prefix="main_stats")
     async def _get_main_stats(self, user_id: str) -> DashboardStats:
         """Obtener estadísticas principales"""
         try:
-            # Obtener datos de uso
-            usage_stats = await usage_service.get_usage_stats(user_id)
-            
-            # Obtener documentos del usuario
-            documents = await document_service.get_user_documents(user_id)
-            
-            # Obtener actividad de chat
-            chat_history = await chat_service.get_chat_history(user_id)
+            # Obtener datos de uso y documentos del usuario en paralelo
+            usage_stats, documents = await asyncio.gather(
+                usage_service.get_usage_stats(user_id),
+                asyncio.to_thread(document_service.get_user_documents, user_id)
+            )
             
             # Calcular métricas
             total_consultations = usage_stats.total_queries
@@ -114,7 +164,7 @@ class StatsService:
             )
             
         except Exception as e:
-            print(f"❌ Error obteniendo estadísticas principales: {e}")
+            logger.exception("Error obteniendo estadísticas principales", extra={"user_id": user_id})
             return DashboardStats(
                 total_consultations=0,
                 total_documents=0,
@@ -124,7 +174,6 @@ class StatsService:
                 favorite_category="N/A"
             )
     
-    @cache_result(ttl=300, key_prefix="category_stats")
     async def _get_category_stats(self, user_id: str) -> List[CategoryStats]:
         """Obtener estadísticas por categoría"""
         try:
@@ -155,7 +204,7 @@ class StatsService:
             return categories
             
         except Exception as e:
-            print(f"❌ Error obteniendo estadísticas por categoría: {e}")
+            logger.exception("Error obteniendo estadísticas por categoría", extra={"user_id": user_id})
             return []
     
     async def _get_weekly_activity(self, user_id: str) -> List[WeeklyActivity]:
@@ -187,7 +236,7 @@ class StatsService:
             return weekly_activity
             
         except Exception as e:
-            print(f"❌ Error obteniendo actividad semanal: {e}")
+            logger.exception("Error obteniendo actividad semanal", extra={"user_id": user_id})
             return []
     
     async def _get_achievements(self, user_id: str) -> List[Achievement]:
@@ -196,9 +245,11 @@ class StatsService:
             achievements = []
             
             # Obtener estadísticas del usuario
-            usage_stats = await usage_service.get_usage_stats(user_id)
-            documents = await document_service.get_user_documents(user_id)
-            chat_stats = await chat_service.get_chat_stats(user_id)
+            usage_stats, documents, chat_stats = await asyncio.gather(
+                usage_service.get_usage_stats(user_id),
+                asyncio.to_thread(document_service.get_user_documents, user_id),
+                chat_service.get_chat_stats(user_id)
+            )
             
             # Logro: Primera consulta
             if usage_stats.total_queries >= 1:
@@ -242,13 +293,13 @@ class StatsService:
             return achievements[:5]  # Máximo 5 logros
             
         except Exception as e:
-            print(f"❌ Error obteniendo logros: {e}")
+            logger.exception("Error obteniendo logros", extra={"user_id": user_id})
             return []
     
     async def _get_document_stats(self, user_id: str) -> DocumentStats:
         """Obtener estadísticas de documentos"""
         try:
-            documents = await document_service.get_user_documents(user_id)
+            documents = await asyncio.to_thread(document_service.get_user_documents, user_id)
             
             # Contar por estado
             status_counts = defaultdict(int)
@@ -278,7 +329,7 @@ class StatsService:
             )
             
         except Exception as e:
-            print(f"❌ Error obteniendo estadísticas de documentos: {e}")
+            logger.exception("Error obteniendo estadísticas de documentos", extra={"user_id": user_id})
             return DocumentStats(
                 total_documents=0,
                 documents_by_status={},
@@ -290,8 +341,6 @@ class StatsService:
     async def _get_chat_stats(self, user_id: str) -> ChatStats:
         """Obtener estadísticas de chat"""
         try:
-            chat_stats = await chat_service.get_chat_stats(user_id)
-            
             # Obtener historial de chat
             chat_history = await chat_service.get_chat_history(user_id)
             
@@ -323,7 +372,7 @@ class StatsService:
             )
             
         except Exception as e:
-            print(f"❌ Error obteniendo estadísticas de chat: {e}")
+            logger.exception("Error obteniendo estadísticas de chat", extra={"user_id": user_id})
             return ChatStats(
                 total_messages=0,
                 user_messages=0,
@@ -337,11 +386,11 @@ class StatsService:
     async def _get_usage_stats(self, user_id: str) -> UsageStats:
         """Obtener estadísticas de uso"""
         try:
-            # Obtener estadísticas básicas
-            usage_stats = await usage_service.get_usage_stats(user_id)
-            
-            # Obtener límites
-            limits = await usage_service.check_usage_limits(user_id)
+            # Obtener estadísticas básicas y límites en paralelo
+            usage_stats, limits = await asyncio.gather(
+                usage_service.get_usage_stats(user_id),
+                usage_service.check_usage_limits(user_id)
+            )
             
             return UsageStats(
                 daily_queries=usage_stats.daily_queries,
@@ -357,7 +406,7 @@ class StatsService:
             )
             
         except Exception as e:
-            print(f"❌ Error obteniendo estadísticas de uso: {e}")
+            logger.exception("Error obteniendo estadísticas de uso", extra={"user_id": user_id})
             return UsageStats(
                 daily_queries=0,
                 weekly_queries=0,
@@ -371,11 +420,11 @@ class StatsService:
                 is_weekly_exceeded=False
             )
     
-    async def _get_recent_activity(self, user_id: str) -> List[ActivityLog]:
+    async def _get_recent_activity(self, user_id: str, limit: int = 10) -> List[ActivityLog]:
         """Obtener actividad reciente"""
         try:
             # Obtener actividad del usuario
-            activity = await auth_service.get_user_activity(user_id, limit=10)
+            activity = await auth_service.get_user_activity(user_id, limit=limit)
             
             # Convertir a formato ActivityLog
             recent_activity = []
@@ -390,7 +439,7 @@ class StatsService:
             return recent_activity
             
         except Exception as e:
-            print(f"❌ Error obteniendo actividad reciente: {e}")
+            logger.exception("Error obteniendo actividad reciente", extra={"user_id": user_id})
             return []
     
     # Métodos auxiliares
@@ -489,7 +538,7 @@ class StatsService:
             return filtered_docs
             
         except Exception as e:
-            print(f"❌ Error filtrando documentos por período: {e}")
+            logger.exception("Error filtrando documentos por período")
             return documents
     
     async def _get_analytics(self, user_id: str, period: str, category: Optional[str], include_details: bool) -> Dict[str, Any]:
@@ -510,42 +559,65 @@ class StatsService:
             return analytics
             
         except Exception as e:
-            print(f"❌ Error obteniendo analytics: {e}")
+            logger.exception("Error obteniendo analytics", extra={"user_id": user_id})
             return {}
     
-    async def _generate_export_data(self, user_id: str, period: str, include_charts: bool) -> Dict[str, Any]:
-        """Generar datos para exportación"""
-        try:
-            # Obtener todas las estadísticas
-            dashboard_data = await self.get_dashboard_stats(user_id)
+    async def stream_export(
+        self,
+        user_id: str,
+        export_format: str,
+        period: str,
+        include_charts: bool
+    ) -> AsyncIterator[bytes]:
+        """
+        📤 Generar la exportación de estadísticas por bloques
+        
+        Args:
+            user_id: ID del usuario
+            export_format: json, csv o pdf
+            period: Período exportado
+            include_charts: Incluir gráficos en la exportación
             
-            export_data = {
+        Yields:
+            Bloques de bytes listos para enviar
+        """
+        dashboard_data = await self.get_dashboard_stats(user_id)
+        export_date = datetime.now().isoformat()
+        
+        if export_format == "json":
+            header = {
                 "user_id": user_id,
                 "period": period,
-                "export_date": datetime.now().isoformat(),
-                "stats": dashboard_data.dict(),
+                "export_date": export_date,
                 "include_charts": include_charts
             }
-            
-            return export_data
-            
-        except Exception as e:
-            print(f"❌ Error generando datos de exportación: {e}")
-            return {}
-    
-    async def _convert_to_csv(self, data: Dict[str, Any]) -> str:
-        """Convertir datos a formato CSV"""
-        try:
-            # Implementación simplificada
-            csv_content = "Category,Count,Percentage\n"
-            for category in data.get("stats", {}).get("categories", []):
-                csv_content += f"{category['category']},{category['count']},{category['percentage']}\n"
-            
-            return csv_content
-            
-        except Exception as e:
-            print(f"❌ Error convirtiendo a CSV: {e}")
-            return ""
+            yield orjson.dumps(header)[:-1] + b',"stats":{'
+            for index, (section, value) in enumerate(dashboard_data):
+                prefix = b"," if index else b""
+                yield prefix + orjson.dumps(section) + b":" + self._serialize(value)
+            yield b"}}"
+        
+        elif export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_CSV_HEADER)
+            rows = map(_export_csv_row, dashboard_data.categories)
+            while True:
+                chunk = list(islice(rows, EXPORT_CSV_CHUNK_ROWS))
+                writer.writerows(chunk)
+                if len(chunk) < EXPORT_CSV_CHUNK_ROWS:
+                    break
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue().encode()
+        
+        else:  # pdf
+            html_content = await self._convert_to_pdf({
+                "export_date": export_date,
+                "stats": {"stats": dashboard_data.stats.model_dump()}
+            })
+            yield html_content.encode()
     
     async def _convert_to_pdf(self, data: Dict[str, Any]) -> str:
         """Convertir datos a formato PDF"""
@@ -567,16 +639,18 @@ class StatsService:
             return html_content
             
         except Exception as e:
-            print(f"❌ Error convirtiendo a PDF: {e}")
+            logger.exception("Error convirtiendo a PDF")
             return ""
     
     async def _get_stats_summary(self, user_id: str) -> Dict[str, Any]:
         """Obtener resumen de estadísticas"""
         try:
             # Obtener estadísticas básicas
-            usage_stats = await usage_service.get_usage_stats(user_id)
-            documents = await document_service.get_user_documents(user_id)
-            chat_stats = await chat_service.get_chat_stats(user_id)
+            usage_stats, documents, chat_stats = await asyncio.gather(
+                usage_service.get_usage_stats(user_id),
+                asyncio.to_thread(document_service.get_user_documents, user_id),
+                chat_service.get_chat_stats(user_id)
+            )
             
             summary = {
                 "total_queries": usage_stats.total_queries,
@@ -590,7 +664,7 @@ class StatsService:
             return summary
             
         except Exception as e:
-            print(f"❌ Error obteniendo resumen de estadísticas: {e}")
+            logger.exception("Error obteniendo resumen de estadísticas", extra={"user_id": user_id})
             return {
                 "total_queries": 0,
                 "total_documents": 0,
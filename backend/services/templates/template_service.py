@@ -1,7 +1,10 @@
 import re
 import json
 import csv
-from typing import List, Dict, Any, Optional
+import heapq
+import unicodedata
+from collections import Counter
+from typing import List, Dict, Any, Optional, Set, Iterable
 from datetime import datetime, timedelta
 from uuid import uuid4
 import random
@@ -12,9 +15,11 @@ from models.templates import (
     TemplateStatsResponse, TemplateExportRequest, TemplateImportRequest,
     TemplateVariable, TemplateCategory, TEMPLATE_EXAMPLES
 )
-from services.auth.auth_middleware import require_auth, require_usage_check
 from services.monitoring.error_handler import log_error, ErrorType
 
+SUGGESTION_DESCRIPTION_LENGTH = 100  # Caracteres de descripción en sugerencias de búsqueda
+TOKEN_PATTERN = re.compile(r"\w+")
+
 class TemplateService:
     """Servicio para manejo de templates de documentos"""
     
@@ -23,6 +28,9 @@ class TemplateService:
         self.templates: Dict[str, Dict] = {}
         self.user_favorites: Dict[str, List[str]] = {}
         self.template_usage: Dict[str, int] = {}
+        # Índice invertido de búsqueda: término -> IDs, y términos de cada template
+        self.search_index: Dict[str, Set[str]] = {}
+        self.template_terms: Dict[str, Counter] = {}
         self._initialize_sample_data()
     
     def _initialize_sample_data(self):
@@ -57,6 +65,7 @@ class TemplateService:
             
             self.templates[template_id] = template
             self.template_usage[template_id] = template["usage_count"]
+            self._index_template(template)
             
             # Agregar a favoritos aleatoriamente
             if template["is_favorite"]:
@@ -96,11 +105,12 @@ class TemplateService:
             
             self.templates[template_id] = template
             self.template_usage[template_id] = 0
+            self._index_template(template)
             
             return TemplateResponse(**template)
             
         except Exception as e:
-            log_error(e, ErrorType.TEMPLATE_CREATION, {"user_id": user_id})
+            log_error(e, ErrorType.TEMPLATE_CREATION, context={"user_id": user_id})
             raise
     
     async def get_template(self, template_id: str, user_id: str) -> Optional[TemplateResponse]:
@@ -130,7 +140,7 @@ class TemplateService:
             return TemplateResponse(**template_data)
             
         except Exception as e:
-            log_error(e, ErrorType.TEMPLATE_RETRIEVAL, {"template_id": template_id, "user_id": user_id})
+            log_error(e, ErrorType.TEMPLATE_RETRIEVAL, context={"template_id": template_id, "user_id": user_id})
             raise
     
     async def list_templates(self, user_id: str, search_params: TemplateSearchRequest) -> TemplateListResponse:
@@ -146,8 +156,13 @@ class TemplateService:
         """
         try:
             templates = []
+            scores = self._search(search_params.query) if search_params.query else None
+            candidates = (
+                self.templates.values() if scores is None
+                else (self.templates[template_id] for template_id in scores)
+            )
             
-            for template in self.templates.values():
+            for template in candidates:
                 # Verificar acceso
                 if not template["is_public"] and template["user_id"] != user_id:
                     continue
@@ -161,8 +176,11 @@ class TemplateService:
                 template_data = {**template, "is_favorite": is_favorite}
                 templates.append(TemplateResponse(**template_data))
             
-            # Ordenar por fecha de creación (más recientes primero)
-            templates.sort(key=lambda x: x.created_at, reverse=True)
+            # Ordenar por relevancia si hay búsqueda y por fecha de creación (más recientes primero)
+            if scores is None:
+                templates.sort(key=lambda x: x.created_at, reverse=True)
+            else:
+                templates.sort(key=lambda x: (scores[x.id], x.created_at), reverse=True)
             
             # Paginación
             total = len(templates)
@@ -179,7 +197,7 @@ class TemplateService:
             )
             
         except Exception as e:
-            log_error(e, ErrorType.TEMPLATE_LISTING, {"user_id": user_id})
+            log_error(e, ErrorType.TEMPLATE_LISTING, context={"user_id": user_id})
             raise
     
     async def update_template(self, template_id: str, user_id: str, update_data: TemplateUpdate) -> Optional[TemplateResponse]:
@@ -206,6 +224,9 @@ class TemplateService:
             
             template["updated_at"] = datetime.now()
             
+            if "title" in update_dict or "description" in update_dict:
+                self._index_template(template)
+            
             # Detectar variables si se actualizó el contenido
             if "content" in update_dict and not update_dict.get("variables"):
                 template["variables"] = self._detect_variables(template["content"])
@@ -213,7 +234,7 @@ class TemplateService:
             return TemplateResponse(**template)
             
         except Exception as e:
-            log_error(e, ErrorType.TEMPLATE_UPDATE, {"template_id": template_id, "user_id": user_id})
+            log_error(e, ErrorType.TEMPLATE_UPDATE, context={"template_id": template_id, "user_id": user_id})
             raise
     
     async def delete_template(self, template_id: str, user_id: str) -> bool:
@@ -233,6 +254,7 @@ class TemplateService:
                 return False
             
             del self.templates[template_id]
+            self._unindex_template(template_id)
             
             # Remover de favoritos
             for user_favs in self.user_favorites.values():
@@ -246,7 +268,7 @@ class TemplateService:
             return True
             
         except Exception as e:
-            log_error(e, ErrorType.TEMPLATE_DELETION, {"template_id": template_id, "user_id": user_id})
+            log_error(e, ErrorType.TEMPLATE_DELETION, context={"template_id": template_id, "user_id": user_id})
             raise
     
     async def use_template(self, template_id: str, user_id: str, usage_data: TemplateUsageRequest) -> Optional[TemplateUsageResponse]:
@@ -292,7 +314,7 @@ class TemplateService:
             )
             
         except Exception as e:
-            log_error(e, ErrorType.TEMPLATE_USAGE, {"template_id": template_id, "user_id": user_id})
+            log_error(e, ErrorType.TEMPLATE_USAGE, context={"template_id": template_id, "user_id": user_id})
             raise
     
     async def toggle_favorite(self, template_id: str, user_id: str) -> bool:
@@ -322,7 +344,7 @@ class TemplateService:
                 return True
                 
         except Exception as e:
-            log_error(e, ErrorType.TEMPLATE_FAVORITE, {"template_id": template_id, "user_id": user_id})
+            log_error(e, ErrorType.TEMPLATE_FAVORITE, context={"template_id": template_id, "user_id": user_id})
             raise
     
     async def get_template_stats(self, user_id: str) -> TemplateStatsResponse:
@@ -369,9 +391,98 @@ class TemplateService:
             )
             
         except Exception as e:
-            log_error(e, ErrorType.TEMPLATE_STATS, {"user_id": user_id})
+            log_error(e, ErrorType.TEMPLATE_STATS, context={"user_id": user_id})
+            raise
+    
+    async def get_popular_templates(self, user_id: str, limit: int = 10) -> List[TemplateResponse]:
+        """
+        🔥 Obtener los templates accesibles más usados
+        
+        Args:
+            user_id: ID del usuario
+            limit: Número máximo de templates
+            
+        Returns:
+            Templates ordenados por uso descendente
+        """
+        try:
+            popular = heapq.nlargest(
+                limit,
+                (t for t in self.templates.values() if t["is_public"] or t["user_id"] == user_id),
+                key=lambda t: self.template_usage.get(t["id"], 0)
+            )
+            return [self._to_response(t, user_id) for t in popular]
+            
+        except Exception as e:
+            log_error(e, ErrorType.TEMPLATE_POPULAR, context={"user_id": user_id})
+            raise
+    
+    async def get_recent_templates(self, user_id: str, limit: int = 10) -> List[TemplateResponse]:
+        """
+        ⏰ Obtener los templates del usuario creados más recientemente
+        
+        Args:
+            user_id: ID del usuario
+            limit: Número máximo de templates
+            
+        Returns:
+            Templates ordenados por fecha de creación descendente
+        """
+        try:
+            recent = heapq.nlargest(
+                limit,
+                (t for t in self.templates.values() if t["user_id"] == user_id),
+                key=lambda t: t["created_at"]
+            )
+            return [self._to_response(t, user_id) for t in recent]
+            
+        except Exception as e:
+            log_error(e, ErrorType.TEMPLATE_RECENT, context={"user_id": user_id})
+            raise
+    
+    async def suggest(self, user_id: str, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        🔍 Obtener sugerencias de búsqueda con solo los campos necesarios
+        
+        Args:
+            user_id: ID del usuario
+            query: Término de búsqueda
+            limit: Número máximo de sugerencias
+            
+        Returns:
+            Sugerencias con id, título, categoría y descripción recortada
+        """
+        try:
+            scores = self._search(query)
+            matches = heapq.nlargest(
+                limit,
+                (
+                    t for t in (self.templates[template_id] for template_id in scores)
+                    if t["is_public"] or t["user_id"] == user_id
+                ),
+                key=lambda t: (scores[t["id"]], t["created_at"])
+            )
+            
+            return [
+                {
+                    "id": t["id"],
+                    "title": t["title"],
+                    "category": t["category"].value,
+                    "description": t["description"][:SUGGESTION_DESCRIPTION_LENGTH] + "..."
+                    if len(t["description"]) > SUGGESTION_DESCRIPTION_LENGTH else t["description"]
+                }
+                for t in matches
+            ]
+            
+        except Exception as e:
+            log_error(e, ErrorType.TEMPLATE_SEARCH, context={"user_id": user_id})
             raise
     
+    def _to_response(self, template: Dict, user_id: str) -> TemplateResponse:
+        """Construir la respuesta de un template con el favorito del usuario"""
+        is_favorite = template["id"] in self.user_favorites.get(user_id, [])
+        return TemplateResponse(**{**template, "is_favorite": is_favorite})
+    
     async def export_templates(self, template_ids: List[str], user_id: str, format: str = "json") -> str:
         """
         📤 Exportar templates
@@ -400,15 +511,18 @@ class TemplateService:
                 raise ValueError(f"Formato no soportado: {format}")
                 
         except Exception as e:
-            log_error(e, ErrorType.TEMPLATE_EXPORT, {"user_id": user_id, "template_ids": template_ids})
+            log_error(e, ErrorType.TEMPLATE_EXPORT, context={"user_id": user_id, "template_ids": template_ids})
             raise
     
-    async def import_templates(self, templates_data: List[Dict], user_id: str, overwrite: bool = False) -> List[str]:
+    async def import_templates(self, templates_data: Iterable[Dict], user_id: str, overwrite: bool = False) -> List[str]:
         """
         📥 Importar templates
         
+        Los templates se preparan primero y se insertan en un solo lote, de modo
+        que un error a mitad de la importación no deja templates a medias.
+        
         Args:
-            templates_data: Datos de templates a importar
+            templates_data: Datos de templates a importar (cualquier iterable)
             user_id: ID del usuario
             overwrite: Si sobrescribir templates existentes
             
@@ -416,36 +530,106 @@ class TemplateService:
             IDs de templates importados
         """
         try:
-            imported_ids = []
+            now = datetime.now()
+            batch: Dict[str, Dict] = {}
             
             for template_data in templates_data:
                 # Generar nuevo ID si no existe o si no se debe sobrescribir
-                if "id" not in template_data or not overwrite:
-                    template_data["id"] = str(uuid4())
-                
-                template_id = template_data["id"]
+                template_id = template_data.get("id") if overwrite else None
+                existing = self.templates.get(template_id) if template_id else None
                 
-                # Verificar si ya existe
-                if template_id in self.templates and not overwrite:
+                # Solo se sobrescriben templates propios
+                if existing is not None and existing["user_id"] != user_id:
                     continue
                 
-                # Asignar al usuario
-                template_data["user_id"] = user_id
-                template_data["created_at"] = datetime.now()
-                template_data["updated_at"] = datetime.now()
-                template_data["usage_count"] = 0
-                template_data["is_favorite"] = False
-                
-                self.templates[template_id] = template_data
-                self.template_usage[template_id] = 0
-                imported_ids.append(template_id)
-            
-            return imported_ids
+                template_id = template_id or str(uuid4())
+                batch[template_id] = {
+                    **template_data,
+                    "id": template_id,
+                    "user_id": user_id,
+                    "is_favorite": False,
+                    "usage_count": 0,
+                    "created_at": now,
+                    "updated_at": now,
+                    "created_by": f"Usuario {user_id}"
+                }
+            
+            self.templates.update(batch)
+            self.template_usage.update(dict.fromkeys(batch, 0))
+            for template in batch.values():
+                self._index_template(template)
+            
+            return list(batch)
             
         except Exception as e:
-            log_error(e, ErrorType.TEMPLATE_IMPORT, {"user_id": user_id})
+            log_error(e, ErrorType.TEMPLATE_IMPORT, context={"user_id": user_id})
             raise
     
+    @staticmethod
+    def _tokenize(text: str) -> List[str]:
+        """Normalizar texto a términos de búsqueda (minúsculas y sin tildes)"""
+        normalized = unicodedata.normalize("NFKD", text.lower())
+        folded = "".join(char for char in normalized if not unicodedata.combining(char))
+        return TOKEN_PATTERN.findall(folded)
+    
+    def _index_template(self, template: Dict) -> None:
+        """Indexar título y descripción de un template para la búsqueda"""
+        template_id = template["id"]
+        self._unindex_template(template_id)
+        
+        terms = Counter(self._tokenize(f"{template.get('title', '')} {template.get('description', '')}"))
+        self.template_terms[template_id] = terms
+        for term in terms:
+            self.search_index.setdefault(term, set()).add(template_id)
+    
+    def _unindex_template(self, template_id: str) -> None:
+        """Eliminar un template del índice de búsqueda"""
+        for term in self.template_terms.pop(template_id, ()):
+            ids = self.search_index.get(term)
+            if ids is not None:
+                ids.discard(template_id)
+                if not ids:
+                    del self.search_index[term]
+    
+    def _search(self, query: str) -> Dict[str, int]:
+        """
+        🔍 Buscar en el índice invertido
+        
+        Cada término de la consulta debe aparecer (como palabra o prefijo de
+        palabra) en el título o la descripción.
+        
+        Args:
+            query: Texto de búsqueda
+            
+        Returns:
+            Relevancia por ID de template; vacío si la consulta no tiene términos
+            indexables (p. ej. solo signos de puntuación)
+        """
+        query_terms = self._tokenize(query)
+        if not query_terms:
+            return {}
+        
+        scores: Optional[Dict[str, int]] = None
+        for query_term in set(query_terms):
+            matched_terms = [term for term in self.search_index if term.startswith(query_term)]
+            term_scores: Dict[str, int] = {}
+            for term in matched_terms:
+                for template_id in self.search_index[term]:
+                    term_scores[template_id] = term_scores.get(template_id, 0) + self.template_terms[template_id][term]
+            
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    template_id: score + term_scores[template_id]
+                    for template_id, score in scores.items()
+                    if template_id in term_scores
+                }
+            if not scores:
+                break
+        
+        return scores or {}
+    
     def _detect_variables(self, content: str) -> List[TemplateVariable]:
         """
         🔍 Detectar variables en el contenido del template
@@ -481,13 +665,6 @@ class TemplateService:
         Returns:
             True si coincide con los filtros
         """
-        # Búsqueda por texto
-        if search_params.query:
-            query_lower = search_params.query.lower()
-            if (query_lower not in template["title"].lower() and 
-                query_lower not in template["description"].lower()):
-                return False
-        
         # Filtro por categoría
         if search_params.category and template["category"] != search_params.category:
             return False